@@ -0,0 +1,185 @@
+# async_runtime.py
+import asyncio
+import concurrent.futures
+import logging
+import threading
+from functools import partial
+
+from PyQt6.QtCore import QObject, Qt, pyqtSignal
+
+
+class AsyncTask:
+    """提交到 AsyncRuntime 的一个协程的句柄，可在任意线程中等待或取消。"""
+
+    def __init__(self, name: str, loop: asyncio.AbstractEventLoop):
+        self.name = name
+        self._loop = loop
+        self._task: asyncio.Task | None = None  # 只在事件循环线程中访问
+        # 协程（包括被取消后的清理）真正结束时完成
+        self._future: concurrent.futures.Future = concurrent.futures.Future()
+
+    def done(self) -> bool:
+        return self._future.done()
+
+    def result(self, timeout: float | None = None):
+        """阻塞等待协程结束并返回其结果；协程抛出的异常在此重新抛出。"""
+        return self._future.result(timeout)
+
+    def wait(self, timeout: float | None = None) -> bool:
+        """等待协程结束，返回是否已经结束。"""
+        concurrent.futures.wait([self._future], timeout)
+        return self._future.done()
+
+    def cancel(self, wait: float = 0.0) -> bool:
+        """
+        取消协程。
+
+        Args:
+            wait (float): 大于 0 时最多等待这么多秒，直到协程处理完取消（如关闭连接）真正结束。
+
+        Returns:
+            bool: 协程是否已经结束。
+        """
+        if not self._future.done() and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._cancel_in_loop)
+        return self.wait(wait) if wait > 0 else self._future.done()
+
+    def _cancel_in_loop(self):
+        if self._task is not None:
+            self._task.cancel()
+
+
+class AsyncRuntime(QObject):
+    """
+    进程内共享的异步运行时：一个长期存在的 asyncio 事件循环，运行在自己的守护线程中。
+    媒体监控、会话发现和实时接入的协程都提交到这里，不再每次启动或点击时新建线程和事件循环。
+
+    - submit 从任意线程提交协程，返回可等待、可取消的 AsyncTask，可指定超时；
+    - call 在协程结束后通过排队的信号在主线程中调用回调；
+    - shutdown 取消所有仍在运行的协程，等待它们处理完取消后停止事件循环。
+    """
+    # (结果 future, 成功回调, 失败回调)，跨线程送回主线程
+    _completed = pyqtSignal(object, object, object)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._thread: threading.Thread | None = None
+        self._tasks: set[asyncio.Task] = set()  # 只在事件循环线程中访问
+        # 显式排队：协程在 call 注册回调之前就已结束时，回调也不会在 call 内同步执行
+        self._completed.connect(self._dispatch, Qt.ConnectionType.QueuedConnection)
+
+    def start(self):
+        """启动事件循环线程。已在运行时不做任何事。"""
+        if self.is_running():
+            return
+        ready = threading.Event()
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, args=(ready,), name="async-runtime", daemon=True)
+        self._thread.start()
+        ready.wait()
+        logging.debug("异步运行时已启动。")
+
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def submit(self, coro, timeout: float | None = None, name: str | None = None) -> AsyncTask:
+        """
+        提交一个协程。可在任意线程中调用。
+
+        Args:
+            coro: 要运行的协程。
+            timeout (float | None): 超时（秒），超时后协程被取消，结果为 TimeoutError。
+            name (str | None): 任务名称，用于日志。
+
+        Returns:
+            AsyncTask: 协程的句柄。
+        """
+        if not self.is_running():
+            coro.close()
+            raise RuntimeError("异步运行时尚未启动或已关闭。")
+        handle = AsyncTask(name or getattr(coro, '__qualname__', 'task'), self._loop)
+        self._loop.call_soon_threadsafe(self._schedule, coro, timeout, handle)
+        return handle
+
+    def call(self, coro, on_result=None, on_error=None, timeout: float | None = None,
+             name: str | None = None) -> AsyncTask:
+        """
+        提交一个协程，结束后在主线程中调用 on_result(结果) 或 on_error(异常)。
+        协程被取消时两者都不调用；没有 on_error 时异常只记录到日志。
+        """
+        handle = self.submit(coro, timeout=timeout, name=name)
+        handle._future.add_done_callback(lambda future: self._completed.emit(future, on_result, on_error))
+        return handle
+
+    def shutdown(self, timeout: float = 2.0):
+        """取消所有仍在运行的协程，最多等待 timeout 秒让它们处理完取消，然后停止事件循环。"""
+        if not self.is_running():
+            return
+        cancel = asyncio.run_coroutine_threadsafe(self._cancel_all(), self._loop)
+        try:
+            cancel.result(timeout)
+        except concurrent.futures.TimeoutError:
+            logging.warning(f"部分异步任务未在 {timeout} 秒内结束，直接停止事件循环。")
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout)
+        self._thread = None
+        logging.debug("异步运行时已关闭。")
+
+    def _run(self, ready: threading.Event):
+        asyncio.set_event_loop(self._loop)
+        self._loop.call_soon(ready.set)
+        try:
+            self._loop.run_forever()
+        finally:
+            self._loop.run_until_complete(self._loop.shutdown_asyncgens())
+            self._loop.close()
+
+    def _schedule(self, coro, timeout: float | None, handle: AsyncTask):
+        if timeout is not None:
+            coro = asyncio.wait_for(coro, timeout)
+        task = self._loop.create_task(coro, name=handle.name)
+        handle._task = task
+        self._tasks.add(task)
+        task.add_done_callback(partial(self._on_task_done, handle))
+
+    def _on_task_done(self, handle: AsyncTask, task: asyncio.Task):
+        self._tasks.discard(task)
+        if task.cancelled():
+            handle._future.cancel()
+            # 只有这一步才会唤醒 concurrent.futures.wait 中的等待者
+            handle._future.set_running_or_notify_cancel()
+        elif task.exception() is not None:
+            handle._future.set_exception(task.exception())
+        else:
+            handle._future.set_result(task.result())
+
+    async def _cancel_all(self):
+        tasks = [t for t in self._tasks if not t.done()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _dispatch(self, future: concurrent.futures.Future, on_result, on_error):
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is not None:
+            if on_error:
+                on_error(error)
+            else:
+                logging.error(f"异步任务出错: {error!r}")
+        elif on_result:
+            on_result(future.result())
+
+
+_runtime: AsyncRuntime | None = None
+
+
+def get_runtime() -> AsyncRuntime:
+    """获取全局共享的异步运行时，首次调用时创建并启动。"""
+    global _runtime
+    if _runtime is None:
+        _runtime = AsyncRuntime()
+    _runtime.start()
+    return _runtime
@@ -1,6 +1,37 @@
 # config_loader.py
+import copy
 import logging
 import configparser
+import sys
+
+
+class ConfigChange:
+    """
+    一次配置变更事件，只包含值真正改变了的配置项：属性名 -> (旧值, 新值)。
+    各子系统据此只应用与自己有关的部分，而不是整体重启。
+    """
+    def __init__(self, changes: dict[str, tuple[object, object]]):
+        self.changes = changes
+
+    def __bool__(self) -> bool:
+        return bool(self.changes)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.changes
+
+    def __repr__(self) -> str:
+        return f"ConfigChange({', '.join(self.changes)})"
+
+    def any(self, *names: str) -> bool:
+        """是否有任意一个给定的配置项发生了变化。"""
+        return any(name in self.changes for name in names)
+
+    def old(self, name: str):
+        return self.changes[name][0]
+
+    def new(self, name: str):
+        return self.changes[name][1]
+
 
 class Config:
     """
@@ -31,22 +62,38 @@ class Config:
             
         self.filepath = filepath
         self.parser = configparser.ConfigParser()
+        # 配置变更的监听者，见 add_listener
+        self._listeners = []
+        # 只在本次运行中生效的覆盖（如命令行参数）：属性名 -> (覆盖值, 配置文件中的值)
+        self._overrides: dict[str, tuple[object, object]] = {}
         
         # 定义所有配置项的默认值，这使得程序在没有配置文件时也能正常运行
         self._defaults = {
             'Display': {
                 'font_name': '微软雅黑', 'font_size': '24', 'stroke_width': '2',
-                'max_tracks': '18', 'opacity': '0.85', 'line_spacing_ratio': '0.2'
+                'max_tracks': '18', 'opacity': '0.85', 'line_spacing_ratio': '0.2',
+                'outline_method': 'stroker',
+                'max_pixmap_width': '2048', 'max_lines': '3', 'long_text_mode': 'truncate',
+                'honor_font_size': 'true', 'follow_player_window': 'true'
             },
             'Danmaku': {
                 'scroll_speed': '180', 'fixed_duration_ms': '5000', 
                 'max_danmaku_count': '250',
-                'allow_overlap': 'false' # 允许弹幕重叠
+                'pool_hard_cap': '1000', 'pool_idle_release_s': '10',
+                'allow_overlap': 'false', # 允许弹幕重叠
+                'follow_file': 'false' # 跟随仍在写入中的弹幕文件
             },
-            'Sync': {'target_aumid': 'PotPlayer64'},
+            'Sync': {'target_aumid': 'PotPlayer64', 'monitor': 'auto',
+                     'mpv_ipc_path': r'\\.\pipe\mpvsocket' if sys.platform == 'win32' else '/tmp/mpvsocket',
+                     'replay_path': '', 'extra_sessions': ''},
             'Debug': {'enabled': 'false', 'info_position': 'bottom_left'},
             'OnTopStrategy': {'method': '1'},
             'Logging': {'level': 'INFO', 'log_to_file': 'true'},
+            'Performance': {'auto_quality': 'true', 'frame_budget_ms': '12', 'spawn_budget_ms': '4',
+                            'parse_worker': 'false'},
+            'Library': {'folders': '', 'auto_match': 'true', 'db_path': 'danmaku_library.db'},
+            'Live': {'enabled': 'false', 'listen': 'tcp://127.0.0.1:17878', 'websocket_port': '0',
+                     'queue_size': '10000', 'max_rate': '200'},
             'DEFAULT': {'LastDanmakuPath': ''} # DEFAULT节用于存储全局默认值
         }
         self.load()
@@ -71,12 +118,64 @@ class Config:
         将所有设置恢复为内置的默认值，并立即保存到文件。
         """
         logging.info("正在恢复所有设置为默认值...")
+        self._overrides.clear()
         parser = configparser.ConfigParser()
         parser.read_dict(self._defaults)
         self.parser = parser
         self._load_values()
         self.save()
 
+    def override(self, name: str, value):
+        """
+        只在本次运行中覆盖一个配置项（如命令行参数）。save() 写回的仍是配置文件中原来的值，
+        除非之后该配置项又被改成了其他值（如在设置页面中修改）。
+        """
+        persisted = self._overrides[name][1] if name in self._overrides else getattr(self, name)
+        self._overrides[name] = (value, persisted)
+        setattr(self, name, value)
+
+    def _persisted(self, name: str):
+        """配置项应写回文件的值：仍为本次运行的覆盖值时取配置文件中原来的值。"""
+        value = getattr(self, name)
+        if name in self._overrides:
+            override_value, persisted = self._overrides[name]
+            if value == override_value:
+                return persisted
+        return value
+
+    def snapshot(self) -> dict[str, object]:
+        """返回当前所有配置项的副本，之后可交给 apply_changes 比较。"""
+        return {name: copy.copy(value) for name, value in vars(self).items()
+                if not name.startswith('_') and name not in ('filepath', 'parser')}
+
+    def add_listener(self, callback):
+        """注册配置变更的监听者，callback(change: ConfigChange) 在主线程中被调用。"""
+        if callback not in self._listeners:
+            self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def apply_changes(self, before: dict[str, object]) -> ConfigChange:
+        """
+        把当前配置与之前的快照比较，把发生变化的配置项作为一个 ConfigChange 广播给所有监听者。
+
+        Args:
+            before (dict): 修改配置之前由 snapshot() 得到的快照。
+
+        Returns:
+            ConfigChange: 广播的变更（没有变化时不广播）。
+        """
+        after = self.snapshot()
+        change = ConfigChange({name: (before.get(name), value) for name, value in after.items()
+                               if before.get(name) != value})
+        if change:
+            logging.info(f"配置已变更: {', '.join(change.changes)}")
+            for callback in list(self._listeners):
+                callback(change)
+        return change
+
     def _load_values(self):
         """
         私有方法，将 parser 中的配置项读取为强类型的类属性。
@@ -88,13 +187,26 @@ class Config:
         self.max_tracks = self.parser.getint('Display', 'max_tracks')
         self.opacity = self.parser.getfloat('Display', 'opacity')
         self.line_spacing_ratio = self.parser.getfloat('Display', 'line_spacing_ratio')
+        self.outline_method = self.parser.get('Display', 'outline_method')
+        self.max_pixmap_width = self.parser.getint('Display', 'max_pixmap_width')
+        self.max_lines = self.parser.getint('Display', 'max_lines')
+        self.long_text_mode = self.parser.get('Display', 'long_text_mode')
+        self.honor_font_size = self.parser.getboolean('Display', 'honor_font_size')
+        self.follow_player_window = self.parser.getboolean('Display', 'follow_player_window')
         # [Danmaku]
         self.scroll_speed = self.parser.getint('Danmaku', 'scroll_speed')
         self.fixed_duration_ms = self.parser.getint('Danmaku', 'fixed_duration_ms')
         self.max_danmaku_count = self.parser.getint('Danmaku', 'max_danmaku_count')
+        self.pool_hard_cap = self.parser.getint('Danmaku', 'pool_hard_cap')
+        self.pool_idle_release_s = self.parser.getfloat('Danmaku', 'pool_idle_release_s')
         self.allow_overlap = self.parser.getboolean('Danmaku', 'allow_overlap')
+        self.follow_file = self.parser.getboolean('Danmaku', 'follow_file')
         # [Sync] & [DEFAULT]
         self.target_aumid = self.parser.get('Sync', 'target_aumid')
+        self.monitor_backend = self.parser.get('Sync', 'monitor')
+        self.mpv_ipc_path = self.parser.get('Sync', 'mpv_ipc_path')
+        self.replay_path = self.parser.get('Sync', 'replay_path')
+        self.extra_sessions = self.parse_sessions(self.parser.get('Sync', 'extra_sessions'))
         self.last_danmaku_path = self.parser.get('DEFAULT', 'LastDanmakuPath')
         # [Debug]
         self.debug = self.parser.getboolean('Debug', 'enabled')
@@ -104,6 +216,36 @@ class Config:
         # [Logging]
         self.log_level = self.parser.get('Logging', 'level')
         self.log_to_file = self.parser.getboolean('Logging', 'log_to_file')
+        # [Performance]
+        self.auto_quality = self.parser.getboolean('Performance', 'auto_quality')
+        self.frame_budget_ms = self.parser.getfloat('Performance', 'frame_budget_ms')
+        self.spawn_budget_ms = self.parser.getfloat('Performance', 'spawn_budget_ms')
+        self.parse_worker = self.parser.getboolean('Performance', 'parse_worker')
+        # [Library]
+        self.library_folders = [f.strip() for f in self.parser.get('Library', 'folders').split(';') if f.strip()]
+        self.library_auto_match = self.parser.getboolean('Library', 'auto_match')
+        self.library_db_path = self.parser.get('Library', 'db_path')
+        # [Live]
+        self.live_enabled = self.parser.getboolean('Live', 'enabled')
+        self.live_listen = self.parser.get('Live', 'listen')
+        self.live_websocket_port = self.parser.getint('Live', 'websocket_port')
+        self.live_queue_size = self.parser.getint('Live', 'queue_size')
+        self.live_max_rate = self.parser.getfloat('Live', 'max_rate')
+
+    @staticmethod
+    def parse_sessions(value: str) -> list[tuple[str, str]]:
+        """解析附加会话绑定，格式为 'aumid|弹幕文件; aumid|弹幕文件'。"""
+        sessions = []
+        for entry in value.split(';'):
+            aumid, sep, path = entry.partition('|')
+            if sep and aumid.strip() and path.strip():
+                sessions.append((aumid.strip(), path.strip()))
+        return sessions
+
+    @staticmethod
+    def format_sessions(sessions: list[tuple[str, str]]) -> str:
+        """将附加会话绑定列表格式化为配置文件中的字符串。"""
+        return '; '.join(f"{aumid}|{path}" for aumid, path in sessions)
 
     def save(self):
         """
@@ -116,13 +258,26 @@ class Config:
         self.parser.set('Display', 'max_tracks', str(self.max_tracks))
         self.parser.set('Display', 'opacity', str(self.opacity))
         self.parser.set('Display', 'line_spacing_ratio', str(self.line_spacing_ratio))
+        self.parser.set('Display', 'outline_method', self.outline_method)
+        self.parser.set('Display', 'max_pixmap_width', str(self.max_pixmap_width))
+        self.parser.set('Display', 'max_lines', str(self.max_lines))
+        self.parser.set('Display', 'long_text_mode', self.long_text_mode)
+        self.parser.set('Display', 'honor_font_size', str(self.honor_font_size).lower())
+        self.parser.set('Display', 'follow_player_window', str(self.follow_player_window).lower())
         
         self.parser.set('Danmaku', 'scroll_speed', str(self.scroll_speed))
         self.parser.set('Danmaku', 'fixed_duration_ms', str(self.fixed_duration_ms))
         self.parser.set('Danmaku', 'max_danmaku_count', str(self.max_danmaku_count))
+        self.parser.set('Danmaku', 'pool_hard_cap', str(self.pool_hard_cap))
+        self.parser.set('Danmaku', 'pool_idle_release_s', str(self.pool_idle_release_s))
         self.parser.set('Danmaku', 'allow_overlap', str(self.allow_overlap).lower()) # bool转小写字符串
+        self.parser.set('Danmaku', 'follow_file', str(self.follow_file).lower())
         
-        self.parser.set('Sync', 'target_aumid', self.target_aumid)
+        self.parser.set('Sync', 'target_aumid', self._persisted('target_aumid'))
+        self.parser.set('Sync', 'monitor', self._persisted('monitor_backend'))
+        self.parser.set('Sync', 'mpv_ipc_path', self.mpv_ipc_path)
+        self.parser.set('Sync', 'replay_path', self.replay_path)
+        self.parser.set('Sync', 'extra_sessions', self.format_sessions(self.extra_sessions))
         
         self.parser.set('Debug', 'enabled', str(self.debug).lower())
         self.parser.set('Debug', 'info_position', self.debug_info_position)
@@ -131,6 +286,21 @@ class Config:
         
         self.parser.set('Logging', 'level', self.log_level)
         self.parser.set('Logging', 'log_to_file', str(self.log_to_file).lower())
+
+        self.parser.set('Performance', 'auto_quality', str(self.auto_quality).lower())
+        self.parser.set('Performance', 'frame_budget_ms', str(self.frame_budget_ms))
+        self.parser.set('Performance', 'spawn_budget_ms', str(self.spawn_budget_ms))
+        self.parser.set('Performance', 'parse_worker', str(self.parse_worker).lower())
+
+        self.parser.set('Library', 'folders', '; '.join(self.library_folders))
+        self.parser.set('Library', 'auto_match', str(self.library_auto_match).lower())
+        self.parser.set('Library', 'db_path', self.library_db_path)
+
+        self.parser.set('Live', 'enabled', str(self.live_enabled).lower())
+        self.parser.set('Live', 'listen', self.live_listen)
+        self.parser.set('Live', 'websocket_port', str(self.live_websocket_port))
+        self.parser.set('Live', 'queue_size', str(self.live_queue_size))
+        self.parser.set('Live', 'max_rate', str(self.live_max_rate))
         
         self.parser.set('DEFAULT', 'LastDanmakuPath', self.last_danmaku_path)
         
@@ -6,11 +6,13 @@ from PyQt6.QtWidgets import (
     QLineEdit, QCheckBox, QFileDialog, QListWidgetItem, QPlainTextEdit, 
     QMessageBox, QDialog, QDialogButtonBox
 )
-from PyQt6.QtCore import Qt, QTimer
+from PyQt6.QtCore import Qt
 from PyQt6.QtGui import QFont
 
 from config_loader import get_config
 from logger_setup import LogSignals
+from outline_renderer import OUTLINE_METHODS
+from monitors import MONITOR_BACKENDS
 from typing import TYPE_CHECKING
 if TYPE_CHECKING:
     from danmaku_controller import DanmakuController
@@ -127,6 +129,8 @@ class MainWindow(QMainWindow):
         # 【新】连接控制器的错误信号到主窗口的错误提示槽
         if self.controller:
             self.controller.error_occurred.connect(self.show_error_message)
+            # 后台加载弹幕文件失败时控制器会自行停止
+            self.controller.stopped.connect(self._on_danmaku_stopped)
 
     @staticmethod
     def show_error_message(message: str):
@@ -141,7 +145,8 @@ class MainWindow(QMainWindow):
     def start_danmaku(self):
         if not self.controller: return
         danmaku_path = self.main_widget.path_input.text()
-        if not danmaku_path:
+        # 启用了弹幕库自动匹配时可以不选文件，由播放器的媒体标题匹配
+        if not danmaku_path and not self.controller.library_enabled():
             logging.error("请先选择一个弹幕文件。")
             self.show_error_message("请先选择一个弹幕文件。")
             return
@@ -154,6 +159,9 @@ class MainWindow(QMainWindow):
     def stop_danmaku(self):
         if not self.controller: return
         self.controller.stop()
+        self._on_danmaku_stopped()
+
+    def _on_danmaku_stopped(self):
         self.main_widget.start_button.setEnabled(True)
         self.main_widget.stop_button.setEnabled(False)
 
@@ -185,36 +193,71 @@ class SettingsWidget(QWidget):
         # ... (与之前版本相同) ...
         self.font_name_input = QLineEdit()
         self.font_size_input = QSpinBox()
+        self.honor_font_size_checkbox = QCheckBox()
+        self.follow_player_window_checkbox = QCheckBox()
         self.stroke_width_input = QSpinBox()
         self.opacity_input = QDoubleSpinBox()
+        self.outline_method_input = QComboBox()
+        self.long_text_mode_input = QComboBox()
+        self.max_pixmap_width_input = QSpinBox()
+        self.max_lines_input = QSpinBox()
         self.scroll_speed_input = QSpinBox()
         self.fixed_duration_input = QSpinBox()
         self.max_danmaku_input = QSpinBox()
+        self.pool_hard_cap_input = QSpinBox()
         self.max_tracks_input = QSpinBox()
         self.line_spacing_input = QDoubleSpinBox()
         self.allow_overlap_checkbox = QCheckBox()
+        self.follow_file_checkbox = QCheckBox()
         self.target_aumid_input = QLineEdit()
         self.discover_aumid_button = QPushButton("发现...") # 【新】发现按钮
+        self.monitor_backend_input = QComboBox()
+        self.mpv_ipc_path_input = QLineEdit()
+        self.replay_path_input = QLineEdit()
+        self.extra_sessions_input = QLineEdit()
+        self.extra_sessions_input.setPlaceholderText("aumid|弹幕文件; aumid|弹幕文件")
+        self.library_folders_input = QLineEdit()
+        self.library_folders_input.setPlaceholderText("文件夹; 文件夹")
+        self.library_auto_match_checkbox = QCheckBox()
+        self.library_db_path_input = QLineEdit()
+        self.live_enabled_checkbox = QCheckBox()
+        self.live_listen_input = QLineEdit()
+        self.live_listen_input.setPlaceholderText("tcp://127.0.0.1:17878 或 unix:///tmp/danmaku.sock")
+        self.live_websocket_port_input = QSpinBox()
+        self.live_queue_size_input = QSpinBox()
+        self.live_max_rate_input = QSpinBox()
         self.ontop_strategy_input = QComboBox()
         self.debug_mode_checkbox = QCheckBox()
         self.debug_pos_input = QComboBox()
         self.log_level_input = QComboBox()
         self.log_to_file_checkbox = QCheckBox()
+        self.auto_quality_checkbox = QCheckBox()
+        self.frame_budget_input = QDoubleSpinBox()
+        self.spawn_budget_input = QDoubleSpinBox()
+        self.parse_worker_checkbox = QCheckBox()
 
         # --- 将控件添加到布局 ---
         form_layout.addRow("--- 显示设置 ---", None)
         form_layout.addRow("字体名称:", self.font_name_input)
         form_layout.addRow("字体大小:", self.font_size_input)
+        form_layout.addRow("使用弹幕自带字号:", self.honor_font_size_checkbox)
+        form_layout.addRow("弹幕跟随播放器窗口:", self.follow_player_window_checkbox)
         # ... (与之前版本相同) ...
         form_layout.addRow("描边宽度:", self.stroke_width_input)
         form_layout.addRow("不透明度:", self.opacity_input)
+        form_layout.addRow("描边方式:", self.outline_method_input)
+        form_layout.addRow("超长弹幕处理:", self.long_text_mode_input)
+        form_layout.addRow("单条最大宽度(像素):", self.max_pixmap_width_input)
+        form_layout.addRow("单条最大行数:", self.max_lines_input)
         form_layout.addRow("--- 弹幕设置 ---", None)
         form_layout.addRow("滚动速度 (像素/秒):", self.scroll_speed_input)
         form_layout.addRow("固定弹幕持续(毫秒):", self.fixed_duration_input)
         form_layout.addRow("最大弹幕数(对象池):", self.max_danmaku_input)
+        form_layout.addRow("对象池硬上限:", self.pool_hard_cap_input)
         form_layout.addRow("最大滚动轨道数:", self.max_tracks_input)
         form_layout.addRow("轨道行间距比例:", self.line_spacing_input)
         form_layout.addRow("允许弹幕重叠:", self.allow_overlap_checkbox)
+        form_layout.addRow("跟随写入中的弹幕文件:", self.follow_file_checkbox)
         
         # 【新】AUMID输入行，包含输入框和按钮
         aumid_layout = QHBoxLayout()
@@ -222,13 +265,32 @@ class SettingsWidget(QWidget):
         aumid_layout.addWidget(self.discover_aumid_button)
         form_layout.addRow("--- 同步与行为 ---", None)
         form_layout.addRow("目标播放器AUMID:", aumid_layout)
+        form_layout.addRow("媒体监控方式:", self.monitor_backend_input)
+        form_layout.addRow("mpv IPC 路径:", self.mpv_ipc_path_input)
+        form_layout.addRow("回放时间线路径:", self.replay_path_input)
+        form_layout.addRow("附加会话:", self.extra_sessions_input)
         
         form_layout.addRow("置顶策略 (0:无):", self.ontop_strategy_input)
+        form_layout.addRow("--- 弹幕库 ---", None)
+        form_layout.addRow("弹幕库文件夹:", self.library_folders_input)
+        form_layout.addRow("按媒体标题自动匹配:", self.library_auto_match_checkbox)
+        form_layout.addRow("索引数据库路径:", self.library_db_path_input)
+        form_layout.addRow("--- 实时弹幕接入 ---", None)
+        form_layout.addRow("启用实时接入:", self.live_enabled_checkbox)
+        form_layout.addRow("监听地址:", self.live_listen_input)
+        form_layout.addRow("WebSocket 端口 (0:关闭):", self.live_websocket_port_input)
+        form_layout.addRow("接收队列容量:", self.live_queue_size_input)
+        form_layout.addRow("每秒最多显示条数:", self.live_max_rate_input)
         form_layout.addRow("--- 调试与日志 ---", None)
         form_layout.addRow("启用调试信息:", self.debug_mode_checkbox)
         form_layout.addRow("调试信息位置:", self.debug_pos_input)
         form_layout.addRow("日志级别:", self.log_level_input)
         form_layout.addRow("保存日志到文件:", self.log_to_file_checkbox)
+        form_layout.addRow("--- 性能 ---", None)
+        form_layout.addRow("自动画质调节:", self.auto_quality_checkbox)
+        form_layout.addRow("帧耗时预算(毫秒):", self.frame_budget_input)
+        form_layout.addRow("每帧生成预算(毫秒):", self.spawn_budget_input)
+        form_layout.addRow("在独立进程中解析弹幕:", self.parse_worker_checkbox)
         
         layout.addLayout(form_layout)
         
@@ -274,19 +336,12 @@ class SettingsWidget(QWidget):
             logging.info(f"用户选择了AUMID: {dialog.selected_aumid}")
             
     def _apply_settings(self):
-        """应用并保存设置。"""
+        """应用并保存设置。只有发生变化的设置会被应用到运行中的弹幕，弹幕不会重启。"""
         logging.info("正在应用并保存新设置...")
+        before = self.config.snapshot()
         self._update_config_from_inputs()
         self.config.save()
-        self._hot_reload_danmaku()
-
-    def _hot_reload_danmaku(self):
-        """热重载，如果弹幕正在运行，则重启以应用新设置。"""
-        if self.controller and self.controller.is_running():
-            logging.info("热重载：正在重启弹幕以应用新设置...")
-            self.main_window.stop_danmaku()
-            # 使用延时确保旧实例完全清理完毕
-            QTimer.singleShot(100, self.main_window.start_danmaku)
+        self.config.apply_changes(before)
     
     def _restore_defaults(self):
         """恢复默认设置。"""
@@ -294,22 +349,37 @@ class SettingsWidget(QWidget):
                                      QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
                                      QMessageBox.StandardButton.No)
         if reply == QMessageBox.StandardButton.Yes:
+            before = self.config.snapshot()
             self.config.restore_defaults()
             self._update_inputs_from_config() # 更新UI显示
-            self._hot_reload_danmaku()
+            self.config.apply_changes(before)
 
     def _update_inputs_from_config(self):
         """从config对象加载值并更新UI控件。"""
         # ... (与之前版本相同) ...
         self.allow_overlap_checkbox.setChecked(self.config.allow_overlap)
+        self.follow_file_checkbox.setChecked(self.config.follow_file)
         self.font_name_input.setText(self.config.font_name)
         self.font_size_input.setRange(10, 72)
         self.font_size_input.setValue(self.config.font_size)
+        self.honor_font_size_checkbox.setChecked(self.config.honor_font_size)
+        self.follow_player_window_checkbox.setChecked(self.config.follow_player_window)
         self.stroke_width_input.setRange(0, 10)
         self.stroke_width_input.setValue(self.config.stroke_width)
         self.opacity_input.setRange(0.0, 1.0)
         self.opacity_input.setSingleStep(0.1)
         self.opacity_input.setValue(self.config.opacity)
+        self.outline_method_input.clear()
+        self.outline_method_input.addItems(list(OUTLINE_METHODS))
+        self.outline_method_input.setCurrentText(self.config.outline_method)
+        self.long_text_mode_input.clear()
+        self.long_text_mode_input.addItems(['truncate', 'tile'])
+        self.long_text_mode_input.setCurrentText(self.config.long_text_mode)
+        self.max_pixmap_width_input.setRange(256, 8192)
+        self.max_pixmap_width_input.setSingleStep(256)
+        self.max_pixmap_width_input.setValue(self.config.max_pixmap_width)
+        self.max_lines_input.setRange(1, 10)
+        self.max_lines_input.setValue(self.config.max_lines)
         self.max_tracks_input.setRange(5, 50)
         self.max_tracks_input.setValue(self.config.max_tracks)
         self.line_spacing_input.setRange(0.0, 2.0)
@@ -322,7 +392,27 @@ class SettingsWidget(QWidget):
         self.fixed_duration_input.setValue(self.config.fixed_duration_ms)
         self.max_danmaku_input.setRange(50, 2000)
         self.max_danmaku_input.setValue(self.config.max_danmaku_count)
+        self.pool_hard_cap_input.setRange(50, 10000)
+        self.pool_hard_cap_input.setValue(self.config.pool_hard_cap)
         self.target_aumid_input.setText(self.config.target_aumid)
+        self.monitor_backend_input.clear()
+        self.monitor_backend_input.addItems(MONITOR_BACKENDS)
+        self.monitor_backend_input.setCurrentText(self.config.monitor_backend)
+        self.mpv_ipc_path_input.setText(self.config.mpv_ipc_path)
+        self.replay_path_input.setText(self.config.replay_path)
+        self.extra_sessions_input.setText(self.config.format_sessions(self.config.extra_sessions))
+        self.library_folders_input.setText('; '.join(self.config.library_folders))
+        self.library_auto_match_checkbox.setChecked(self.config.library_auto_match)
+        self.library_db_path_input.setText(self.config.library_db_path)
+        self.live_enabled_checkbox.setChecked(self.config.live_enabled)
+        self.live_listen_input.setText(self.config.live_listen)
+        self.live_websocket_port_input.setRange(0, 65535)
+        self.live_websocket_port_input.setValue(self.config.live_websocket_port)
+        self.live_queue_size_input.setRange(100, 1000000)
+        self.live_queue_size_input.setSingleStep(1000)
+        self.live_queue_size_input.setValue(self.config.live_queue_size)
+        self.live_max_rate_input.setRange(1, 5000)
+        self.live_max_rate_input.setValue(int(self.config.live_max_rate))
         self.ontop_strategy_input.clear()
         self.ontop_strategy_input.addItems(["0", "1", "2", "3"])
         self.ontop_strategy_input.setCurrentText(self.config.ontop_strategy)
@@ -334,26 +424,58 @@ class SettingsWidget(QWidget):
         self.log_level_input.addItems(['DEBUG', 'INFO', 'WARNING', 'ERROR'])
         self.log_level_input.setCurrentText(self.config.log_level.upper())
         self.log_to_file_checkbox.setChecked(self.config.log_to_file)
+        self.auto_quality_checkbox.setChecked(self.config.auto_quality)
+        self.frame_budget_input.setRange(2.0, 50.0)
+        self.frame_budget_input.setSingleStep(1.0)
+        self.frame_budget_input.setValue(self.config.frame_budget_ms)
+        self.spawn_budget_input.setRange(0.5, 16.0)
+        self.spawn_budget_input.setSingleStep(0.5)
+        self.spawn_budget_input.setValue(self.config.spawn_budget_ms)
+        self.parse_worker_checkbox.setChecked(self.config.parse_worker)
 
     def _update_config_from_inputs(self):
         """从UI控件读取值并更新到config对象。"""
         # ... (与之前版本相同) ...
         self.config.allow_overlap = self.allow_overlap_checkbox.isChecked()
+        self.config.follow_file = self.follow_file_checkbox.isChecked()
         self.config.font_name = self.font_name_input.text()
         self.config.font_size = self.font_size_input.value()
+        self.config.honor_font_size = self.honor_font_size_checkbox.isChecked()
+        self.config.follow_player_window = self.follow_player_window_checkbox.isChecked()
         self.config.stroke_width = self.stroke_width_input.value()
         self.config.opacity = self.opacity_input.value()
+        self.config.outline_method = self.outline_method_input.currentText()
+        self.config.long_text_mode = self.long_text_mode_input.currentText()
+        self.config.max_pixmap_width = self.max_pixmap_width_input.value()
+        self.config.max_lines = self.max_lines_input.value()
         self.config.scroll_speed = self.scroll_speed_input.value()
         self.config.fixed_duration_ms = self.fixed_duration_input.value()
         self.config.max_danmaku_count = self.max_danmaku_input.value()
+        self.config.pool_hard_cap = self.pool_hard_cap_input.value()
         self.config.max_tracks = self.max_tracks_input.value()
         self.config.line_spacing_ratio = self.line_spacing_input.value()
         self.config.target_aumid = self.target_aumid_input.text()
+        self.config.monitor_backend = self.monitor_backend_input.currentText()
+        self.config.mpv_ipc_path = self.mpv_ipc_path_input.text()
+        self.config.replay_path = self.replay_path_input.text()
+        self.config.extra_sessions = self.config.parse_sessions(self.extra_sessions_input.text())
+        self.config.library_folders = [f.strip() for f in self.library_folders_input.text().split(';') if f.strip()]
+        self.config.library_auto_match = self.library_auto_match_checkbox.isChecked()
+        self.config.library_db_path = self.library_db_path_input.text()
+        self.config.live_enabled = self.live_enabled_checkbox.isChecked()
+        self.config.live_listen = self.live_listen_input.text()
+        self.config.live_websocket_port = self.live_websocket_port_input.value()
+        self.config.live_queue_size = self.live_queue_size_input.value()
+        self.config.live_max_rate = self.live_max_rate_input.value()
         self.config.ontop_strategy = self.ontop_strategy_input.currentText()
         self.config.debug = self.debug_mode_checkbox.isChecked()
         self.config.debug_info_position = self.debug_pos_input.currentText()
         self.config.log_level = self.log_level_input.currentText()
         self.config.log_to_file = self.log_to_file_checkbox.isChecked()
+        self.config.auto_quality = self.auto_quality_checkbox.isChecked()
+        self.config.frame_budget_ms = self.frame_budget_input.value()
+        self.config.spawn_budget_ms = self.spawn_budget_input.value()
+        self.config.parse_worker = self.parse_worker_checkbox.isChecked()
 
 class MainWidget(QWidget):
     """主界面，包含路径选择和启停按钮。"""
@@ -2,76 +2,79 @@
 import asyncio
 import bisect
 import os
-import psutil
 import logging
-import sys
-import threading
+import time
 from datetime import timedelta
+from functools import partial
 
-from PyQt6.QtCore import QObject, QThread, pyqtSignal
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
 
 # 从本地模块导入
-from config_loader import get_config
-from danmaku_parser import load_from_xml
+from async_runtime import AsyncRuntime, AsyncTask, get_runtime
+from config_loader import ConfigChange, get_config
+from danmaku_parser import load_cached
 from danmaku_renderer import DanmakuWindow
 from danmaku_models import DanmakuData
+from playback_clock import PlaybackClock
 
-from monitors.base_monitor import BaseMediaMonitor
-IS_WINDOWS = sys.platform == 'win32'
-if IS_WINDOWS:
-    from monitors.windows_monitor import WindowsMediaMonitor, MediaMonitorError
-else:
-    logging.warning("非Windows平台，媒体同步功能将不可用。")
-    class MediaMonitorError(Exception): pass
-    class WindowsMediaMonitor(BaseMediaMonitor):
-        def __init__(self): logging.info("使用空的媒体监控器。")
-        async def list_sessions(self) -> list[dict]: return []
-        async def get_current_session_info(self) -> object | None: return None
+from monitors import BaseMediaMonitor, MediaMonitorError, SessionInfo, create_media_monitor
+
+# 弹幕库、跟随模式、实时接入和前台窗口监视只在启用时才导入
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    from danmaku_follow import DanmakuFileFollower
+    from danmaku_library import DanmakuLibrary
+    from foreground_watcher import ForegroundWatcher
+    from live_ingest import LiveBatch, LiveIngestServer
+    from parse_worker import ParseWorker
+
+
+def _start_times_of(all_danmaku) -> list[float]:
+    """弹幕开始时间的有序序列。解析工作进程返回的弹幕表直接提供共享内存中的开始时间列，不逐条读取。"""
+    column = getattr(all_danmaku, 'start_times', None)
+    return column if column is not None else [d.start_time for d in all_danmaku]
 
 class MediaSyncWorker(QObject):
     """
-    媒体同步工作者。在一个独立的QThread中运行，避免阻塞主GUI线程。
-    它负责周期性地调用监控器的异步方法来获取媒体信息。
+    媒体同步工作者。订阅协程运行在共享的异步运行时中，避免阻塞主GUI线程。
+    它负责订阅监控器中所有会话的状态变化，并把变化转发给主线程。
     """
-    session_info_updated = pyqtSignal(object)
+    # {aumid: 会话信息 | None}，只包含发生了变化的会话；监控出错时为 None
+    sessions_updated = pyqtSignal(object)
 
-    def __init__(self, monitor: BaseMediaMonitor):
+    # 停止时等待订阅协程处理完取消（关闭监控器的连接）的最长时间（秒）
+    STOP_TIMEOUT_S = 0.5
+
+    def __init__(self, monitor: BaseMediaMonitor, runtime: AsyncRuntime):
         super().__init__()
         self.monitor = monitor
+        self._runtime = runtime
         self._is_running = True
-        self.loop = None
-        self.main_task = None
+        self._task: AsyncTask | None = None
 
     async def _loop_logic(self):
         """
-        异步循环，持续获取媒体信息。
-        【已修正】增加了对 CancelledError 的捕获。
+        异步循环，订阅监控器的状态变化并转发给主线程（信号跨线程排队送达）。
+        只有状态真正变化（状态、标题、进度跳转等）时才会发出信号；
+        支持推送的监控器在没有变化时不会唤醒事件循环。
         """
-        logging.info("媒体同步工作线程循环已启动。")
+        logging.info("媒体同步任务已启动。")
         while self._is_running:
             try:
-                # 等待媒体信息
-                info = await self.monitor.get_current_session_info()
-                
-                # 在 await 之后再次检查标志，因为在等待期间可能已经被停止
-                if not self._is_running:
-                    break
-                
-                # 发送获取到的信息
-                self.session_info_updated.emit(info)
-                
-                # 短暂休眠，避免CPU占用过高
-                await asyncio.sleep(0.1)
+                async for changes in self.monitor.subscribe_all():
+                    # 在 await 之后再次检查标志，因为在等待期间可能已经被停止
+                    if not self._is_running:
+                        break
+                    self.sessions_updated.emit(changes)
 
             except asyncio.CancelledError:
-                # 当任务被外部（如 hot_reload）取消时，会进入这里。
-                # 这是预期的行为，记录日志并跳出循环，让线程干净地结束。
+                # stop 取消了任务。这是预期的行为，跳出循环并关闭监控器
                 logging.info("媒体同步任务被取消，正常关闭中...")
                 break
             except Exception as e:
-                # 捕获其他在获取媒体信息时可能发生的错误
-                logging.error(f"在工作线程中获取媒体信息时出错: {e}")
-                self.session_info_updated.emit(None)
+                # 捕获其他在获取媒体信息时可能发生的错误，稍后重新订阅
+                logging.error(f"获取媒体信息时出错: {e}")
+                self.sessions_updated.emit(None)
                 try:
                     # 如果发生错误，等待稍长一点时间再重试
                     await asyncio.sleep(1)
@@ -79,175 +82,766 @@ class MediaSyncWorker(QObject):
                     # 如果在等待期间也被取消，同样跳出循环
                     logging.info("媒体同步任务在错误后等待时被取消。")
                     break
-                    
-        logging.info("媒体同步工作线程循环已正常退出。")
 
-    def run(self):
-        """此方法在QThread启动后被调用。"""
         try:
-            self.loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(self.loop)
-            self.main_task = self.loop.create_task(self._loop_logic())
-            self.loop.run_until_complete(self.main_task)
+            await self.monitor.close()
         except Exception as e:
-            # 在这里捕获 _loop_logic 中未处理的意外错误
-            logging.error(f"asyncio 事件循环中发生意外错误: {e}")
+            logging.warning(f"关闭媒体监控器时出错: {e}")
+        logging.info("媒体同步任务已正常退出。")
+
+    def start(self):
+        self._task = self._runtime.submit(self._loop_logic(), name="media-sync")
 
     def stop(self):
-        """请求停止工作线程的循环。"""
-        logging.info("正在请求停止媒体同步工作线程...")
+        """停止订阅，等待监控器关闭连接。"""
+        logging.info("正在请求停止媒体同步任务...")
         self._is_running = False
-        if self.main_task and not self.main_task.done():
-            self.main_task.cancel()
+        if self._task and not self._task.cancel(wait=self.STOP_TIMEOUT_S):
+            logging.warning(f"媒体同步任务未在 {self.STOP_TIMEOUT_S * 1000:.0f} 毫秒内结束。")
+        self._task = None
+
+
+class SessionBinding:
+    """
+    一个会话绑定：一个播放器会话（按 AUMID 匹配）、它的弹幕文件和它的弹幕窗口。
+    每个绑定有各自的播放时钟和弹幕索引；弹幕解析结果、字体和排版缓存在进程内共享，
+    媒体监控循环和前台窗口监视由控制器统一持有。
+    """
+    def __init__(self, aumid: str, danmaku_path: str, all_danmaku: list[DanmakuData], config,
+                 time_source=None, seed: int | None = None, seek_threshold_s: float = 2.0,
+                 follower: 'DanmakuFileFollower | None' = None):
+        self.aumid = aumid
+        self.config = config
+        self.seek_threshold_s = seek_threshold_s
+        self._clock = PlaybackClock(time_source=time_source or time.monotonic)
+        self.last_info: object | None = None
+        # 正在后台加载的弹幕文件，加载结果只在与它相同时才被采用
+        self.loading_path: str | None = None
+        self._follower: 'DanmakuFileFollower | None' = None
+        self.renderer = DanmakuWindow(total_danmaku_count=len(all_danmaku), time_source=time_source, seed=seed)
+        self.renderer.frame_ticked.connect(self._on_frame_tick)
+        self._set_danmaku_list(danmaku_path, all_danmaku, follower)
+
+    def close(self):
+        self._set_follower(None)
+        self.renderer.close()
+        self.renderer.deleteLater()
+
+    def set_danmaku(self, danmaku_path: str, all_danmaku: list[DanmakuData],
+                    follower: 'DanmakuFileFollower | None' = None):
+        """
+        更换绑定的弹幕文件（如播放器切换到了下一集）。弹幕窗口保持不变；
+        播放时钟被重置，下一次会话信息会被当作首次同步并回填弹幕。
+        """
+        self._set_danmaku_list(danmaku_path, all_danmaku, follower)
+        # 之前请求的后台加载结果不再采用
+        self.loading_path = None
+        self._clock.reset()
+        self.renderer.clear_danmaku()
+        self.renderer.set_total_danmaku_count(len(all_danmaku))
+
+    def _set_danmaku_list(self, danmaku_path: str, all_danmaku: list[DanmakuData],
+                          follower: 'DanmakuFileFollower | None'):
+        self.danmaku_path = danmaku_path
+        # 来自解析缓存的列表可能被其他绑定共享，只读；跟随模式下的列表归本绑定所有，可以追加
+        self.all_danmaku = all_danmaku
+        self._owns_danmaku = follower is not None
+        self.danmaku_start_times = _start_times_of(all_danmaku)
+        self._danmaku_idx = 0
+        self._set_follower(follower)
+
+    def _set_follower(self, follower: 'DanmakuFileFollower | None'):
+        if self._follower:
+            self._follower.stop()
+            self._follower.deleteLater()
+        self._follower = follower
+        if follower:
+            follower.danmaku_appended.connect(self.append_danmaku)
+            follower.danmaku_replaced.connect(self._on_danmaku_replaced)
+            follower.start()
+
+    def rebind(self, aumid: str):
+        """改为跟随另一个播放器会话。播放时钟被重置，下一次会话信息会被当作首次同步。"""
+        self.aumid = aumid
+        self.last_info = None
+        self._clock.reset()
+
+    def set_follower(self, follower: 'DanmakuFileFollower | None'):
+        """
+        在运行中开启或关闭跟随模式，不重置播放时钟和屏幕上的弹幕。
+        开启时换成跟随器读取的列表（归本绑定所有），弹幕索引停在同一开始时间处。
+        """
+        if follower is not None:
+            times = self.danmaku_start_times
+            next_start = times[self._danmaku_idx] if self._danmaku_idx < len(times) else float('inf')
+            self.all_danmaku = follower.read_initial()
+            self._owns_danmaku = True
+            self.danmaku_start_times = [d.start_time for d in self.all_danmaku]
+            self._danmaku_idx = bisect.bisect_left(self.danmaku_start_times, next_start)
+            self.renderer.set_total_danmaku_count(len(self.all_danmaku))
+        self._set_follower(follower)
+
+    def append_danmaku(self, new_danmaku: list[DanmakuData]):
+        """
+        把弹幕文件新增的弹幕按开始时间插入有序列表，不重新排序整个列表。
+        直播录制的新弹幕通常在末尾，插入的代价为 O(1)；插到弹幕索引之前的弹幕已经错过了生成时机，
+        索引随之后移，若此刻仍应在屏幕上则立即以迟到的时间生成。
+        """
+        if not self._owns_danmaku:
+            self.all_danmaku = list(self.all_danmaku)
+            self.danmaku_start_times = list(self.danmaku_start_times)
+            self._owns_danmaku = True
+        now = self._clock.now()
+        position = self._clock.position(now) if self._clock.is_playing else None
+        max_lifetime = self.renderer.max_lifetime()
+        late = []
+        for d in sorted(new_danmaku, key=lambda x: x.start_time):
+            idx = bisect.bisect_right(self.danmaku_start_times, d.start_time)
+            self.danmaku_start_times.insert(idx, d.start_time)
+            self.all_danmaku.insert(idx, d)
+            if idx < self._danmaku_idx:
+                self._danmaku_idx += 1
+                if position is not None and position - d.start_time < max_lifetime:
+                    late.append((d, position - d.start_time))
+        self.renderer.set_total_danmaku_count(len(self.all_danmaku))
+        if late:
+            self.renderer.add_danmaku_batch(late, now)
+
+    def add_live_danmaku(self, items: list[tuple[DanmakuData, float | None]]) -> bool:
+        """
+        实时接入的弹幕。带媒体时间的并入时间轴，其余立即显示。
+
+        Returns:
+            bool: 立即显示的弹幕是否已交给渲染器；动画未推进（暂停或窗口隐藏）时丢弃它们并返回 False。
+        """
+        timeline = [d for d, media_time in items if media_time is not None]
+        if timeline:
+            self.append_danmaku(timeline)
+        if not self.renderer.is_running():
+            return False
+        immediate = [(d, 0.0) for d, media_time in items if media_time is None]
+        if immediate:
+            self.renderer.add_danmaku_batch(immediate, self._clock.now())
+        return True
+
+    def _on_danmaku_replaced(self, all_danmaku: list[DanmakuData]):
+        """弹幕文件被重写，换成重新解析的列表并在当前进度重新同步。"""
+        self.all_danmaku = all_danmaku
+        self.danmaku_start_times = [d.start_time for d in all_danmaku]
+        self._danmaku_idx = 0
+        self.renderer.set_total_danmaku_count(len(all_danmaku))
+        if self._clock.is_valid:
+            self._handle_seek(self._clock.position(), 0.0)
+
+    def update_debug_info(self):
+        """刷新调试面板上的播放信息。会话信息只在变化时送达，进度由播放时钟外推。"""
+        info = self.last_info
+        if not info:
+            self.renderer.update_debug_playback_info("N/A", "00:00:00", "00:00:00")
+            return
+        pos_str = SessionInfo.format_time(timedelta(seconds=self._clock.position()))
+        dur_str = SessionInfo.format_time(info.duration)
+        self.renderer.update_debug_playback_info(info.title, pos_str, dur_str)
+
+    def on_session_info(self, info: object):
+        """收到该绑定的会话的新状态。info 为 None 表示会话已不存在。"""
+        self.last_info = info
+        if not info:
+            self.renderer.pause()
+            self.update_debug_info()
+            return
+
+        current_position = info.position.total_seconds()
+        is_playing = info.status == "PLAYING"
+        rate = getattr(info, 'playback_rate', 1.0) or 1.0
+        # 单纯的速率改变由时钟重新锚定处理，返回的误差为0，不会被当作跳转；同时发生的跳转仍会报告
+        error = self._clock.update(current_position, playing=is_playing, rate=rate)
+        self.renderer.set_playback_rate(rate)
+        if abs(error) > self.seek_threshold_s:
+            self._handle_seek(current_position, error)
+        self.update_debug_info()
+
+        if not is_playing:
+            self.renderer.pause()
+            return
+        self.renderer.resume()
+
+    def _handle_seek(self, position: float, error: float):
+        """播放位置发生跳转（或首次同步）时，重置屏幕上的弹幕和弹幕索引。"""
+        previous = position - error if error != float('inf') else -1.0
+        logging.info(f"[{self.aumid}] 检测到播放跳转: {previous:.1f}s -> {position:.1f}s，正在重置弹幕...")
+        self.renderer.clear_danmaku()
+        # 回溯一个最长存活时间的窗口，这段时间内出现的弹幕此刻仍应在屏幕上
+        backfill_start = bisect.bisect_left(self.danmaku_start_times, position - self.renderer.max_lifetime())
+        self._danmaku_idx = bisect.bisect_right(self.danmaku_start_times, position)
+        # 根据回填数量和接下来一个弹幕生命周期内的弹幕数量，预先扩容对象池
+        upcoming_end = bisect.bisect_right(self.danmaku_start_times,
+                                           position + self.renderer.estimated_lifetime())
+        self.renderer.reserve_pool(upcoming_end - backfill_start)
+        items = [(d, position - d.start_time) for d in self.all_danmaku[backfill_start:self._danmaku_idx]]
+        if items:
+            restored = self.renderer.backfill(items)
+            logging.info(f"跳转后回填了 {restored} 条弹幕。")
+
+    def _on_frame_tick(self, now: float):
+        """
+        渲染器每帧调用一次。按播放时钟外推出的精确位置生成到期的弹幕，
+        并把每条弹幕的迟到时间交给渲染器，使其出现在此刻应在的位置。
+        """
+        if not self._clock.is_playing:
+            return
+        position = self._clock.position(now)
+        # 窗口隐藏期间没有帧，重新显示时跳过那些此刻已不可能还在屏幕上的弹幕
+        self._danmaku_idx = bisect.bisect_left(self.danmaku_start_times, position - self.renderer.max_lifetime(),
+                                               lo=self._danmaku_idx)
+        end_idx = bisect.bisect_right(self.danmaku_start_times, position, lo=self._danmaku_idx)
+        if end_idx > self._danmaku_idx:
+            due = self.all_danmaku[self._danmaku_idx:end_idx]
+            self.renderer.add_danmaku_batch([(d, position - d.start_time) for d in due], now)
+            self._danmaku_idx = end_idx
 
 
 class DanmakuController(QObject):
+    """
+    弹幕控制器。管理一个或多个会话绑定（播放器会话、弹幕文件、弹幕窗口），
+    所有绑定共用一个媒体监控循环、一个前台窗口监视器以及进程内的解析、字体和排版缓存。
+    """
     error_occurred = pyqtSignal(str)
     sessions_discovered = pyqtSignal(list)
+    # 弹幕停止时发射，包括后台加载主会话的弹幕文件失败而自行停止
+    stopped = pyqtSignal()
 
-    def __init__(self):
+    # 采样与外推位置的误差超过该值（秒）时视为用户跳转了进度
+    SEEK_THRESHOLD_S = 2.0
+    # 调试模式下刷新调试面板播放进度的间隔（毫秒）
+    DEBUG_REFRESH_MS = 250
+    # 为界面列出媒体会话的超时（秒）
+    DISCOVERY_TIMEOUT_S = 10.0
+
+    def __init__(self, monitor: BaseMediaMonitor | None = None, time_source=None, seed: int | None = None,
+                 async_load: bool = False):
+        """
+        Args:
+            monitor (BaseMediaMonitor | None): 注入的媒体监控器（如 ReplayMediaMonitor），默认按配置创建。
+            time_source (callable | None): 注入的时间源（如 VirtualClock），同时用于播放时钟和渲染器。
+            seed (int | None): 渲染器的随机数种子，与虚拟时钟一起使回放结果可复现。
+            async_load (bool): 是否在后台加载弹幕文件。控制面板使用，主线程不等待解析（或解析工作进程），
+                结果加载完成后再换上；无界面模式和回放中同步加载。
+        """
         super().__init__()
         self.config = get_config()
+        self.async_load = async_load
         
-        try:
-            self.monitor: BaseMediaMonitor = WindowsMediaMonitor()
-        except MediaMonitorError as e:
-            logging.error(f"媒体监控器初始化失败: {e}")
-            self.error_occurred.emit(f"媒体监控器初始化失败:\n{e}\n同步功能将不可用。")
-            self.monitor = None
+        if monitor is not None:
+            self.monitor: BaseMediaMonitor = monitor
+        else:
+            try:
+                self.monitor = create_media_monitor(
+                    self.config.monitor_backend, mpv_ipc_path=self.config.mpv_ipc_path,
+                    replay_path=self.config.replay_path)
+            except MediaMonitorError as e:
+                logging.error(f"媒体监控器初始化失败: {e}")
+                self.error_occurred.emit(f"媒体监控器初始化失败:\n{e}\n同步功能将不可用。")
+                self.monitor = None
+        self._time_source = time_source
+        self._seed = seed
 
-        self._self_proc_name = psutil.Process(os.getpid()).name().lower()
+        # 本程序的进程名，用于判断控制面板是否在前台；开始监视前台窗口时才获取
+        self._self_proc_name = ''
         
-        self.renderer: DanmakuWindow | None = None
-        self.all_danmaku: list[DanmakuData] = []
-        self.danmaku_start_times: list[float] = []
-
-        self._danmaku_idx = 0
-        self._last_known_position = -1.0
+        self._bindings: list[SessionBinding] = []
+        # 每个 AUMID 最近一次的会话状态，新加入的绑定据此立即同步
+        self._sessions: dict[str, object] = {}
         self._is_running_flag = False
         
-        self._worker_thread: QThread | None = None
+        # 媒体监控、会话发现和实时接入共用的异步运行时
+        self._runtime = get_runtime()
         self._worker: MediaSyncWorker | None = None
+        self._foreground: 'ForegroundWatcher | None' = None
+        # 弹幕库在启停之间保留，配置的文件夹改变时才重新创建
+        self.library: 'DanmakuLibrary | None' = None
+        self.live_ingest: 'LiveIngestServer | None' = None
+        # 解析工作进程同样在启停之间保留
+        self._parse_worker: 'ParseWorker | None' = None
+
+        self._run_worker = True
+
+        self._debug_timer = QTimer(self)
+        self._debug_timer.timeout.connect(self._update_debug_info)
+        self.config.add_listener(self._on_config_changed)
         
     def _setup_worker(self):
         if not self.monitor: return
-        logging.debug("正在设置新的工作线程和工作者对象...")
-        self._worker_thread = QThread()
-        self._worker = MediaSyncWorker(self.monitor)
-        self._worker.moveToThread(self._worker_thread)
-        self._worker_thread.started.connect(self._worker.run)
-        self._worker.session_info_updated.connect(self._on_session_info_received)
-        self._worker_thread.finished.connect(self._worker_thread.deleteLater)
-        self._worker_thread.finished.connect(self._worker.deleteLater)
+        self._worker = MediaSyncWorker(self.monitor, self._runtime)
+        self._worker.sessions_updated.connect(self._on_sessions_changed)
 
     def is_running(self) -> bool:
         return self._is_running_flag
 
-    def start(self, danmaku_path: str):
+    @property
+    def renderer(self) -> DanmakuWindow | None:
+        """主会话（配置中的目标会话）的弹幕窗口。"""
+        return self._bindings[0].renderer if self._bindings else None
+
+    @property
+    def bindings(self) -> list[SessionBinding]:
+        return list(self._bindings)
+
+    def library_enabled(self) -> bool:
+        """是否配置了弹幕库并开启了按媒体标题自动匹配。"""
+        return bool(self.config.library_folders) and self.config.library_auto_match
+
+    def _ensure_library(self):
+        """按配置创建弹幕库并在后台扫描；文件夹和数据库路径都未改变时沿用已有的弹幕库。"""
+        folders = [os.path.abspath(f) for f in self.config.library_folders if os.path.isdir(f)]
+        if self.library and self.library.folders == folders and self.library.db_path == self.config.library_db_path:
+            return
+        if self.library:
+            self.library.stop()
+            self.library.deleteLater()
+            self.library = None
+        if not folders:
+            return
+        import sqlite3
+        from danmaku_library import DanmakuLibrary
+        try:
+            self.library = DanmakuLibrary(self.config.library_db_path, folders, parent=self)
+        except sqlite3.Error as e:
+            logging.error(f"无法打开弹幕库索引 '{self.config.library_db_path}': {e}")
+            return
+        self.library.loader = self._parse_loader()
+        self.library.start()
+
+    def _apply_parse_worker(self):
+        """按配置启动或停止解析工作进程，弹幕库的预取也使用同一个解析函数。"""
+        if self.config.parse_worker and self._parse_worker is None:
+            from parse_worker import ParseWorker
+            self._parse_worker = ParseWorker()
+            self._parse_worker.start()
+        elif not self.config.parse_worker and self._parse_worker is not None:
+            self._parse_worker.stop()
+            self._parse_worker = None
+        if self.library:
+            self.library.loader = self._parse_loader()
+
+    def _parse_loader(self):
+        """load_cached 使用的解析函数，None 表示在本进程中解析。"""
+        return self._parse_worker.load if self._parse_worker else None
+
+    def start(self, danmaku_path: str, run_worker: bool = True):
+        """
+        加载弹幕文件并启动渲染。配置中的目标会话绑定到 danmaku_path，
+        配置中的附加会话（extra_sessions）各自绑定到自己的弹幕文件。
+        启用了弹幕库自动匹配时，各会话的弹幕文件随播放器的媒体标题自动切换。
+
+        Args:
+            danmaku_path (str): 主会话的 XML 弹幕文件路径。启用自动匹配时可为空，等待标题匹配。
+            run_worker (bool): 是否启动媒体同步工作线程。为 False 时由调用者通过
+                feed_session_info 提供会话信息（用于虚拟时间下的回放）。
+        """
         if self._is_running_flag:
             logging.warning("弹幕已经正在运行。")
             return
         logging.info("正在初始化弹幕...")
-        self.all_danmaku = load_from_xml(danmaku_path)
-        if not self.all_danmaku:
-            msg = f"无法从 '{danmaku_path}' 加载或解析弹幕文件。"
-            logging.error(msg)
-            self.error_occurred.emit(msg + "\n请检查文件路径或文件格式是否正确。")
-            return
-        self.danmaku_start_times = [d.start_time for d in self.all_danmaku]
-        self.renderer = DanmakuWindow(total_danmaku_count=len(self.all_danmaku))
-        self.renderer.show()
+        self._apply_parse_worker()
+        self._ensure_library()
+        if not self._create_binding(self.config.target_aumid, danmaku_path):
+            return
         self._is_running_flag = True
-        if self.monitor:
-            self._setup_worker()
-            self._worker_thread.start()
+        for aumid, path in self.config.extra_sessions:
+            self.add_session(aumid, path)
+        if self.config.live_enabled:
+            self._start_live_ingest()
+        self._run_worker = run_worker
+        self._start_monitoring()
         logging.info("弹幕已启动。")
 
+    def _start_monitoring(self):
+        if not (self.monitor and self._run_worker):
+            return
+        import psutil
+        from foreground_watcher import create_foreground_watcher
+        self._self_proc_name = psutil.Process(os.getpid()).name().lower()
+        # 前台窗口由事件驱动的监视器维护，这里只读取它缓存的结果
+        self._foreground = create_foreground_watcher(self)
+        self._foreground.foreground_changed.connect(self._update_visibility)
+        self._foreground.foreground_geometry_changed.connect(self._update_visibility)
+        self._setup_worker()
+        self._worker.start()
+        if self.config.debug:
+            self._debug_timer.start(self.DEBUG_REFRESH_MS)
+
+    def _stop_monitoring(self):
+        self._debug_timer.stop()
+        if self._foreground:
+            self._foreground.stop()
+            self._foreground.deleteLater()
+            self._foreground = None
+        if self._worker:
+            self._worker.stop()
+            self._worker.deleteLater()
+        self._worker = None
+
+    def add_session(self, aumid: str, danmaku_path: str) -> bool:
+        """
+        在运行中增加一个会话绑定（如画中画播放器）。同一 AUMID 只能绑定一次。
+
+        Returns:
+            bool: 是否成功加载弹幕并创建了弹幕窗口。
+        """
+        if not self._is_running_flag:
+            logging.warning("弹幕未运行，无法增加会话。")
+            return False
+        if any(b.aumid == aumid for b in self._bindings):
+            logging.warning(f"会话 {aumid} 已经绑定了弹幕文件。")
+            return False
+        binding = self._create_binding(aumid, danmaku_path)
+        if binding is None:
+            return False
+        if aumid in self._sessions:
+            binding.on_session_info(self._sessions[aumid])
+        self._update_visibility()
+        return True
+
+    def remove_session(self, aumid: str):
+        """移除一个会话绑定并关闭它的弹幕窗口。主会话需通过 stop 停止。"""
+        for binding in self._bindings[1:]:
+            if binding.aumid == aumid:
+                self._bindings.remove(binding)
+                binding.close()
+                logging.info(f"已移除会话绑定: {aumid}")
+                return
+
+    def _create_binding(self, aumid: str, danmaku_path: str) -> SessionBinding | None:
+        # 启用自动匹配时允许尚未选择弹幕文件，收到媒体标题后由弹幕库匹配
+        waiting_for_match = not danmaku_path and self.library_enabled()
+        in_background = not waiting_for_match and self._loads_in_background(danmaku_path)
+        if waiting_for_match or in_background:
+            # 后台加载时先以空列表创建绑定，加载完成后再换上
+            all_danmaku, follower = [], None
+        else:
+            all_danmaku, follower = self._load_danmaku(danmaku_path)
+            # 跟随模式下文件可能刚开始写入，还没有弹幕
+            if not all_danmaku and follower is None:
+                self._report_load_error(danmaku_path)
+                return None
+        binding = SessionBinding(aumid, danmaku_path, all_danmaku, self.config, time_source=self._time_source,
+                                 seed=self._seed, seek_threshold_s=self.SEEK_THRESHOLD_S, follower=follower)
+        binding.renderer.show()
+        self._bindings.append(binding)
+        logging.info(f"会话 {aumid} 已绑定到 {danmaku_path or '（等待按标题匹配）'}")
+        if in_background:
+            self._load_in_background(binding, danmaku_path, partial(self._on_initial_load, binding))
+        return binding
+
+    def _on_initial_load(self, binding: SessionBinding, all_danmaku: list[DanmakuData]):
+        """绑定创建时在后台加载的弹幕文件送达。加载失败时停止弹幕（主会话）或移除该会话。"""
+        if not all_danmaku:
+            self._report_load_error(binding.danmaku_path)
+            if binding is self._bindings[0]:
+                self.stop()
+            else:
+                self.remove_session(binding.aumid)
+            return
+        self._switch_danmaku(binding, binding.danmaku_path, all_danmaku)
+
+    def _report_load_error(self, danmaku_path: str):
+        msg = f"无法从 '{danmaku_path}' 加载或解析弹幕文件。"
+        logging.error(msg)
+        self.error_occurred.emit(msg + "\n请检查文件路径或文件格式是否正确。")
+
+    def _switch_danmaku(self, binding: SessionBinding, danmaku_path: str, all_danmaku: list[DanmakuData],
+                        follower: 'DanmakuFileFollower | None' = None):
+        """后台加载完成后更换绑定的弹幕文件，并按该会话最近的状态重新同步。"""
+        binding.set_danmaku(danmaku_path, all_danmaku, follower)
+        if binding.aumid in self._sessions:
+            binding.on_session_info(self._sessions[binding.aumid])
+
+    def _loads_in_background(self, danmaku_path: str) -> bool:
+        """该文件是否在后台加载。跟随模式的首次读取是增量解析，仍在主线程中进行。"""
+        return self.async_load and not (self.config.follow_file and os.path.isfile(danmaku_path))
+
+    def _load_in_background(self, binding: SessionBinding, danmaku_path: str, on_loaded, load=None):
+        """
+        在异步运行时的工作线程中加载弹幕文件，主线程不等待解析或解析工作进程。
+        完成后经排队的信号在主线程中调用 on_loaded(弹幕列表)，加载失败时列表为空；
+        结果送达前绑定已被移除，或又为它请求了另一个文件时，结果被丢弃。
+
+        Args:
+            load (callable | None): 加载函数，默认为使用当前解析函数的 load_cached。
+        """
+        binding.loading_path = danmaku_path
+        load = load or partial(load_cached, loader=self._parse_loader())
+
+        def deliver(all_danmaku):
+            if binding not in self._bindings or binding.loading_path != danmaku_path:
+                logging.debug(f"丢弃过期的弹幕加载结果: {danmaku_path}")
+                return
+            binding.loading_path = None
+            on_loaded(all_danmaku)
+
+        def fail(error: Exception):
+            logging.error(f"后台加载弹幕文件 '{danmaku_path}' 时出错: {error!r}")
+            deliver([])
+
+        self._runtime.call(asyncio.to_thread(load, danmaku_path), on_result=deliver, on_error=fail,
+                           name="load-danmaku")
+
+    def _load_danmaku(self, danmaku_path: str) -> tuple[list[DanmakuData], 'DanmakuFileFollower | None']:
+        """
+        加载弹幕文件。跟随模式（follow_file）下增量解析文件并继续监视新增内容，
+        返回的列表归调用者所有；否则使用共享的解析缓存。
+        """
+        if self.config.follow_file and os.path.isfile(danmaku_path):
+            from danmaku_follow import DanmakuFileFollower
+            follower = DanmakuFileFollower(danmaku_path)
+            return follower.read_initial(), follower
+        return load_cached(danmaku_path, self._parse_loader()), None
+
+    def _start_live_ingest(self):
+        from live_ingest import LiveIngestServer
+        self.live_ingest = LiveIngestServer(self.config.live_listen, queue_size=self.config.live_queue_size,
+                                            max_rate=self.config.live_max_rate,
+                                            websocket_port=self.config.live_websocket_port, parent=self)
+        self.live_ingest.batch_ready.connect(self._on_live_batch)
+        if not self.live_ingest.start():
+            self.error_occurred.emit(f"实时弹幕接入服务器无法在 {self.config.live_listen} 上监听，实时接入将不可用。")
+            self.live_ingest.deleteLater()
+            self.live_ingest = None
+
+    def _on_live_batch(self, batch: 'LiveBatch'):
+        """接入服务器送达的一批实时弹幕，交给主会话的弹幕窗口。"""
+        if not self._is_running_flag or not self.live_ingest: return
+        shown = self._bindings[0].add_live_danmaku(batch.items)
+        self.live_ingest.record_delivery(batch, shown)
+
+    def _stop_live_ingest(self):
+        if self.live_ingest:
+            self.live_ingest.stop()
+            self.live_ingest.deleteLater()
+            self.live_ingest = None
+
     def stop(self):
         if not self._is_running_flag: return
-        if self._worker: self._worker.stop()
-        if self._worker_thread and self._worker_thread.isRunning():
-            self._worker_thread.quit()
-            if not self._worker_thread.wait(500):
-                logging.warning("工作线程未在500毫秒内正常停止，正在强制终止。")
-                self._worker_thread.terminate()
-                self._worker_thread.wait()
-        self._worker_thread = None
-        self._worker = None
-        if self.renderer:
-            self.renderer.close()
-            self.renderer = None
-        self.all_danmaku.clear()
-        self.danmaku_start_times.clear()
-        self._danmaku_idx = 0
-        self._last_known_position = -1.0
+        self._stop_live_ingest()
+        self._stop_monitoring()
+        for binding in self._bindings:
+            binding.close()
+        self._bindings.clear()
+        self._sessions.clear()
         self._is_running_flag = False
         logging.info("弹幕已停止并清理资源。")
+        self.stopped.emit()
+
+    def _on_config_changed(self, change: ConfigChange):
+        """
+        配置变更后只调整受影响的部分：弹幕窗口就地应用显示设置，会话绑定、媒体监控、
+        弹幕库和实时接入各自只在相关配置改变时重建。弹幕窗口不会被重建，播放不中断。
+        """
+        if 'log_level' in change:
+            logging.getLogger().setLevel(getattr(logging, self.config.log_level.upper(), logging.INFO))
+        if change.any('monitor_backend', 'mpv_ipc_path', 'replay_path'):
+            self._recreate_monitor()
+        if 'parse_worker' in change:
+            self._apply_parse_worker()
+        if not self._is_running_flag:
+            return
+        if change.any('library_folders', 'library_db_path'):
+            self._ensure_library()
+        for binding in self._bindings:
+            binding.renderer.apply_config_change(change)
+        if 'target_aumid' in change:
+            primary = self._bindings[0]
+            logging.info(f"主会话改为跟随 {self.config.target_aumid}")
+            primary.rebind(self.config.target_aumid)
+            self._on_sessions_changed({primary.aumid: self._sessions.get(primary.aumid)})
+        if 'extra_sessions' in change:
+            self._apply_extra_sessions(dict(change.old('extra_sessions')), dict(change.new('extra_sessions')))
+        if 'follow_file' in change:
+            from danmaku_follow import DanmakuFileFollower
+            for binding in self._bindings:
+                if binding.danmaku_path and os.path.isfile(binding.danmaku_path):
+                    binding.set_follower(DanmakuFileFollower(binding.danmaku_path) if self.config.follow_file else None)
+        if 'debug' in change:
+            if self.config.debug and self._worker:
+                self._debug_timer.start(self.DEBUG_REFRESH_MS)
+            else:
+                self._debug_timer.stop()
+            self._update_debug_info()
+        if change.any('live_enabled', 'live_listen', 'live_websocket_port', 'live_queue_size'):
+            self._stop_live_ingest()
+            if self.config.live_enabled:
+                self._start_live_ingest()
+        elif 'live_max_rate' in change and self.live_ingest:
+            self.live_ingest.max_rate = self.config.live_max_rate
+        if 'follow_player_window' in change:
+            self._update_visibility()
+
+    def _recreate_monitor(self):
+        """按新的监控配置重建媒体监控器，运行中时只重启监控循环，弹幕窗口保持不变。"""
+        running = self._worker is not None
+        if running:
+            self._stop_monitoring()
+        try:
+            self.monitor = create_media_monitor(
+                self.config.monitor_backend, mpv_ipc_path=self.config.mpv_ipc_path,
+                replay_path=self.config.replay_path)
+        except MediaMonitorError as e:
+            logging.error(f"媒体监控器初始化失败: {e}")
+            self.error_occurred.emit(f"媒体监控器初始化失败:\n{e}\n同步功能将不可用。")
+            self.monitor = None
+        if running:
+            self._start_monitoring()
 
-    def _format_time_for_debug(self, duration: timedelta) -> str:
-        """辅助方法，用于格式化timedelta为时间字符串。"""
-        if not isinstance(duration, timedelta): return "00:00:00"
-        ts = int(duration.total_seconds())
-        return f"{ts // 3600:02d}:{(ts % 3600) // 60:02d}:{ts % 60:02d}"
+    def _apply_extra_sessions(self, old: dict[str, str], new: dict[str, str]):
+        """按附加会话配置的差异增删会话绑定；只是弹幕文件改变的会话就地更换弹幕文件。"""
+        for aumid in old.keys() - new.keys():
+            self.remove_session(aumid)
+        for aumid, path in new.items():
+            binding = next((b for b in self._bindings[1:] if b.aumid == aumid), None)
+            if binding is None:
+                self.add_session(aumid, path)
+            elif old.get(aumid) != path:
+                if self._loads_in_background(path):
+                    self._load_in_background(binding, path, partial(self._on_extra_session_loaded, binding, path))
+                    continue
+                all_danmaku, follower = self._load_danmaku(path)
+                if all_danmaku or follower is not None:
+                    self._switch_danmaku(binding, path, all_danmaku, follower)
 
-    def _on_session_info_received(self, info: object):
-        if not self.renderer or not self._is_running_flag: return
-            
-        foreground_aumid = self.monitor.get_foreground_window_aumid()
+    def _on_extra_session_loaded(self, binding: SessionBinding, path: str, all_danmaku: list[DanmakuData]):
+        if all_danmaku:
+            self._switch_danmaku(binding, path, all_danmaku)
+        else:
+            logging.warning(f"无法加载附加会话 {binding.aumid} 的弹幕文件 '{path}'，保持当前弹幕。")
+
+    def _update_visibility(self):
+        """
+        根据前台窗口显示或隐藏各个弹幕窗口，并调整置顶状态。前台窗口切换、移动或缩放时和收到会话信息时调用。
+        - 某个绑定的播放器在前台：它的弹幕窗口覆盖播放器窗口的客户区（可在配置中关闭）并置顶；
+        - 另一个已绑定的播放器（如画中画）在前台：保持显示和置顶，区域不变；
+        - 控制面板在前台：显示但不置顶；其他程序在前台：全部隐藏。
+        """
+        if not self._is_running_flag or not self._foreground: return
+        foreground_aumid = self._foreground.current
         foreground_proc_name = foreground_aumid.lower() if foreground_aumid else ""
-        is_player_foreground = self.config.target_aumid.lower() in foreground_proc_name
         is_gui_foreground = (foreground_proc_name == self._self_proc_name)
+        any_player_foreground = any(b.aumid.lower() in foreground_proc_name for b in self._bindings)
 
-        if is_player_foreground:
-            self.renderer.show()
-            self.renderer.set_stay_on_top(True)
-        elif is_gui_foreground:
-            self.renderer.show()
-            self.renderer.set_stay_on_top(False)
-        else:
-            self.renderer.hide()
+        # 渲染器只在状态真正改变时操作窗口，隐藏期间停止动画
+        for binding in self._bindings:
+            renderer = binding.renderer
+            if foreground_aumid is None:
+                # 当前平台无法判断前台窗口（如 Wayland），始终显示弹幕
+                renderer.set_overlay_state(True, stay_on_top=True)
+            elif foreground_proc_name and binding.aumid.lower() in foreground_proc_name:
+                # 先调整区域再显示，避免全屏闪烁
+                renderer.set_overlay_geometry(
+                    self._foreground.geometry if self.config.follow_player_window else None)
+                renderer.set_overlay_state(True, stay_on_top=True)
+            elif any_player_foreground:
+                renderer.set_overlay_state(True, stay_on_top=True)
+            elif is_gui_foreground:
+                renderer.set_overlay_state(True, stay_on_top=False)
+            else:
+                renderer.set_overlay_state(False)
+
+    def _update_debug_info(self):
+        if not self.config.debug: return
+        for binding in self._bindings:
+            binding.update_debug_info()
+
+    def feed_session_info(self, info: object):
+        """直接提供主会话的一次会话信息，效果与工作线程送达的相同。用于不启动工作线程的回放。"""
+        aumid = self._bindings[0].aumid if self._bindings else self.config.target_aumid
+        self._on_sessions_changed({aumid: info if info and info.source_aumid == aumid else None})
+
+    def _on_sessions_changed(self, changes: dict | None):
+        """
+        工作线程送达的会话变化，{aumid: 会话信息}，只包含发生了变化的会话。
+        None 表示监控出错，所有会话都视为不存在。
+        """
+        if not self._is_running_flag: return
+        if changes is None:
+            changes = {aumid: None for aumid in set(self._sessions) | {b.aumid for b in self._bindings}}
+        for aumid, info in changes.items():
+            if info is None:
+                self._sessions.pop(aumid, None)
+            else:
+                self._sessions[aumid] = info
+            for binding in self._bindings:
+                if binding.aumid == aumid:
+                    previous_title = binding.last_info.title if binding.last_info else None
+                    if info and info.title != previous_title and self.library and self.library_enabled():
+                        self._auto_match(binding, info.title)
+                    binding.on_session_info(info)
+        self._update_visibility()
+
+    def _auto_match(self, binding: SessionBinding, title: str):
+        """
+        媒体标题改变时，从弹幕库中为绑定挑选最匹配的弹幕文件并切换过去，
+        然后在后台预取推测的下一集，使下一次切换无需等待解析。
+        """
+        entry = self.library.match(title)
+        if entry is None:
+            logging.info(f"[{binding.aumid}] 弹幕库中没有与 '{title}' 匹配的弹幕文件，保持当前弹幕。")
+            return
+        if binding.loading_path == entry.path:
             return
+        if not binding.danmaku_path or os.path.abspath(binding.danmaku_path) != entry.path:
+            switch_start = time.perf_counter()
+            if self._loads_in_background(entry.path):
+                # 等待期间保持当前弹幕，加载完成后再切换并预取下一集
+                self._load_in_background(binding, entry.path,
+                                         partial(self._on_matched_loaded, binding, entry, title, switch_start),
+                                         load=self.library.load)
+                return
+            if self.config.follow_file:
+                all_danmaku, follower = self._load_danmaku(entry.path)
+            else:
+                all_danmaku, follower = self.library.load(entry.path), None
+            if not all_danmaku and follower is None:
+                logging.warning(f"无法解析匹配到的弹幕文件 '{entry.path}'，保持当前弹幕。")
+                return
+            binding.set_danmaku(entry.path, all_danmaku, follower)
+            self._log_switch(binding, entry, title, len(all_danmaku), switch_start)
+        else:
+            # 已经是匹配到的文件，放弃正在后台加载的其他文件
+            binding.loading_path = None
+        self._prefetch_next(entry)
 
-        if not info or info.source_aumid != self.config.target_aumid:
-            self.renderer.pause()
-            if self.config.debug:
-                 self.renderer.update_debug_playback_info("N/A", "00:00:00", "00:00:00")
+    def _on_matched_loaded(self, binding: SessionBinding, entry, title: str, switch_start: float,
+                           all_danmaku: list[DanmakuData]):
+        """按媒体标题匹配到的弹幕文件在后台加载完成。"""
+        if not all_danmaku:
+            logging.warning(f"无法解析匹配到的弹幕文件 '{entry.path}'，保持当前弹幕。")
             return
-            
-        if self.config.debug:
-            pos_str = self._format_time_for_debug(info.position)
-            dur_str = self._format_time_for_debug(info.duration)
-            self.renderer.update_debug_playback_info(info.title, pos_str, dur_str)
+        self._switch_danmaku(binding, entry.path, all_danmaku)
+        self._log_switch(binding, entry, title, len(all_danmaku), switch_start)
+        self._prefetch_next(entry)
 
-        if info.status != "PLAYING":
-            self.renderer.pause()
+    @staticmethod
+    def _log_switch(binding: SessionBinding, entry, title: str, count: int, switch_start: float):
+        logging.info(f"[{binding.aumid}] 按媒体标题 '{title}' 切换到弹幕文件 {os.path.basename(entry.path)}"
+                     f"（{count} 条，耗时 {(time.perf_counter() - switch_start) * 1000:.1f} 毫秒）")
+
+    def _prefetch_next(self, entry):
+        if not self.library:
             return
-        
-        self.renderer.resume()
-        current_position = info.position.total_seconds()
-        
-        if abs(current_position - self._last_known_position) > 2.0:
-            logging.info(f"检测到播放跳转: {self._last_known_position:.1f}s -> {current_position:.1f}s，正在重置弹幕...")
-            self.renderer.clear_danmaku()
-            self._danmaku_idx = bisect.bisect_left(self.danmaku_start_times, current_position)
-
-        self._last_known_position = current_position
-        while (self._danmaku_idx < len(self.all_danmaku) and
-               self.all_danmaku[self._danmaku_idx].start_time <= current_position):
-            if self.renderer:
-                self.renderer.add_danmaku(self.all_danmaku[self._danmaku_idx])
-            self._danmaku_idx += 1
+        next_entry = self.library.next_entry(entry)
+        if next_entry:
+            self.library.prefetch(next_entry.path)
             
     def discover_sessions_for_ui(self):
         if not self.monitor:
             self.error_occurred.emit("媒体监控器不可用，无法发现会话。")
             return
-        def discover_task():
-            try:
-                sessions = asyncio.run(self.monitor.list_sessions())
-                self.sessions_discovered.emit(sessions)
-            except Exception as e:
-                logging.error(f"UI发现媒体会话时出错: {e}")
-                self.error_occurred.emit(f"发现媒体会话时出错:\n{e}")
-        thread = threading.Thread(target=discover_task, daemon=True)
-        thread.start()
\ No newline at end of file
+        self._runtime.call(self.monitor.list_sessions(), on_result=self.sessions_discovered.emit,
+                           on_error=self._on_discovery_error, timeout=self.DISCOVERY_TIMEOUT_S,
+                           name="list-sessions")
+
+    def _on_discovery_error(self, error: Exception):
+        if isinstance(error, (asyncio.TimeoutError, TimeoutError)):
+            error = f"{self.DISCOVERY_TIMEOUT_S:g} 秒内没有响应"
+        logging.error(f"UI发现媒体会话时出错: {error}")
+        self.error_occurred.emit(f"发现媒体会话时出错:\n{error}")
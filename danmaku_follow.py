@@ -0,0 +1,106 @@
+# danmaku_follow.py
+import logging
+import os
+import xml.etree.ElementTree as ET
+
+from PyQt6.QtCore import QObject, QFileSystemWatcher, QTimer, pyqtSignal
+
+from danmaku_models import DanmakuData
+from danmaku_parser import IncrementalDanmakuParser
+
+
+class DanmakuFileFollower(QObject):
+    """
+    跟随仍在写入中的弹幕文件（如正在录制的直播弹幕）。
+    文件变化由 QFileSystemWatcher 通知（Linux 上为 inotify，Windows 上为目录变更通知），
+    无法监视时退回到定时检查文件大小。每次只解析新增的字节范围。
+    """
+    # 新解析出的弹幕，按文件中的顺序（未排序）
+    danmaku_appended = pyqtSignal(list)
+    # 文件被截断或重写后重新解析出的全部弹幕（已排序）
+    danmaku_replaced = pyqtSignal(list)
+
+    # 合并连续写入通知的延迟（毫秒）；录制程序通常每条弹幕写一次
+    READ_DELAY_MS = 200
+    # 无法使用文件监视时检查文件大小的间隔（毫秒）
+    POLL_INTERVAL_MS = 1000
+
+    def __init__(self, filepath: str, parent=None):
+        super().__init__(parent)
+        self.filepath = os.path.abspath(filepath)
+        self._parser = IncrementalDanmakuParser(self.filepath)
+
+        self._watcher = QFileSystemWatcher(self)
+        self._watcher.fileChanged.connect(self._on_file_changed)
+        self._read_timer = QTimer(self)
+        self._read_timer.setSingleShot(True)
+        self._read_timer.timeout.connect(self._read_new)
+        self._poll_timer = QTimer(self)
+        self._poll_timer.timeout.connect(self._poll)
+
+    def read_initial(self) -> list[DanmakuData]:
+        """解析文件当前已写入的全部内容，返回按开始时间排序的弹幕列表。文件无法读取时返回空列表。"""
+        self._parser.reset()
+        try:
+            danmaku_list = self._parser.read_new()
+        except (OSError, ET.ParseError) as e:
+            logging.error(f"读取弹幕文件 '{self.filepath}' 时出错: {e}")
+            return []
+        danmaku_list.sort(key=lambda x: x.start_time)
+        logging.info(f"跟随模式: 已读取 {len(danmaku_list)} 条弹幕，继续监视文件的新增内容。")
+        return danmaku_list
+
+    def start(self):
+        self._ensure_watch()
+
+    def stop(self):
+        self._read_timer.stop()
+        self._poll_timer.stop()
+        if self._watcher.files():
+            self._watcher.removePaths(self._watcher.files())
+
+    def _ensure_watch(self):
+        """优先使用文件监视；文件被替换后监视会失效，此时重新添加，失败则改为轮询。"""
+        if self.filepath in self._watcher.files() or self._watcher.addPath(self.filepath):
+            self._poll_timer.stop()
+        elif not self._poll_timer.isActive():
+            logging.info(f"无法监视弹幕文件，改为每 {self.POLL_INTERVAL_MS} 毫秒检查一次: {self.filepath}")
+            self._poll_timer.start(self.POLL_INTERVAL_MS)
+
+    def _on_file_changed(self, path: str):
+        self._ensure_watch()
+        if not self._read_timer.isActive():
+            self._read_timer.start(self.READ_DELAY_MS)
+
+    def _poll(self):
+        try:
+            size = os.path.getsize(self.filepath)
+        except OSError:
+            return
+        if size != self._parser.offset:
+            self._read_new()
+        self._ensure_watch()
+
+    def _read_new(self):
+        try:
+            size = os.path.getsize(self.filepath)
+        except OSError:
+            # 文件暂时不存在（可能正在被替换），等待下一次通知或轮询
+            return
+        if size < self._parser.offset:
+            logging.info(f"弹幕文件被截断或重写，正在重新解析: {self.filepath}")
+            self.danmaku_replaced.emit(self.read_initial())
+            return
+        try:
+            new_danmaku = self._parser.read_new()
+        except OSError as e:
+            logging.warning(f"读取弹幕文件的新增内容时出错: {e}")
+            return
+        except ET.ParseError as e:
+            # 写入方可能以非追加的方式改写了文件，从头重新解析
+            logging.warning(f"解析弹幕文件的新增内容时出错（{e}），正在重新解析。")
+            self.danmaku_replaced.emit(self.read_initial())
+            return
+        if new_danmaku:
+            logging.debug(f"跟随模式: 新增 {len(new_danmaku)} 条弹幕。")
+            self.danmaku_appended.emit(new_danmaku)
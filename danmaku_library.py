@@ -0,0 +1,303 @@
+# danmaku_library.py
+import difflib
+import logging
+import os
+import re
+import sqlite3
+import threading
+import unicodedata
+
+from PyQt6.QtCore import QObject, QFileSystemWatcher, QTimer, pyqtSignal
+
+from danmaku_parser import is_cached, load_cached
+
+# 读取 chatid 时只读取文件开头的这么多字节（B站弹幕文件的 chatid 位于 <d> 元素之前）
+_HEAD_BYTES = 4096
+_CHATID_RE = re.compile(rb'<chatid>\s*(\d+)\s*</chatid>')
+# 播放器常把文件名作为标题，匹配前去掉常见的媒体扩展名
+_MEDIA_EXT_RE = re.compile(r'\.(xml|mp4|mkv|avi|flv|ts|webm|mov|wmv|rmvb|m4v)$')
+# 字幕组、分辨率等标签通常放在括号里，比较标题时去掉
+_BRACKETED_RE = re.compile(r'\[[^\]]*\]|【[^】]*】|\([^)]*\)|（[^）]*）')
+_NOISE_RE = re.compile(r'\b(?:\d{3,4}[pi]|[xh]\.?26[45]|hevc|avc|aac|flac|web-?dl|web-?rip|bd-?rip|blu-?ray|hdr|10bit)\b')
+_SEPARATORS_RE = re.compile(r'[\[\]【】()（）{}_\-.·・:：!！?？,，、~～|/\\\s]+')
+# 按优先级依次尝试的集数模式
+_EPISODE_PATTERNS = [
+    re.compile(r's\d{1,2}\s*e(\d{1,4})'),
+    re.compile(r'第\s*(\d{1,4})\s*[集话話回期]'),
+    re.compile(r'\b(?:ep|episode|e)\s*(\d{1,4})\b'),
+    re.compile(r'(?:^|\s)(\d{1,3})(?:\s*v\d)?(?=\s|$)'),
+]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    folder TEXT NOT NULL,
+    chatid TEXT NOT NULL,
+    title TEXT NOT NULL,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL
+)
+"""
+
+
+def normalize_title(text: str) -> str:
+    """统一全角/半角和大小写，去掉扩展名、括号中的标签和分辨率等信息，用于标题比较。"""
+    text = unicodedata.normalize('NFKC', text or '').lower().strip()
+    text = _MEDIA_EXT_RE.sub('', text)
+    stripped = _BRACKETED_RE.sub(' ', text)
+    # 整个标题都在括号里时保留括号中的内容
+    if _SEPARATORS_RE.sub('', stripped):
+        text = stripped
+    text = _NOISE_RE.sub(' ', text)
+    return _SEPARATORS_RE.sub(' ', text).strip()
+
+
+def split_episode(normalized: str) -> tuple[str, int | None]:
+    """从规范化的标题中分离出 (系列名, 集数)，没有集数时为 None。"""
+    for pattern in _EPISODE_PATTERNS:
+        matches = list(pattern.finditer(normalized))
+        if matches:
+            m = matches[-1]
+            series = (normalized[:m.start()] + ' ' + normalized[m.end():]).strip()
+            return ' '.join(series.split()), int(m.group(1))
+    return normalized, None
+
+
+def read_chatid(path: str) -> str:
+    """读取弹幕文件开头的 chatid，没有时返回空字符串。"""
+    try:
+        with open(path, 'rb') as f:
+            m = _CHATID_RE.search(f.read(_HEAD_BYTES))
+    except OSError:
+        return ''
+    return m.group(1).decode('ascii') if m else ''
+
+
+def _is_under(path: str, folder: str) -> bool:
+    return os.path.normcase(path).startswith(os.path.normcase(os.path.join(folder, '')))
+
+
+def scan_folders(db_path: str, folders: list[str], all_folders: list[str] | None = None) -> tuple[int, int, list[str]]:
+    """
+    增量扫描文件夹（含子文件夹）中的 XML 弹幕文件，更新索引数据库。
+    只有修改时间或大小改变的文件才会被重新读取；已不存在的文件从索引中删除。
+    在后台线程中调用，使用独立的数据库连接。
+
+    Args:
+        db_path (str): 索引数据库路径。
+        folders (list[str]): 要扫描的文件夹。
+        all_folders (list[str] | None): 配置的全部文件夹。给出时，同时删除不在这些文件夹下的旧条目。
+
+    Returns:
+        tuple[int, int, list[str]]: (更新的条目数, 删除的条目数, 扫描到的全部文件夹)。
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute(_SCHEMA)
+        known = {row[0]: (row[1], row[2]) for row in conn.execute("SELECT path, mtime, size FROM files")}
+        seen, directories, updates = set(), [], []
+        for folder in folders:
+            for root, _, files in os.walk(folder):
+                directories.append(root)
+                for name in files:
+                    if not name.lower().endswith('.xml'):
+                        continue
+                    path = os.path.abspath(os.path.join(root, name))
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    seen.add(path)
+                    if known.get(path) != (stat.st_mtime, stat.st_size):
+                        title = os.path.splitext(name)[0]
+                        updates.append((path, root, read_chatid(path), title, stat.st_mtime, stat.st_size))
+        removed = [p for p in known if p not in seen and (
+            any(_is_under(p, f) for f in folders) or
+            (all_folders is not None and not any(_is_under(p, f) for f in all_folders)))]
+        with conn:
+            conn.executemany("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?)", updates)
+            conn.executemany("DELETE FROM files WHERE path = ?", [(p,) for p in removed])
+        return len(updates), len(removed), directories
+    finally:
+        conn.close()
+
+
+class LibraryEntry:
+    """索引中的一个弹幕文件。"""
+    __slots__ = ('path', 'folder', 'chatid', 'title', 'series', 'episode')
+
+    def __init__(self, path: str, folder: str, chatid: str, title: str):
+        self.path = path
+        self.folder = folder
+        self.chatid = chatid
+        self.title = title
+        self.series, self.episode = split_episode(normalize_title(title))
+
+
+class DanmakuLibrary(QObject):
+    """
+    弹幕库。把配置的文件夹扫描进 SQLite 索引（chatid、标题、路径），
+    根据播放器报告的媒体标题挑选最匹配的弹幕文件，并在后台预先解析下一集。
+    文件夹的变化由 QFileSystemWatcher 通知，合并后只增量扫描发生变化的文件夹。
+    """
+    # 索引更新后发射，携带条目总数
+    index_updated = pyqtSignal(int)
+    # 后台扫描完成（内部使用，跨线程送回主线程）
+    _scan_finished = pyqtSignal(object)
+
+    # 文件夹变化后延迟扫描的时间（毫秒），合并连续的变化
+    RESCAN_DELAY_MS = 1000
+    # 标题相似度低于该值时不认为匹配
+    MATCH_THRESHOLD = 0.6
+
+    def __init__(self, db_path: str, folders: list[str], parent=None):
+        super().__init__(parent)
+        self.db_path = db_path
+        self.folders = [os.path.abspath(f) for f in folders if f and os.path.isdir(f)]
+        self._entries: list[LibraryEntry] = []
+        self._scanning = False
+        self._pending_folders: set[str] = set()
+        # 正在后台预取的文件：路径 -> 线程
+        self._prefetching: dict[str, threading.Thread] = {}
+        # 解析函数（见 load_cached），启用解析工作进程时由控制器设置为 ParseWorker.load
+        self.loader = None
+
+        self._watcher = QFileSystemWatcher(self)
+        self._watcher.directoryChanged.connect(self._on_directory_changed)
+        self._rescan_timer = QTimer(self)
+        self._rescan_timer.setSingleShot(True)
+        self._rescan_timer.timeout.connect(self._rescan_pending)
+        self._scan_finished.connect(self._on_scan_finished)
+
+        conn = sqlite3.connect(self.db_path)
+        try:
+            conn.execute(_SCHEMA)
+            conn.commit()
+        finally:
+            conn.close()
+        self._load_entries()
+
+    @property
+    def entries(self) -> list[LibraryEntry]:
+        return list(self._entries)
+
+    def start(self):
+        """在后台完整扫描一次所有文件夹，完成后开始监视文件夹的变化。"""
+        self._start_scan(self.folders, full=True)
+
+    def stop(self):
+        paths = self._watcher.directories()
+        if paths:
+            self._watcher.removePaths(paths)
+        self._rescan_timer.stop()
+
+    def match(self, media_title: str) -> LibraryEntry | None:
+        """
+        为播放器报告的媒体标题挑选最匹配的弹幕文件。
+        标题中包含某个文件的 chatid 时直接选中；否则比较系列名的相似度，集数不同的文件不参与匹配。
+        """
+        normalized = normalize_title(media_title)
+        if not normalized:
+            return None
+        tokens = set(normalized.split())
+        for entry in self._entries:
+            if entry.chatid and entry.chatid in tokens:
+                return entry
+        series, episode = split_episode(normalized)
+        best, best_score = None, self.MATCH_THRESHOLD
+        for entry in self._entries:
+            if episode is not None and entry.episode is not None and entry.episode != episode:
+                continue
+            score = difflib.SequenceMatcher(None, series, entry.series).ratio()
+            if episode is not None and entry.episode == episode:
+                score += 0.1
+            if score > best_score:
+                best, best_score = entry, score
+        return best
+
+    def next_entry(self, entry: LibraryEntry) -> LibraryEntry | None:
+        """推测下一集：同一系列中集数加一的文件，其次是同一文件夹中按名称排序的下一个文件。"""
+        if entry.episode is not None:
+            for other in self._entries:
+                if other.series == entry.series and other.episode == entry.episode + 1:
+                    return other
+        siblings = sorted((e for e in self._entries if e.folder == entry.folder),
+                          key=lambda e: _natural_key(e.title))
+        for i, other in enumerate(siblings[:-1]):
+            if other.path == entry.path:
+                return siblings[i + 1]
+        return None
+
+    def prefetch(self, path: str):
+        """在后台线程中解析弹幕文件并放入解析缓存，之后切换到该文件时无需等待解析。"""
+        thread = self._prefetching.get(path)
+        if (thread and thread.is_alive()) or is_cached(path):
+            return
+        logging.info(f"预取弹幕文件: {os.path.basename(path)}")
+        thread = threading.Thread(target=load_cached, args=(path, self.loader), daemon=True)
+        self._prefetching[path] = thread
+        thread.start()
+
+    def load(self, path: str) -> list:
+        """加载弹幕文件。该文件正在预取时等待预取完成，而不是重复解析。"""
+        thread = self._prefetching.pop(path, None)
+        if thread and thread.is_alive():
+            thread.join()
+        return load_cached(path, self.loader)
+
+    def _load_entries(self):
+        conn = sqlite3.connect(self.db_path)
+        try:
+            rows = conn.execute("SELECT path, folder, chatid, title FROM files").fetchall()
+        finally:
+            conn.close()
+        self._entries = [LibraryEntry(*row) for row in rows]
+
+    def _start_scan(self, folders: list[str], full: bool = False):
+        if not folders:
+            return
+        if self._scanning:
+            self._pending_folders.update(folders)
+            return
+        self._scanning = True
+        all_folders = self.folders if full else None
+
+        def task():
+            try:
+                result = scan_folders(self.db_path, folders, all_folders)
+            except (OSError, sqlite3.Error) as e:
+                logging.error(f"扫描弹幕库时出错: {e}")
+                result = None
+            self._scan_finished.emit(result)
+
+        threading.Thread(target=task, daemon=True).start()
+
+    def _on_scan_finished(self, result):
+        self._scanning = False
+        if result is not None:
+            updated, removed, directories = result
+            watched = set(self._watcher.directories())
+            new_dirs = [d for d in directories if d not in watched]
+            if new_dirs:
+                self._watcher.addPaths(new_dirs)
+            if updated or removed or not self._entries:
+                self._load_entries()
+            logging.info(f"弹幕库索引已更新: {len(self._entries)} 个文件（更新 {updated}，删除 {removed}）")
+            self.index_updated.emit(len(self._entries))
+        if self._pending_folders:
+            self._rescan_timer.start(self.RESCAN_DELAY_MS)
+
+    def _on_directory_changed(self, path: str):
+        self._pending_folders.add(path)
+        self._rescan_timer.start(self.RESCAN_DELAY_MS)
+
+    def _rescan_pending(self):
+        folders = sorted(self._pending_folders)
+        self._pending_folders.clear()
+        # 已被删除的文件夹从其上级开始扫描，以便删除其中的条目
+        self._start_scan([f if os.path.isdir(f) else os.path.dirname(f) for f in folders])
+
+
+def _natural_key(text: str) -> list:
+    """自然排序的键，使 '2' 排在 '10' 之前。"""
+    return [int(part) if part.isdigit() else part for part in re.split(r'(\d+)', text.lower())]
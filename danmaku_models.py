@@ -1,12 +1,12 @@
 # danmaku_models.py
-import time
 from PyQt6.QtCore import QPointF
-from PyQt6.QtGui import QColor, QPixmap
+from PyQt6.QtGui import QColor, QPixmap, QFont, QFontMetrics
 
 # 导入Config类仅用于类型注解，避免在运行时发生循环导入
 from typing import TYPE_CHECKING
 if TYPE_CHECKING:
     from config_loader import Config
+    from text_layout import TextLayout
 
 
 class DanmakuData:
@@ -14,11 +14,12 @@ class DanmakuData:
     存储从XML文件解析出的原始、静态的弹幕数据。
     这是一个纯数据类（DTO - Data Transfer Object），在程序运行期间其属性不会改变。
     """
-    def __init__(self, start_time: float, mode: int, text: str, color: QColor):
+    def __init__(self, start_time: float, mode: int, text: str, color: QColor, font_size: int = 25):
         self.start_time = start_time  # 弹幕出现的时间（秒）
         self.mode = mode              # 弹幕模式 (1=滚动, 4=底部, 5=顶部)
         self.text = text              # 弹幕文本
         self.color = color            # 弹幕颜色 (QColor对象)
+        self.font_size = font_size    # 弹幕字号 (25为标准字号)
 
 class ActiveDanmaku:
     """
@@ -31,16 +32,30 @@ class ActiveDanmaku:
         self.text: str = ""
         self.color: QColor = QColor()
         self.mode: int = 0
+        self.font_size: int = 25        # 弹幕自带的字号，字体设置改变时据此重新排版
         self.width: int = 0             # 弹幕文本渲染后的像素宽度
+        self.height: int = 0            # 弹幕文本（可能多行）的像素高度
+        self.layout: 'TextLayout | None' = None # 换行/截断后的排版结果
+        self.font: QFont | None = None  # 渲染使用的字体（由字体缓存共享，不归本对象所有）
+        self.font_metrics: QFontMetrics | None = None
         self.position: QPointF = QPointF() # 弹幕当前的左上角坐标
         self.speed: float = 0.0         # 弹幕的移动速度（像素/秒），仅滚动弹幕有效
-        self.disappear_time: float = 0.0 # 弹幕应消失的绝对时间戳，仅固定弹幕有效
+        self.remaining_time: float = 0.0 # 弹幕剩余的显示时间（秒），仅固定弹幕有效
         
         # 【性能优化】用于缓存渲染好的弹幕图片（包含描边）。
         # 避免每一帧都重新绘制文字，极大提升性能。
         self.pixmap_cache: QPixmap | None = None
+        # 超长弹幕按分块渲染时使用：{分块序号: QPixmap}，只保留与屏幕相交的分块。
+        self.tiles: dict[int, QPixmap] | None = None
 
-    def init(self, data: DanmakuData, y_pos: float, width: int, config: 'Config'):
+    def release_cache(self):
+        """释放所有位图缓存。"""
+        self.pixmap_cache = None
+        self.tiles = None
+
+    def init(self, data: DanmakuData, y_pos: float, layout: 'TextLayout', config: 'Config',
+             font: QFont, font_metrics: QFontMetrics, screen_width: int, scroll_speed: float,
+             tiled: bool = False, elapsed: float = 0.0):
         """
         使用一条静态弹幕数据来“激活”这个对象。
         这个方法在从对象池取出对象后被调用。
@@ -48,39 +63,49 @@ class ActiveDanmaku:
         Args:
             data (DanmakuData): 原始弹幕数据。
             y_pos (float): 分配到的弹幕轨道的y坐标。
-            width (int): 预先计算好的弹幕文本宽度。
+            layout (TextLayout): 预先计算好的排版结果（宽度、高度、各行文本）。
             config (Config): 全局配置对象。
+            font (QFont): 该弹幕字号对应的共享字体。
+            font_metrics (QFontMetrics): 与 font 对应的字体度量。
+            screen_width (int): 所在覆盖层的宽度，用于计算初始位置。
+            scroll_speed (float): 滚动速度（像素/秒），由渲染器按覆盖层宽度换算。
+            tiled (bool): 是否按分块方式渲染超长弹幕。
+            elapsed (float): 弹幕的预定出现时刻距今已过去的时间（秒）。
+                             生成时刻晚于预定时刻时，据此把弹幕直接放到它此刻应在的位置。
         """
         self.text = data.text
         self.color = data.color
         self.mode = data.mode
-        self.width = width
+        self.font_size = data.font_size
+        self.layout = layout
+        self.font = font
+        self.font_metrics = font_metrics
+        self.width = layout.width
+        self.height = layout.height
         # 重置缓存，因为弹幕内容已经改变
-        self.pixmap_cache = None
-        
-        # 获取屏幕宽度用于计算初始位置
-        screen_width = config.screen_geometry.width()
+        self.release_cache()
+        if tiled:
+            self.tiles = {}
+
 
         # 根据弹幕模式设置初始位置、速度和消失时间
         if self.mode == 1:  # 滚动弹幕
-            self.position = QPointF(screen_width, y_pos) # 初始位置在屏幕右侧外
-            self.speed = config.scroll_speed
-            self.disappear_time = float('inf') # 滚动弹幕永不因时间消失，只因移出屏幕
+            self.speed = scroll_speed
+            # 初始位置在屏幕右侧外，迟到的弹幕按已经过的时间向左补偿
+            self.position = QPointF(screen_width - self.speed * elapsed, y_pos)
+            self.remaining_time = float('inf') # 滚动弹幕永不因时间消失，只因移出屏幕
         else:  # 顶部或底部固定弹幕
             # 初始位置在屏幕中央
-            self.position = QPointF((screen_width - width) / 2, y_pos)
+            self.position = QPointF((screen_width - self.width) / 2, y_pos)
             self.speed = 0 # 固定弹幕不移动
-            current_time = time.monotonic() # 使用单调时钟，不受系统时间改变影响
-            # 计算绝对消失时间
-            self.disappear_time = current_time + (config.fixed_duration_ms / 1000)
+            self.remaining_time = config.fixed_duration_ms / 1000 - elapsed
 
-    def is_active(self, current_time: float, delta_time: float) -> bool:
+    def is_active(self, delta_time: float) -> bool:
         """
         判断弹幕在当前帧是否仍然处于活动状态，并更新其位置。
         这是弹幕动画的核心逻辑。
 
         Args:
-            current_time (float): 当前时间戳 (来自 time.monotonic())。
             delta_time (float): 距离上一帧的时间差（秒）。
 
         Returns:
@@ -92,5 +117,6 @@ class ActiveDanmaku:
             # 如果弹幕的右边缘仍在屏幕左侧之外，则认为它还在活动
             return self.position.x() + self.width > 0
         else:  # 固定弹幕
-            # 如果当前时间还没到预设的消失时间，则为活动
-            return current_time < self.disappear_time
\ No newline at end of file
+            # 扣除本帧时间，剩余显示时间大于0则仍为活动
+            self.remaining_time -= delta_time
+            return self.remaining_time > 0
\ No newline at end of file
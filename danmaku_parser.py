@@ -1,9 +1,91 @@
 # danmaku_parser.py
+import os
+import threading
 import xml.etree.ElementTree as ET
+from collections import OrderedDict
 from PyQt6.QtGui import QColor
 from danmaku_models import DanmakuData
 import logging
 
+# 解析结果缓存：绝对路径 -> ((修改时间, 文件大小), 弹幕列表)
+_parse_cache: OrderedDict = OrderedDict()
+_PARSE_CACHE_MAX = 4
+# 后台预取线程也会写入缓存
+_parse_cache_lock = threading.Lock()
+# 字号字段缺失或格式错误时使用的标准字号
+DEFAULT_FONT_SIZE = 25
+
+def parse_d_fields(d_element: ET.Element) -> tuple[float, int, int, int, str] | None:
+    """
+    解析一个 '<d>' 元素的字段 (开始时间, 模式, 字号, 十进制颜色, 文本)，不创建任何 Qt 对象，
+    可在解析工作进程中使用。不支持的模式、空文本或格式错误的弹幕返回 None。
+    """
+    # 'p' 属性包含了弹幕的多个参数，用逗号分隔
+    p_attr = d_element.get('p', '').split(',')
+
+    # 一个标准的B站弹幕p属性至少有8个字段，但我们只关心前4个
+    if len(p_attr) < 4:
+        return None
+    try:
+        # p_attr[0]: 弹幕出现时间 (秒)
+        start_time = float(p_attr[0])
+        # p_attr[1]: 弹幕模式 (1-3滚动, 4底部, 5顶部)
+        mode = int(p_attr[1])
+        # p_attr[3]: 颜色 (十进制整数表示的RGB)
+        color_decimal = int(p_attr[3])
+    except (ValueError, IndexError) as e:
+        # 如果p属性中的某个值格式不正确（如无法转为数字），则忽略这条弹幕
+        logging.warning(f"忽略格式错误的弹幕行: p='{p_attr}', 错误: {e}")
+        return None
+    try:
+        # p_attr[2]: 字号 (25为标准, 18为小字号, 36为大字号)。字号不影响弹幕能否显示，格式错误时使用标准字号
+        font_size = int(p_attr[2])
+    except (ValueError, IndexError):
+        font_size = DEFAULT_FONT_SIZE
+    # 弹幕文本内容
+    text = d_element.text
+
+    # 只处理我们支持的模式，并且文本不能为空
+    if not text or mode not in [1, 4, 5]:
+        return None
+    return start_time, mode, font_size, color_decimal, text
+
+
+def color_from_decimal(color_decimal: int) -> QColor:
+    """将十进制颜色值转换为QColor对象。"""
+    # (dec >> 16) & 255: 右移16位取红色分量
+    # (dec >> 8) & 255: 右移8位取绿色分量
+    # dec & 255: 取蓝色分量
+    return QColor((color_decimal >> 16) & 255,
+                  (color_decimal >> 8) & 255,
+                  color_decimal & 255)
+
+
+def parse_d_element(d_element: ET.Element) -> DanmakuData | None:
+    """
+    解析一个 '<d>' 元素。不支持的模式、空文本或格式错误的弹幕返回 None。
+    """
+    fields = parse_d_fields(d_element)
+    if fields is None:
+        return None
+    start_time, mode, font_size, color_decimal, text = fields
+    return DanmakuData(start_time, mode, text, color_from_decimal(color_decimal), font_size)
+
+
+def read_sorted_fields(filepath: str) -> list[tuple[float, int, int, int, str]]:
+    """
+    解析整个弹幕文件，返回按开始时间排序的字段元组（见 parse_d_fields），顺序与 load_from_xml 相同。
+
+    Raises:
+        OSError: 文件无法读取。
+        ET.ParseError: 文件不是合法的XML。
+    """
+    root = ET.parse(filepath).getroot()
+    rows = [fields for fields in map(parse_d_fields, root.findall('d')) if fields is not None]
+    rows.sort(key=lambda fields: fields[0])
+    return rows
+
+
 def load_from_xml(filepath: str) -> list[DanmakuData]:
     """
     从Bilibili风格的XML文件中加载、解析并排序弹幕。
@@ -21,35 +103,9 @@ def load_from_xml(filepath: str) -> list[DanmakuData]:
         root = tree.getroot()
         # 遍历XML中所有的 '<d>' 标签
         for d_element in root.findall('d'):
-            # 'p' 属性包含了弹幕的多个参数，用逗号分隔
-            p_attr = d_element.get('p', '').split(',')
-            
-            # 一个标准的B站弹幕p属性至少有8个字段，但我们只关心前4个
-            if len(p_attr) >= 4:
-                try:
-                    # p_attr[0]: 弹幕出现时间 (秒)
-                    start_time = float(p_attr[0])
-                    # p_attr[1]: 弹幕模式 (1-3滚动, 4底部, 5顶部)
-                    mode = int(p_attr[1])
-                    # p_attr[3]: 颜色 (十进制整数表示的RGB)
-                    color_decimal = int(p_attr[3])
-                    # 弹幕文本内容
-                    text = d_element.text
-                    
-                    # 只处理我们支持的模式，并且文本不能为空
-                    if text and mode in [1, 4, 5]:
-                        # 将十进制颜色值转换为QColor对象
-                        # (dec >> 16) & 255: 右移16位取红色分量
-                        # (dec >> 8) & 255: 右移8位取绿色分量
-                        # dec & 255: 取蓝色分量
-                        color = QColor((color_decimal >> 16) & 255, 
-                                       (color_decimal >> 8) & 255, 
-                                       color_decimal & 255)
-                        danmaku_list.append(DanmakuData(start_time, mode, text, color))
-                except (ValueError, IndexError) as e:
-                    # 如果p属性中的某个值格式不正确（如无法转为数字），则忽略这条弹幕
-                    logging.warning(f"忽略格式错误的弹幕行: p='{p_attr}', 错误: {e}")
-                    continue
+            danmaku = parse_d_element(d_element)
+            if danmaku is not None:
+                danmaku_list.append(danmaku)
         
         # 【关键步骤】按开始时间对所有弹幕进行排序。
         # 这是后续使用二分查找进行同步的基础。
@@ -65,4 +121,100 @@ def load_from_xml(filepath: str) -> list[DanmakuData]:
         return []
     except Exception as e:
         logging.error(f"加载弹幕时发生未知错误: {e}")
-        return []
\ No newline at end of file
+        return []
+
+
+class IncrementalDanmakuParser:
+    """
+    增量解析仍在写入中的弹幕文件（如直播录制）。每次只读取上次读到的位置之后新增的字节，
+    交给 XMLPullParser 继续解析；文件没有结束标签、末尾有写了一半的元素都没有关系。
+    """
+    def __init__(self, filepath: str):
+        self.filepath = filepath
+        self.reset()
+
+    def reset(self):
+        """从文件开头重新解析。"""
+        self.offset = 0
+        self._parser = ET.XMLPullParser(events=('start', 'end'))
+        self._root: ET.Element | None = None
+
+    def read_new(self) -> list[DanmakuData]:
+        """
+        解析自上次调用以来新增的内容，返回新出现的弹幕（按文件中的顺序，不排序）。
+
+        Raises:
+            OSError: 文件无法读取。
+            ET.ParseError: 新增内容不是合法的XML。
+        """
+        with open(self.filepath, 'rb') as f:
+            f.seek(self.offset)
+            data = f.read()
+        if not data:
+            return []
+        self.offset += len(data)
+        self._parser.feed(data)
+        new_danmaku = []
+        for event, element in self._parser.read_events():
+            if event == 'start':
+                if self._root is None:
+                    self._root = element
+            elif element.tag == 'd':
+                danmaku = parse_d_element(element)
+                if danmaku is not None:
+                    new_danmaku.append(danmaku)
+        if self._root is not None:
+            # 已处理的元素不再需要；尚未结束的元素仍由解析器持有，会继续被填充
+            self._root.clear()
+        return new_danmaku
+
+
+def load_cached(filepath: str, loader=None) -> list[DanmakuData]:
+    """
+    带缓存的 load_from_xml。文件未改变（按修改时间和大小判断）时直接返回上次的解析结果，
+    多个会话绑定或重新启动时共享同一份列表，调用者不得修改它。可在后台线程中调用以预取。
+
+    Args:
+        filepath (str): XML弹幕文件的路径。
+        loader (callable | None): 缓存未命中时使用的解析函数，默认为 load_from_xml。
+            也可以是 ParseWorker.load，返回只读的 DanmakuTable，用法与列表相同。
+    """
+    loader = loader or load_from_xml
+    path = os.path.abspath(filepath)
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return loader(filepath)
+    signature = (stat.st_mtime, stat.st_size)
+    with _parse_cache_lock:
+        entry = _parse_cache.get(path)
+        if entry is not None and entry[0] == signature:
+            _parse_cache.move_to_end(path)
+            logging.info(f"使用缓存的弹幕解析结果: {len(entry[1])} 条")
+            return entry[1]
+    # 解析在锁外进行，不阻塞其他线程读取缓存
+    danmaku_list = loader(filepath)
+    if danmaku_list:
+        with _parse_cache_lock:
+            _parse_cache[path] = (signature, danmaku_list)
+            if len(_parse_cache) > _PARSE_CACHE_MAX:
+                _parse_cache.popitem(last=False)
+    return danmaku_list
+
+
+def is_cached(filepath: str) -> bool:
+    """文件的最新内容是否已在解析缓存中。"""
+    path = os.path.abspath(filepath)
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return False
+    with _parse_cache_lock:
+        entry = _parse_cache.get(path)
+    return entry is not None and entry[0] == (stat.st_mtime, stat.st_size)
+
+
+def clear_parse_cache():
+    """清空解析结果缓存。"""
+    with _parse_cache_lock:
+        _parse_cache.clear()
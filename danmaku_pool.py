@@ -0,0 +1,151 @@
+# danmaku_pool.py
+import logging
+from collections import deque
+
+from danmaku_models import ActiveDanmaku
+
+
+class DanmakuPool:
+    """
+    弹性的 ActiveDanmaku 对象池。
+    以软目标大小预分配对象，繁忙时根据生成速率扩容（不超过硬上限），
+    在持续空闲一段时间后释放多余的空闲对象。
+    """
+    # 统计生成速率的时间窗口（秒）
+    RATE_WINDOW_S = 2.0
+
+    def __init__(self, soft_target: int, hard_cap: int, idle_release_s: float = 10.0, grow_step: int = 32):
+        """
+        Args:
+            soft_target (int): 常规情况下的池大小，启动时按此数量预分配。
+            hard_cap (int): 池大小的硬上限，任何情况下都不会超过。
+            idle_release_s (float): 低活跃状态持续多少秒后开始收缩。
+            grow_step (int): 每次扩容/保留的最小对象数量。
+        """
+        self.soft_target = max(0, soft_target)
+        self.hard_cap = max(self.soft_target, hard_cap)
+        self.idle_release_s = idle_release_s
+        self.grow_step = max(1, grow_step)
+
+        self._free: deque[ActiveDanmaku] = deque()
+        self._size = 0
+        self._in_use = 0
+        self._spawn_times: deque[float] = deque()
+        self._last_busy_time: float | None = None
+
+        # 高水位统计
+        self.high_water_active = 0
+        self.high_water_size = 0
+
+        self._grow(self.soft_target)
+
+    @property
+    def size(self) -> int:
+        """当前池中对象总数（包括使用中和空闲的）。"""
+        return self._size
+
+    @property
+    def free_count(self) -> int:
+        return len(self._free)
+
+    @property
+    def is_exhausted(self) -> bool:
+        """池已达硬上限且没有空闲对象。"""
+        return not self._free and self._size >= self.hard_cap
+
+    def spawn_rate(self, now: float) -> float:
+        """最近时间窗口内观测到的生成速率（条/秒）。"""
+        self._trim_spawn_times(now)
+        return len(self._spawn_times) / self.RATE_WINDOW_S
+
+    def stats(self) -> dict:
+        return {
+            'size': self._size,
+            'free': len(self._free),
+            'in_use': self._in_use,
+            'soft_target': self.soft_target,
+            'hard_cap': self.hard_cap,
+            'high_water_active': self.high_water_active,
+            'high_water_size': self.high_water_size,
+        }
+
+    def acquire(self, now: float) -> ActiveDanmaku | None:
+        """取出一个空闲对象；池空时在硬上限内立即扩容。池已达上限时返回 None。"""
+        if not self._free:
+            self._grow(min(self.grow_step, self.hard_cap - self._size))
+            if not self._free:
+                return None
+        self._spawn_times.append(now)
+        self._in_use += 1
+        if self._in_use > self.high_water_active:
+            self.high_water_active = self._in_use
+        return self._free.popleft()
+
+    def release(self, danmaku: ActiveDanmaku):
+        """归还一个对象，并立即丢弃其位图缓存（下次激活时总会重新渲染）。"""
+        danmaku.release_cache()
+        self._free.append(danmaku)
+        self._in_use -= 1
+
+    def release_all(self, danmaku_list: list[ActiveDanmaku]):
+        for danmaku in danmaku_list:
+            self.release(danmaku)
+
+    def reserve(self, expected_active: int):
+        """根据预先计算的同屏数量提前扩容，避免在弹幕密集时才临时分配。"""
+        target = min(self.hard_cap, expected_active)
+        if target > self._size:
+            self._grow(target - self._size)
+
+    def resize(self, soft_target: int, hard_cap: int):
+        """就地调整软目标和硬上限，不影响正在使用的对象。"""
+        self.soft_target = max(0, soft_target)
+        self.hard_cap = max(self.soft_target, hard_cap)
+        if self._size < self.soft_target:
+            self._grow(self.soft_target - self._size)
+        elif self._size > self.hard_cap:
+            self._shrink(self.hard_cap)
+
+    def maintain(self, now: float, expected_lifetime_s: float):
+        """
+        每帧调用一次。根据观测到的生成速率预扩容，并在长时间低活跃后收缩。
+
+        Args:
+            now (float): 当前时间戳（秒）。
+            expected_lifetime_s (float): 单条弹幕在屏幕上的预计存活时间（秒）。
+        """
+        rate = self.spawn_rate(now)
+        expected_active = int(rate * expected_lifetime_s * 1.2)
+        if expected_active > self._size:
+            self.reserve(expected_active + self.grow_step)
+
+        if self._in_use > self.soft_target // 2 or self._last_busy_time is None:
+            self._last_busy_time = now
+        elif now - self._last_busy_time > self.idle_release_s:
+            keep = max(self.grow_step, self._in_use * 2, expected_active)
+            if self._size > keep and self._free:
+                self._shrink(keep)
+                self._last_busy_time = now
+
+    def _grow(self, count: int):
+        if count <= 0:
+            return
+        self._free.extend(ActiveDanmaku() for _ in range(count))
+        self._size += count
+        if self._size > self.high_water_size:
+            self.high_water_size = self._size
+        logging.debug(f"对象池扩容 {count}，当前大小: {self._size}")
+
+    def _shrink(self, target_size: int):
+        released = 0
+        while self._size > target_size and self._free:
+            self._free.pop()
+            self._size -= 1
+            released += 1
+        if released:
+            logging.debug(f"对象池空闲收缩，释放 {released} 个对象，当前大小: {self._size}")
+
+    def _trim_spawn_times(self, now: float):
+        cutoff = now - self.RATE_WINDOW_S
+        while self._spawn_times and self._spawn_times[0] < cutoff:
+            self._spawn_times.popleft()
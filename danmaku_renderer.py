@@ -1,19 +1,21 @@
 # danmaku_renderer.py
 import logging
+import math
 import time
 import random
 import sys
 from collections import deque
 from PyQt6.QtWidgets import QMainWindow, QApplication
-from PyQt6.QtCore import Qt, QTimer, QPointF, QSize
-from PyQt6.QtGui import (
-    QFont, QPainter, QColor, QFontMetrics, QPainterPath,
-    QPainterPathStroker, QPixmap
-)
+from PyQt6.QtCore import Qt, QTimer, QPointF, QRect, QSize, pyqtSignal
+from PyQt6.QtGui import QFont, QPainter, QFontMetrics, QPixmap
 
-from config_loader import get_config
+from config_loader import ConfigChange, get_config
 from danmaku_models import DanmakuData, ActiveDanmaku
-from debug_overlay import DebugOverlay
+from danmaku_pool import DanmakuPool
+from quality_governor import QualityGovernor, QualityTier
+from outline_renderer import draw_outlined_text, OUTLINE_COLOR
+from text_layout import cached_layout, clear_layout_cache, max_layout_width, pixmap_memory_ceiling
+from font_cache import clear_font_cache, get_font, scaled_point_size, MAX_SCALE
 
 # 平台相关的导入，使其成为可选
 IS_WINDOWS = sys.platform == 'win32'
@@ -31,11 +33,35 @@ class DanmakuWindow(QMainWindow):
     弹幕渲染窗口。这是一个透明、无边框、可鼠标穿透的顶层窗口。
     它负责管理所有活动弹幕的生命周期、动画更新和绘制。
     """
-    def __init__(self, total_danmaku_count: int, parent=None):
+    # 每帧推进动画之后发射，携带本帧的单调时钟时间戳，控制器据此按精确时刻生成弹幕
+    frame_ticked = pyqtSignal(float)
+
+    # 单帧允许推进的最长时间（秒）
+    MAX_FRAME_DELTA_S = 0.25
+    # 改变后需要重新排版屏幕上弹幕的配置项
+    LAYOUT_KEYS = ('font_name', 'font_size', 'honor_font_size', 'max_pixmap_width', 'max_lines', 'long_text_mode')
+    # 改变后只需重新渲染位图的配置项
+    RASTER_KEYS = ('stroke_width', 'outline_method')
+
+    def __init__(self, total_danmaku_count: int, parent=None, time_source=None, seed: int | None = None):
+        """
+        Args:
+            total_danmaku_count (int): 弹幕总数，用于调试信息显示。
+            time_source (callable | None): 注入的时间源（如 VirtualClock）。指定后进入虚拟时间模式：
+                不启动动画定时器，由调用者通过 step_frame() 逐帧推进，且不受真实耗时影响（不做自动画质调节、
+                批量生成不受每帧时间预算限制），相同的输入总是产生相同的画面。
+            seed (int | None): 轨道随机选择所用的随机数种子。
+        """
         super().__init__(parent)
         self.config = get_config()
+        self._virtual_time = time_source is not None
+        self._time_source = time_source or time.monotonic
+        self._rng = random.Random(seed)
         
-        self.config.screen_geometry = QApplication.primaryScreen().geometry()
+        # 覆盖层的区域：默认为整个主屏幕，跟随播放器窗口时由 set_overlay_geometry 改变。
+        # 配置中的滚动速度针对主屏幕宽度，覆盖层较窄时按比例缩放
+        self._overlay_rect = QApplication.primaryScreen().geometry()
+        self._reference_width = max(1, self._overlay_rect.width())
         
         window_flags = Qt.WindowType.FramelessWindowHint | Qt.WindowType.Tool
         self.setWindowFlags(window_flags)
@@ -43,38 +69,170 @@ class DanmakuWindow(QMainWindow):
         if not self.config.debug:
             self.setAttribute(Qt.WidgetAttribute.WA_TransparentForMouseEvents)
         
-        self.setGeometry(self.config.screen_geometry)
+        self.setGeometry(self._overlay_rect)
         
-        self._font = QFont(self.config.font_name, self.config.font_size, QFont.Weight.Bold)
-        self._font_metrics = QFontMetrics(self._font)
+        self._total_danmaku_count = total_danmaku_count
+        self._apply_font()
         
-        pool_size = self.config.max_danmaku_count
-        logging.info(f"初始化对象池大小: {pool_size}")
-        self._danmaku_pool = [ActiveDanmaku() for _ in range(pool_size)]
-        self._free_danmaku = deque(self._danmaku_pool)
+        logging.info(f"初始化对象池: 软目标 {self.config.max_danmaku_count}，硬上限 {self.config.pool_hard_cap}")
+        self._pool = DanmakuPool(self.config.max_danmaku_count, self.config.pool_hard_cap,
+                                 idle_release_s=self.config.pool_idle_release_s)
         self._active_danmaku = []
         
-        font_height = self._font_metrics.height()
-        line_spacing = int(font_height * self.config.line_spacing_ratio)
-        self.track_height = font_height + line_spacing
-        self.y_offset = self._font_metrics.ascent() + 5
+        # 内存上限按允许的最大字号计算
+        largest_metrics = self._font_metrics
+        if self.config.honor_font_size:
+            _, largest_metrics = get_font(self.config.font_name, round(self.config.font_size * MAX_SCALE))
+        memory_ceiling = pixmap_memory_ceiling(
+            self.config.max_pixmap_width, self.config.max_lines, largest_metrics.height(), self.config.stroke_width,
+            self._overlay_rect.width(), self.config.long_text_mode)
+        logging.info(f"单条弹幕位图内存上限: {memory_ceiling / 1024:.0f} KB")
         
-        num_tracks = self.config.max_tracks
-        self._scroll_tracks = [0] * num_tracks
-        self._top_tracks = [0] * num_tracks
-        self._bottom_tracks = [0] * num_tracks
+        # 动画时间：按播放速率推进、暂停时停止的时间轴（秒），轨道占用时间均以它为准
+        self._anim_time = 0.0
+        self._playback_rate = 1.0
+        # 批量生成时尚未处理的弹幕：(弹幕数据, 预定出现时刻对应的动画时间)
+        self._pending_spawns: deque[tuple[DanmakuData, float]] = deque()
+
+        num_tracks = self._lane_count(self._overlay_rect.height())
+        self._scroll_tracks = [float('-inf')] * num_tracks
+        self._top_tracks = [float('-inf')] * num_tracks
+        self._bottom_tracks = [float('-inf')] * num_tracks
         
-        if self.config.debug:
-            self.debug_overlay = DebugOverlay(self, self.config, total_danmaku_count)
-        else:
-            self.debug_overlay = None
+        self.debug_overlay = self._create_debug_overlay()
+        
+        # 自动画质调节：根据每帧耗时在不同画质档位间切换
+        self._quality = QualityGovernor(self.config.frame_budget_ms,
+                                        enabled=self.config.auto_quality and not self._virtual_time)
+        self._last_update_ms = 0.0
             
         self._animation_timer = QTimer(self)
         self._animation_timer.timeout.connect(self.update_states)
-        self._animation_timer.start(1000 // 60)
+        self._last_tick_time = self._time_source()
+        # _ticking 表示播放中（由 pause/resume 控制）；_running 表示动画确实在推进，
+        # 只有播放中且窗口可见时才推进，隐藏期间不做任何逐帧计算和位图渲染
+        self._ticking = False
+        self._running = False
         
         self._on_top_timer = QTimer(self)
         self._on_top_timer.timeout.connect(self._force_on_top_win32_if_needed)
+        self.resume()
+
+    def _apply_font(self):
+        """按配置获取基础字体及其度量，并据此计算轨道高度和首条轨道的基线。"""
+        self._font, self._font_metrics = get_font(self.config.font_name, self.config.font_size)
+        self._font_key = self._font.key()
+        font_height = self._font_metrics.height()
+        line_spacing = int(font_height * self.config.line_spacing_ratio)
+        self.track_height = font_height + line_spacing
+        self.y_offset = self._font_metrics.ascent() + 5
+
+    def apply_config_change(self, change: ConfigChange):
+        """
+        就地应用配置变更，不重建窗口，也不打断播放：
+        - 不透明度只需重绘；描边只丢弃位图缓存；
+        - 字体、字号和排版限制：重新获取字体度量，重新排版屏幕上的弹幕并丢弃其位图缓存；
+        - 行间距和最大轨道数：重新计算轨道，屏幕上的弹幕按新的轨道高度调整纵向位置；
+        - 滚动速度和固定弹幕时长：重新计算屏幕上弹幕的速度、剩余时间和轨道占用，位置不跳变；
+        - 对象池大小：就地调整。
+        """
+        if 'font_name' in change:
+            # 旧字体的 QFont 和度量不会再被使用
+            clear_font_cache()
+        if change.any(*self.LAYOUT_KEYS, 'line_spacing_ratio', 'max_tracks'):
+            self._apply_layout_change(relayout=change.any(*self.LAYOUT_KEYS))
+        if change.any(*self.RASTER_KEYS):
+            for danmaku in self._active_danmaku:
+                self._invalidate_pixmap(danmaku)
+        if 'scroll_speed' in change:
+            self._retime_scroll(change.old('scroll_speed'))
+        if 'fixed_duration_ms' in change:
+            self._retime_fixed((change.new('fixed_duration_ms') - change.old('fixed_duration_ms')) / 1000)
+        if change.any('max_danmaku_count', 'pool_hard_cap'):
+            self._pool.resize(self.config.max_danmaku_count, self.config.pool_hard_cap)
+        if 'pool_idle_release_s' in change:
+            self._pool.idle_release_s = self.config.pool_idle_release_s
+        if change.any('auto_quality', 'frame_budget_ms'):
+            self._quality.frame_budget_ms = self.config.frame_budget_ms
+            self._quality.enabled = self.config.auto_quality and not self._virtual_time
+            self._quality.reset()
+        if change.any('debug', 'debug_info_position'):
+            self.debug_overlay = self._create_debug_overlay()
+            self.setAttribute(Qt.WidgetAttribute.WA_TransparentForMouseEvents, not self.config.debug)
+        self.update()
+
+    def _create_debug_overlay(self):
+        """调试信息面板（及其依赖的 psutil）只在开启调试模式时才导入和创建。"""
+        if not self.config.debug:
+            return None
+        from debug_overlay import DebugOverlay
+        return DebugOverlay(self, self.config, self._total_danmaku_count)
+
+    @staticmethod
+    def _invalidate_pixmap(danmaku: ActiveDanmaku):
+        """丢弃弹幕的位图缓存，下次绘制时按新设置重新渲染。"""
+        tiled = danmaku.tiles is not None
+        danmaku.release_cache()
+        if tiled:
+            danmaku.tiles = {}
+
+    def _apply_layout_change(self, relayout: bool):
+        """字体或轨道设置改变：重新计算轨道，屏幕上的弹幕保持所在轨道不变，按新的轨道高度换算纵向位置。"""
+        old_track_height, old_y_offset = self.track_height, self.y_offset
+        old_ascent = self._font_metrics.ascent()
+        self._apply_font()
+        if relayout:
+            # 旧字体和旧限制下的排版结果不会再被命中
+            clear_layout_cache()
+        height = self.height()
+        lanes = self._lane_count(height)
+        for name in ('_scroll_tracks', '_top_tracks', '_bottom_tracks'):
+            tracks = getattr(self, name)
+            setattr(self, name, (tracks + [float('-inf')] * lanes)[:lanes])
+
+        for d in self._active_danmaku:
+            # 去掉字号不同带来的基线偏移，得到弹幕所在轨道
+            base_y = d.position.y() - (d.font_metrics.ascent() - old_ascent)
+            old_span = max(1, math.ceil(d.height / old_track_height))
+            if relayout:
+                data = DanmakuData(0.0, d.mode, d.text, d.color, d.font_size)
+                d.font, d.font_metrics, font_key = self._font_for(data)
+                d.layout = cached_layout(d.text, font_key, d.font_metrics,
+                                         self._max_line_width(d.mode), self.config.max_lines)
+                d.width, d.height = d.layout.width, d.layout.height
+                self._invalidate_pixmap(d)
+                tiled = (d.mode == 1 and self.config.long_text_mode == 'tile' and
+                         d.width + self.config.stroke_width * 2 > self.config.max_pixmap_width)
+                d.tiles = {} if tiled else None
+                if d.mode != 1:
+                    d.position.setX((self.width() - d.width) / 2)
+            adjust = d.font_metrics.ascent() - self._font_metrics.ascent()
+            if d.mode == 4:
+                track_idx = round((height - base_y) / old_track_height) - old_span
+                span = max(1, math.ceil(d.height / self.track_height))
+                d.position.setY(height - (track_idx + span) * self.track_height + adjust)
+            else:
+                track_idx = round((base_y - old_y_offset) / old_track_height)
+                d.position.setY(track_idx * self.track_height + self.y_offset + adjust)
+
+    def _retime_scroll(self, old_config_speed: float):
+        """滚动速度改变：屏幕上的滚动弹幕从当前位置以新速度继续，轨道按新速度重新计算空出的时刻。"""
+        factor = self.config.scroll_speed / max(1, old_config_speed)
+        speed = self.scroll_speed
+        for d in self._active_danmaku:
+            if d.mode == 1:
+                d.speed = speed
+        now = self._anim_time
+        self._scroll_tracks = [now + (t - now) / factor if t > now else t for t in self._scroll_tracks]
+
+    def _retime_fixed(self, delta_s: float):
+        """固定弹幕时长改变：屏幕上的固定弹幕和被它们占用的轨道按差值延长或缩短。"""
+        for d in self._active_danmaku:
+            if d.mode != 1:
+                d.remaining_time += delta_s
+        now = self._anim_time
+        for name in ('_top_tracks', '_bottom_tracks'):
+            setattr(self, name, [t + delta_s if t > now else t for t in getattr(self, name)])
 
     def update_debug_playback_info(self, title: str, position_str: str, duration_str: str):
         """【新】将播放器信息传递给调试层。"""
@@ -82,53 +240,127 @@ class DanmakuWindow(QMainWindow):
             self.debug_overlay.update_playback_info(title, position_str, duration_str)
 
     # ... (其余方法 _find_track, set_stay_on_top, add_danmaku, 等保持不变) ...
-    def _find_track(self, danmaku_data: DanmakuData, text_width: int) -> tuple[float, bool]:
+    def _find_track(self, danmaku_data: DanmakuData, text_width: int, span: int = 1,
+                    elapsed: float = 0.0) -> tuple[float, bool]:
         if self.config.allow_overlap:
-            return self._find_track_with_overlap(danmaku_data)
+            return self._find_track_with_overlap(danmaku_data, span)
         else:
-            return self._find_track_without_overlap(danmaku_data, text_width)
+            return self._find_track_without_overlap(danmaku_data, text_width, span, elapsed)
 
-    def _find_track_with_overlap(self, danmaku_data: DanmakuData) -> tuple[float, bool]:
+    def _find_track_with_overlap(self, danmaku_data: DanmakuData, span: int = 1) -> tuple[float, bool]:
         mode = danmaku_data.mode
-        num_tracks = self.config.max_tracks
+        num_tracks = len(self._scroll_tracks)
         if num_tracks <= 0: return 0, False
-        track_idx = random.randint(0, num_tracks - 1)
+        span = min(span, num_tracks)
+        track_idx = self._rng.randint(0, num_tracks - span)
         if mode == 1 or mode == 5:
             y_pos = (track_idx * self.track_height) + self.y_offset
             return y_pos, True
         elif mode == 4:
-            y_pos = self.height() - ((track_idx + 1) * self.track_height)
+            y_pos = self.height() - ((track_idx + span) * self.track_height)
             return y_pos, True
         return 0, False
 
-    def _find_track_without_overlap(self, danmaku_data: DanmakuData, text_width: int) -> tuple[float, bool]:
-        current_time = time.monotonic()
+    @staticmethod
+    def _free_track_spans(tracks: list[float], current_time: float, span: int) -> list[int]:
+        """返回所有满足“从该轨道起连续 span 条轨道都空闲”的起始轨道序号。"""
+        if span == 1:
+            return [i for i, t in enumerate(tracks) if current_time > t]
+        free = [current_time > t for t in tracks]
+        return [i for i in range(len(tracks) - span + 1) if all(free[i:i + span])]
+
+    def _find_track_without_overlap(self, danmaku_data: DanmakuData, text_width: int, span: int = 1,
+                                    elapsed: float = 0.0) -> tuple[float, bool]:
+        # 迟到的弹幕已经走过了一段，轨道也相应地更早空出
+        current_time = self._anim_time - elapsed
         mode = danmaku_data.mode
         if mode == 1:
-            available_tracks = [i for i, t in enumerate(self._scroll_tracks) if current_time > t]
+            available_tracks = self._free_track_spans(self._scroll_tracks, current_time, span)
             if not available_tracks: return 0, False
-            track_idx = random.choice(available_tracks)
+            track_idx = self._rng.choice(available_tracks)
             y_pos = (track_idx * self.track_height) + self.y_offset
-            self._scroll_tracks[track_idx] = current_time + (text_width / self.config.scroll_speed) * 0.8
+            release_time = current_time + (text_width / self.scroll_speed) * 0.8
+            self._scroll_tracks[track_idx:track_idx + span] = [release_time] * span
             return y_pos, True
         elif mode == 5:
-            for i, track_time in enumerate(self._top_tracks):
-                if current_time > track_time:
-                    y_pos = (i * self.track_height) + self.y_offset
-                    self._top_tracks[i] = current_time + (self.config.fixed_duration_ms / 1000)
-                    return y_pos, True
-            return 0, False
+            available_tracks = self._free_track_spans(self._top_tracks, current_time, span)
+            if not available_tracks: return 0, False
+            i = available_tracks[0]
+            y_pos = (i * self.track_height) + self.y_offset
+            self._top_tracks[i:i + span] = [current_time + (self.config.fixed_duration_ms / 1000)] * span
+            return y_pos, True
         elif mode == 4:
-            for i, track_time in enumerate(self._bottom_tracks):
-                if current_time > track_time:
-                    y_pos = self.height() - ((i + 1) * self.track_height)
-                    self._bottom_tracks[i] = current_time + (self.config.fixed_duration_ms / 1000)
-                    return y_pos, True
-            return 0, False
+            available_tracks = self._free_track_spans(self._bottom_tracks, current_time, span)
+            if not available_tracks: return 0, False
+            i = available_tracks[0]
+            y_pos = self.height() - ((i + span) * self.track_height)
+            self._bottom_tracks[i:i + span] = [current_time + (self.config.fixed_duration_ms / 1000)] * span
+            return y_pos, True
         return 0, False
 
+    @property
+    def scroll_speed(self) -> float:
+        """当前覆盖层上的滚动速度（像素/秒）。按覆盖层宽度缩放，使弹幕横穿覆盖层的时间与全屏时相同。"""
+        return self.config.scroll_speed * self._overlay_rect.width() / self._reference_width
+
+    def _lane_count(self, height: int) -> int:
+        """给定高度内可容纳的轨道数，不超过配置的最大轨道数。"""
+        return max(1, min(self.config.max_tracks, height // self.track_height))
+
+    def set_overlay_geometry(self, rect: QRect | None):
+        """
+        把覆盖层移动到指定区域（通常是播放器窗口的客户区，Qt 逻辑坐标），None 表示整个主屏幕。
+        尺寸改变时就地重新计算轨道和滚动速度，并调整屏幕上已有的弹幕，无需重建窗口。
+        """
+        if rect is None or rect.isEmpty():
+            rect = QApplication.primaryScreen().geometry()
+        old = self._overlay_rect
+        if rect == old:
+            return
+        logging.debug(f"覆盖层区域: {rect.x()},{rect.y()} {rect.width()}x{rect.height()}")
+        self._overlay_rect = QRect(rect)
+        self.setGeometry(rect)
+        if rect.size() != old.size():
+            self._relayout(old.width(), old.height())
+
+    def _relayout(self, old_width: int, old_height: int):
+        """覆盖层尺寸改变后调整轨道数量和已有弹幕：滚动弹幕按宽度比例缩放位置和速度，固定弹幕重新居中，
+        底部弹幕随底边移动，落在新区域之外的弹幕直接回收。"""
+        width, height = self.width(), self.height()
+        lanes = self._lane_count(height)
+        for name in ('_scroll_tracks', '_top_tracks', '_bottom_tracks'):
+            tracks = getattr(self, name)
+            setattr(self, name, (tracks + [float('-inf')] * lanes)[:lanes])
+
+        scale = width / max(1, old_width)
+        still_active = []
+        for d in self._active_danmaku:
+            if d.mode == 1:
+                d.position.setX(d.position.x() * scale)
+                d.speed = self.scroll_speed
+            else:
+                d.position.setX((width - d.width) / 2)
+                if d.mode == 4:
+                    d.position.setY(d.position.y() + height - old_height)
+            if 0 <= d.position.y() <= height:
+                still_active.append(d)
+            else:
+                self._pool.release(d)
+        self._active_danmaku = still_active
+        self.update()
+
+    def set_overlay_state(self, visible: bool, stay_on_top: bool = False):
+        """显示或隐藏弹幕窗口并设置置顶状态。只在状态真正改变时操作窗口，可以重复调用。"""
+        if not visible:
+            if self.isVisible():
+                self.hide()
+            return
+        if not self.isVisible():
+            self.show()
+        self.set_stay_on_top(stay_on_top)
+
     def set_stay_on_top(self, stay_on_top: bool):
-        if IS_WINDOWS and stay_on_top and int(self.config.ontop_strategy) > 1:
+        if IS_WINDOWS and stay_on_top and self.isVisible() and int(self.config.ontop_strategy) > 1:
             if not self._on_top_timer.isActive():
                 self._on_top_timer.start(2000)
         else:
@@ -150,80 +382,361 @@ class DanmakuWindow(QMainWindow):
             logging.error(f"Win32 on-top error: {e}")
             self._on_top_timer.stop()
 
-    def add_danmaku(self, danmaku_data: DanmakuData):
-        if not self._free_danmaku:
-            logging.warning("对象池已满，无法添加新弹幕。")
-            return
-        text_width = self._font_metrics.horizontalAdvance(danmaku_data.text)
-        y_pos, track_found = self._find_track(danmaku_data, text_width)
-        if not track_found: return
-        danmaku_obj = self._free_danmaku.popleft()
-        danmaku_obj.init(danmaku_data, y_pos, text_width, self.config)
+    def estimated_lifetime(self) -> float:
+        """单条弹幕在屏幕上的大致存活时间（媒体时间，秒），用于对象池容量估算。"""
+        scroll_lifetime = self._overlay_rect.width() / max(1, self.scroll_speed)
+        return max(scroll_lifetime, self.config.fixed_duration_ms / 1000)
+
+    def max_lifetime(self) -> float:
+        """
+        一条弹幕可能在屏幕上停留的最长时间（媒体时间，秒）。
+        滚动弹幕按允许的最大宽度计算，跳转回填时以此确定需要回溯的时间窗口。
+        """
+        max_width = max_layout_width(self.config.max_pixmap_width, self.config.long_text_mode)
+        scroll_lifetime = (self._overlay_rect.width() + max_width) / max(1, self.scroll_speed)
+        return max(scroll_lifetime, self.config.fixed_duration_ms / 1000)
+
+    def reserve_pool(self, expected_active: int):
+        """根据即将到来的弹幕密度（由控制器预先计算）提前扩容对象池。"""
+        self._pool.reserve(expected_active)
+
+    def pool_stats(self) -> dict:
+        """返回对象池的大小、空闲数量以及高水位等统计信息。"""
+        return self._pool.stats()
+
+    def _max_line_width(self, mode: int) -> int:
+        """单行文本允许的最大像素宽度（不含描边）。固定弹幕不会超过屏幕宽度。"""
+        stroke_margin = self.config.stroke_width * 2
+        if mode == 1:
+            return max_layout_width(self.config.max_pixmap_width, self.config.long_text_mode) - stroke_margin
+        return min(self.config.max_pixmap_width, self._overlay_rect.width()) - stroke_margin
+
+    def _font_for(self, danmaku_data: DanmakuData) -> tuple[QFont, QFontMetrics, str]:
+        """返回弹幕字号对应的共享字体、度量和缓存键。标准字号直接使用基础字体。"""
+        if not self.config.honor_font_size:
+            return self._font, self._font_metrics, self._font_key
+        point_size = scaled_point_size(self.config.font_size, danmaku_data.font_size)
+        if point_size == self.config.font_size:
+            return self._font, self._font_metrics, self._font_key
+        font, metrics = get_font(self.config.font_name, point_size)
+        return font, metrics, font.key()
+
+    def add_danmaku(self, danmaku_data: DanmakuData, elapsed: float = 0.0) -> ActiveDanmaku | None:
+        """
+        生成一条弹幕。
+
+        Args:
+            danmaku_data (DanmakuData): 弹幕数据。
+            elapsed (float): 弹幕的预定出现时刻距今已过去的时间（秒），用于精确定位。
+
+        Returns:
+            ActiveDanmaku | None: 生成的活动弹幕；没有可用轨道、对象池已满或弹幕此刻已应消失时返回 None。
+        """
+        if self._pool.is_exhausted:
+            logging.warning("对象池已达上限，无法添加新弹幕。")
+            return None
+        font, metrics, font_key = self._font_for(danmaku_data)
+        layout = cached_layout(danmaku_data.text, font_key, metrics,
+                               self._max_line_width(danmaku_data.mode), self.config.max_lines)
+        if elapsed > 0 and self._has_expired(danmaku_data.mode, layout.width, elapsed):
+            return None
+        span = max(1, math.ceil(layout.height / self.track_height))
+        y_pos, track_found = self._find_track(danmaku_data, layout.width, span, elapsed)
+        if not track_found: return None
+        if metrics is not self._font_metrics:
+            # 轨道的 y 坐标是基础字体的基线，换算为当前字号的基线，使文字顶部与轨道对齐
+            y_pos += metrics.ascent() - self._font_metrics.ascent()
+        tiled = (danmaku_data.mode == 1 and self.config.long_text_mode == 'tile' and
+                 layout.width + self.config.stroke_width * 2 > self.config.max_pixmap_width)
+        danmaku_obj = self._pool.acquire(self._time_source())
+        danmaku_obj.init(danmaku_data, y_pos, layout, self.config, font, metrics,
+                         self._overlay_rect.width(), self.scroll_speed, tiled, elapsed)
         self._active_danmaku.append(danmaku_obj)
+        return danmaku_obj
 
-    def update_states(self):
-        delta_time = 1 / 60.0
-        current_time = time.monotonic()
+    def add_danmaku_batch(self, items: list[tuple[DanmakuData, float]], now: float):
+        """
+        批量生成弹幕。整批一次性预留对象池容量，然后在每帧的时间预算内依次完成
+        测量、轨道分配和位图预渲染，超出预算的部分顺延到后续帧。
+        每条弹幕都记录了自己的预定出现时刻，无论在哪一帧被处理，都会出现在其精确位置。
+
+        Args:
+            items (list[tuple[DanmakuData, float]]): (弹幕数据, 在 now 时刻已迟到的时间) 列表，按出现时间升序。
+            now (float): 计算 elapsed 时所用的单调时钟时间戳。
+        """
+        if not items:
+            return
+        self._pool.reserve(len(self._active_danmaku) + len(self._pending_spawns) + len(items))
+        # 换算为动画时间轴上的预定时刻，之后无论延迟多少帧都能算出准确的迟到时间
+        anim_now = self._anim_time + max(0.0, now - self._last_tick_time) * self._playback_rate
+        self._pending_spawns.extend((data, anim_now - elapsed) for data, elapsed in items)
+
+    def _drain_pending_spawns(self, budget_s: float):
+        """
+        在时间预算内尽可能多地处理待生成的弹幕，窗口可见时顺带预渲染它们的位图。
+        预算从开始处理时算起，且每帧至少处理一条，帧内其他工作再慢队列也能前进。虚拟时间模式下一次处理完。
+        """
+        deadline = float('inf') if self._virtual_time else time.perf_counter() + budget_s
+        while self._pending_spawns:
+            data, scheduled_time = self._pending_spawns.popleft()
+            danmaku = self.add_danmaku(data, elapsed=max(0.0, self._anim_time - scheduled_time))
+            if danmaku is not None:
+                self.prewarm([danmaku])
+            if time.perf_counter() >= deadline:
+                break
+
+    def _has_expired(self, mode: int, width: int, elapsed: float) -> bool:
+        """判断一条迟到了 elapsed 秒的弹幕此刻是否已经应该离开屏幕。"""
+        if mode == 1:
+            return self._overlay_rect.width() - self.scroll_speed * elapsed + width <= 0
+        return elapsed >= self.config.fixed_duration_ms / 1000
+
+    def backfill(self, items: list[tuple[DanmakuData, float]]) -> int:
+        """
+        跳转后回填本应正在屏幕上的弹幕：按各自的已过时间直接放到对应位置，
+        窗口可见时在这里（而非下一次 paintEvent 中）预渲染它们的位图，使下一帧即可显示。
+        同步处理只占用一帧的生成预算，其余弹幕交给 add_danmaku_batch 在后续帧中生成，
+        同样出现在各自的精确位置。虚拟时间模式下一次处理完。
+
+        Args:
+            items (list[tuple[DanmakuData, float]]): (弹幕数据, 已过时间) 列表，应按出现时间升序排列。
+
+        Returns:
+            int: 立即回填的弹幕数量，不含顺延到后续帧的弹幕。
+        """
+        deadline = float('inf') if self._virtual_time else time.perf_counter() + self.config.spawn_budget_ms / 1000
+        restored = 0
+        for index, (data, elapsed) in enumerate(items):
+            danmaku = self.add_danmaku(data, elapsed)
+            if danmaku is not None:
+                self.prewarm([danmaku])
+                restored += 1
+            if time.perf_counter() >= deadline:
+                deferred = items[index + 1:]
+                if deferred:
+                    logging.debug(f"回填超出本帧预算，其余 {len(deferred)} 条在后续帧中生成")
+                    self.add_danmaku_batch(deferred, self._last_tick_time)
+                break
+        self.update()
+        return restored
+
+    def prewarm(self, danmaku_list: list[ActiveDanmaku]):
+        """
+        提前渲染一批弹幕的位图缓存。分块渲染的弹幕仍按需渲染可见分块。
+        窗口隐藏时（如追赶隐藏期间的动画）不渲染，只推进位置，重新显示后由 paintEvent 按需渲染。
+        """
+        if not self.isVisible():
+            return
+        for danmaku in danmaku_list:
+            if danmaku.tiles is None and danmaku.pixmap_cache is None:
+                self._render_danmaku_to_pixmap(danmaku)
+
+    def set_playback_rate(self, rate: float):
+        """设置播放速率。滚动速度和固定弹幕的显示时长都按该速率缩放。"""
+        if rate > 0 and rate != self._playback_rate:
+            logging.info(f"播放速率变为 {rate:g}x")
+            # 隐藏期间的动画先按旧速率推进到此刻
+            self._catch_up_if_hidden()
+            self._playback_rate = rate
+
+    def active_snapshot(self) -> list[tuple[str, float, float]]:
+        """返回当前屏幕上每条弹幕的 (文本, x, y)，用于比较回放结果。"""
+        return [(d.text, d.position.x(), d.position.y()) for d in self._active_danmaku]
+
+    def step_frame(self):
+        """虚拟时间模式下推进一帧（调用前应先推进注入的时钟）。暂停或隐藏时与定时器一样不做任何事。"""
+        if self._running:
+            self.update_states()
+
+    def update_states(self, max_delta: float = MAX_FRAME_DELTA_S):
+        """
+        推进一帧动画。
+
+        Args:
+            max_delta (float): 本帧允许推进的最长时间（秒）。定时器驱动时截断卡顿造成的长间隔；
+                窗口重新显示时传入 inf，一步追上隐藏期间经过的时间。
+        """
+        update_start = time.perf_counter()
+        current_time = self._time_source()
+        # 使用真实的帧间隔推进动画，使位置与播放时钟保持一致；过长的间隔（如卡顿）被截断。
+        # 弹幕的速度和时长以媒体时间计，因此再乘以播放速率。
+        wall_delta = min(current_time - self._last_tick_time, max_delta)
+        self._last_tick_time = current_time
+        delta_time = wall_delta * self._playback_rate
+        self._anim_time += delta_time
         still_active = []
         for d in self._active_danmaku:
-            if d.is_active(current_time, delta_time):
+            if d.is_active(delta_time):
                 still_active.append(d)
             else:
-                self._free_danmaku.append(d)
+                self._pool.release(d)
         self._active_danmaku = still_active
+        # 先推进已有弹幕，再让控制器按此刻的播放位置生成新弹幕
+        self.frame_ticked.emit(current_time)
+        if self._pending_spawns:
+            self._drain_pending_spawns(self.config.spawn_budget_ms / 1000)
+        self._pool.maintain(current_time, self.estimated_lifetime() / self._playback_rate)
         if self.debug_overlay:
             self.debug_overlay.update_stats(
                 active_count=len(self._active_danmaku),
-                pool_free=len(self._free_danmaku)
+                pool_free=self._pool.free_count,
+                pool_size=self._pool.size,
+                high_water=self._pool.high_water_active
             )
+        self._last_update_ms = (time.perf_counter() - update_start) * 1000
         self.update()
 
-    def _render_danmaku_to_pixmap(self, danmaku: ActiveDanmaku):
+    def _rasterize(self, danmaku: ActiveDanmaku, x0: int, width: int) -> QPixmap:
+        """
+        将弹幕排版中水平区间 [x0, x0 + width) 的部分（位图坐标，含描边边距）渲染为位图。
+        整条渲染时 x0 为0、width 为整条宽度；分块渲染时每次只渲染一个分块。
+        """
+        tier = self._quality.tier
         stroke_offset = self.config.stroke_width
-        bounding_rect = self._font_metrics.boundingRect(danmaku.text)
-        pixmap_size = QSize(bounding_rect.width() + stroke_offset * 2, bounding_rect.height() + stroke_offset * 2)
-        pixmap = QPixmap(pixmap_size)
+        layout = danmaku.layout
+        pixmap = QPixmap(QSize(width, layout.height + stroke_offset * 2))
         pixmap.fill(Qt.GlobalColor.transparent)
         painter = QPainter(pixmap)
-        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
-        painter.setFont(self._font)
-        path = QPainterPath()
-        path.addText(stroke_offset, self._font_metrics.ascent() + stroke_offset, self._font, danmaku.text)
-        if self.config.stroke_width > 0:
-            stroker = QPainterPathStroker()
-            stroker.setWidth(self.config.stroke_width * 2)
-            stroker.setCapStyle(Qt.PenCapStyle.RoundCap)
-            stroker.setJoinStyle(Qt.PenJoinStyle.RoundJoin)
-            stroke_path = stroker.createStroke(path)
-            painter.setPen(Qt.PenStyle.NoPen)
-            painter.fillPath(stroke_path, QColor("black"))
-        painter.fillPath(path, danmaku.color)
+        if tier < QualityTier.NO_ALPHA:
+            painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        painter.setFont(danmaku.font)
+        is_full = x0 == 0 and width >= layout.width + stroke_offset * 2
+        margin = danmaku.font_metrics.maxWidth() + stroke_offset * 2
+        for i, line in enumerate(layout.lines):
+            if is_full:
+                offset, segment = 0, line
+            else:
+                offset, segment = layout.line_segment(i, x0 - margin, x0 + width + margin, danmaku.font_metrics)
+            if not segment:
+                continue
+            painter.save()
+            painter.translate(offset - x0, i * layout.line_height)
+            if tier == QualityTier.FULL:
+                draw_outlined_text(painter, segment, danmaku.font, danmaku.font_metrics,
+                                   danmaku.color, stroke_offset, self.config.outline_method)
+            else:
+                origin = QPointF(stroke_offset, danmaku.font_metrics.ascent() + stroke_offset)
+                if stroke_offset > 0 and tier == QualityTier.SHADOW:
+                    # 降级为右下方的偏移阴影，只需多绘制一次文字
+                    painter.setPen(OUTLINE_COLOR)
+                    painter.drawText(QPointF(origin.x() + stroke_offset, origin.y() + stroke_offset), segment)
+                painter.setPen(danmaku.color)
+                painter.drawText(origin, segment)
+            painter.restore()
         painter.end()
-        danmaku.pixmap_cache = pixmap
+        return pixmap
+
+    def _render_danmaku_to_pixmap(self, danmaku: ActiveDanmaku):
+        layout = danmaku.layout
+        ink_width = max(danmaku.font_metrics.boundingRect(line).width() for line in layout.lines)
+        width = min(max(layout.width, ink_width), self.config.max_pixmap_width - self.config.stroke_width * 2)
+        danmaku.pixmap_cache = self._rasterize(danmaku, 0, width + self.config.stroke_width * 2)
+
+    def _paint_tiles(self, painter: QPainter, danmaku: ActiveDanmaku, top: float):
+        """
+        绘制分块渲染的超长弹幕。只渲染与屏幕相交的分块，
+        已完全移出屏幕左侧的分块会立即释放（滚动弹幕不会再回来）。
+        """
+        tile_width = self.config.max_pixmap_width
+        left = danmaku.position.x() - self.config.stroke_width
+        total_width = danmaku.width + self.config.stroke_width * 2
+        tile_count = math.ceil(total_width / tile_width)
+        first = max(0, int(-left // tile_width))
+        for k in [k for k in danmaku.tiles if k < first]:
+            del danmaku.tiles[k]
+        screen_width = self.width()
+        for k in range(first, tile_count):
+            tile_x = left + k * tile_width
+            if tile_x >= screen_width:
+                break
+            tile = danmaku.tiles.get(k)
+            if tile is None:
+                tile = self._rasterize(danmaku, k * tile_width, min(tile_width, total_width - k * tile_width))
+                danmaku.tiles[k] = tile
+            painter.drawPixmap(QPointF(tile_x, top), tile)
 
     def paintEvent(self, event):
+        paint_start = time.perf_counter()
         painter = QPainter(self)
-        painter.setOpacity(self.config.opacity)
+        apply_opacity = self._quality.tier < QualityTier.NO_ALPHA
+        if apply_opacity:
+            painter.setOpacity(self.config.opacity)
         for danmaku in self._active_danmaku:
+            top = danmaku.position.y() - self.config.stroke_width - danmaku.font_metrics.ascent()
+            if danmaku.tiles is not None:
+                self._paint_tiles(painter, danmaku, top)
+                continue
             if danmaku.pixmap_cache is None:
                 self._render_danmaku_to_pixmap(danmaku)
             if danmaku.pixmap_cache:
-                draw_pos = QPointF(danmaku.position.x() - self.config.stroke_width,
-                                   danmaku.position.y() - self.config.stroke_width - self._font_metrics.ascent())
+                draw_pos = QPointF(danmaku.position.x() - self.config.stroke_width, top)
                 painter.drawPixmap(draw_pos, danmaku.pixmap_cache)
-        painter.setOpacity(1.0)
+        if apply_opacity:
+            painter.setOpacity(1.0)
         if self.debug_overlay:
+            self.debug_overlay.update_quality(self._quality.tier_name, self._quality.avg_frame_ms)
             self.debug_overlay.paint(painter)
+        painter.end()
+        frame_ms = self._last_update_ms + (time.perf_counter() - paint_start) * 1000
+        self._quality.record_frame(frame_ms)
+
+    def is_running(self) -> bool:
+        """动画是否正在推进（播放中且窗口可见）。"""
+        return self._running
+
+    def set_total_danmaku_count(self, count: int):
+        """更换弹幕文件后更新调试信息中的弹幕总数。"""
+        self._total_danmaku_count = count
+        if self.debug_overlay:
+            self.debug_overlay.set_total_count(count)
 
     def clear_danmaku(self):
-        self._free_danmaku.extend(self._active_danmaku)
+        self._pending_spawns.clear()
+        self._pool.release_all(self._active_danmaku)
         self._active_danmaku.clear()
+        # 被清除的弹幕不再占用轨道，否则跳转后的回填找不到空闲轨道
+        for name in ('_scroll_tracks', '_top_tracks', '_bottom_tracks'):
+            setattr(self, name, [float('-inf')] * len(getattr(self, name)))
         self.update()
 
+    def showEvent(self, event):
+        super().showEvent(event)
+        self._sync_running()
+        if self.windowFlags() & Qt.WindowType.WindowStaysOnTopHint:
+            self.set_stay_on_top(True)
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self._sync_running()
+        if self._on_top_timer.isActive():
+            self._on_top_timer.stop()
+
     def pause(self):
-        if self._animation_timer.isActive():
-            self._animation_timer.stop()
+        # 隐藏期间暂停：先把动画推进到暂停时刻，重新显示时才能从正确的位置继续
+        self._catch_up_if_hidden()
+        self._ticking = False
+        self._sync_running()
 
     def resume(self):
-        if not self._animation_timer.isActive():
-            self._animation_timer.start(1000 // 60)
\ No newline at end of file
+        if not self._ticking:
+            self._ticking = True
+            self._last_tick_time = self._time_source()
+            self._sync_running()
+
+    def _catch_up_if_hidden(self):
+        """播放中但窗口隐藏时，把动画一步推进到当前时刻。"""
+        if self._ticking and not self._running:
+            self.update_states(max_delta=float('inf'))
+
+    def _sync_running(self):
+        """动画只在播放中且窗口可见时推进。从隐藏恢复时一步追上隐藏期间经过的时间。"""
+        running = self._ticking and self.isVisible()
+        if running == self._running:
+            return
+        self._running = running
+        if running:
+            if not self._virtual_time:
+                self._animation_timer.start(1000 // 60)
+            self.update_states(max_delta=float('inf'))
+        elif self._animation_timer.isActive():
+            self._animation_timer.stop()
\ No newline at end of file
@@ -25,9 +25,13 @@ class DebugOverlay:
         # 动态信息初始化
         self._active_count = 0
         self._pool_free = 0
+        self._pool_size = 0
+        self._high_water = 0
         self._cpu_usage = 0.0
         self._mem_usage_mb = 0.0
         self._frame_count = 0
+        self._quality_tier = "FULL"
+        self._avg_frame_ms = 0.0
         
         # 播放器信息初始化
         self._media_title = "N/A"
@@ -53,10 +57,20 @@ class DebugOverlay:
             Qt.AlignmentFlag.AlignBottom | Qt.AlignmentFlag.AlignLeft
         )
 
-    def update_stats(self, active_count: int, pool_free: int):
+    def set_total_count(self, total_danmaku_count: int):
+        self._total_count = total_danmaku_count
+
+    def update_stats(self, active_count: int, pool_free: int, pool_size: int = 0, high_water: int = 0):
         """从渲染器更新弹幕相关的统计数据。"""
         self._active_count = active_count
         self._pool_free = pool_free
+        self._pool_size = pool_size
+        self._high_water = high_water
+
+    def update_quality(self, tier_name: str, avg_frame_ms: float):
+        """从渲染器更新当前的画质档位和平均帧耗时。"""
+        self._quality_tier = tier_name
+        self._avg_frame_ms = avg_frame_ms
 
     def update_playback_info(self, title: str, position_str: str, duration_str: str):
         """从渲染器更新播放器相关的统计数据。"""
@@ -99,11 +113,12 @@ class DebugOverlay:
             f"Time: {self._media_position} / {self._media_duration}\n"
             f"--------------------------\n"
             f"FPS: {fps:.1f}\n"
+            f"Quality: {self._quality_tier} ({self._avg_frame_ms:.1f} ms)\n"
             f"CPU: {self._cpu_usage:.1f}%\n"
             f"Mem: {self._mem_usage_mb:.1f} MB\n"
             f"Total Danmaku: {self._total_count}\n"
             f"Active Danmaku: {self._active_count}\n"
-            f"Pool Free: {self._pool_free}"
+            f"Pool Free: {self._pool_free} / {self._pool_size} (peak active {self._high_water})"
         )
         
         painter.setFont(self._font)
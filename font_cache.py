@@ -0,0 +1,37 @@
+# font_cache.py
+from PyQt6.QtGui import QFont, QFontMetrics
+
+# Bilibili 弹幕的标准字号，其他字号按与它的比例缩放
+STANDARD_DANMAKU_SIZE = 25
+# 相对配置字号的缩放范围，防止异常字号产生过大或过小的文字
+MIN_SCALE = 0.5
+MAX_SCALE = 2.0
+
+_fonts: dict[tuple[str, int], tuple[QFont, QFontMetrics]] = {}
+
+
+def get_font(font_name: str, point_size: int) -> tuple[QFont, QFontMetrics]:
+    """
+    获取指定字体和字号的 QFont 及其 QFontMetrics。
+    同一字号的对象在整个进程内共享，避免每条弹幕重复创建。
+    """
+    key = (font_name, point_size)
+    entry = _fonts.get(key)
+    if entry is None:
+        font = QFont(font_name, point_size, QFont.Weight.Bold)
+        entry = (font, QFontMetrics(font))
+        _fonts[key] = entry
+    return entry
+
+
+def scaled_point_size(base_size: int, danmaku_size: int) -> int:
+    """将弹幕自带的字号（如 18/25/36）换算为相对于配置字号的实际字号。"""
+    if danmaku_size == STANDARD_DANMAKU_SIZE or danmaku_size <= 0:
+        return base_size
+    scale = min(MAX_SCALE, max(MIN_SCALE, danmaku_size / STANDARD_DANMAKU_SIZE))
+    return max(1, round(base_size * scale))
+
+
+def clear_font_cache():
+    """清空字体缓存，例如在字体名称改变之后。"""
+    _fonts.clear()
@@ -0,0 +1,372 @@
+# foreground_watcher.py
+import logging
+import os
+import sys
+from collections import OrderedDict
+
+from PyQt6.QtCore import QObject, QRect, QSocketNotifier, pyqtSignal
+from PyQt6.QtGui import QGuiApplication
+
+# psutil 用于由进程ID获取进程名
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
+# 平台相关的导入，使其成为可选
+IS_WINDOWS = sys.platform == 'win32'
+if IS_WINDOWS:
+    import ctypes
+    from ctypes import wintypes
+
+XLIB_AVAILABLE = False
+if not IS_WINDOWS:
+    try:
+        from Xlib import X, display as xdisplay, error as xerror
+        XLIB_AVAILABLE = True
+    except ImportError:
+        pass
+
+
+def native_to_logical(x: int, y: int, width: int, height: int) -> QRect | None:
+    """
+    把原生坐标（物理像素）下的窗口矩形换算为 Qt 的逻辑坐标。
+    Qt 中每个屏幕的左上角保持原生坐标，屏幕内的偏移和尺寸按该屏幕的缩放比例换算；
+    按窗口中心所在的屏幕换算，窗口不在任何屏幕上时返回 None。
+    """
+    if width <= 0 or height <= 0:
+        return None
+    center_x, center_y = x + width / 2, y + height / 2
+    for screen in QGuiApplication.screens():
+        origin = screen.geometry().topLeft()
+        dpr = screen.devicePixelRatio()
+        native_width, native_height = screen.geometry().width() * dpr, screen.geometry().height() * dpr
+        if origin.x() <= center_x < origin.x() + native_width and origin.y() <= center_y < origin.y() + native_height:
+            return QRect(round(origin.x() + (x - origin.x()) / dpr), round(origin.y() + (y - origin.y()) / dpr),
+                         round(width / dpr), round(height / dpr))
+    return None
+
+
+class ForegroundWatcher(QObject):
+    """
+    前台窗口监视器的基类。
+    由平台的窗口事件驱动（而非轮询），只在前台窗口切换时重新解析，
+    并缓存 窗口->进程ID 和 进程ID->进程名 的映射；窗口销毁时使相应缓存失效。
+    current 属性给出缓存的前台进程名，读取它不会产生任何系统调用。
+    geometry 属性给出前台窗口客户区的位置和大小，窗口移动或缩放时更新。
+    """
+    # 前台进程名改变时发射，携带新的进程名（无法解析时为空字符串）
+    foreground_changed = pyqtSignal(object)
+    # 前台窗口的客户区矩形改变时发射，携带 QRect（逻辑坐标），未知或最小化时为 None
+    foreground_geometry_changed = pyqtSignal(object)
+
+    # 窗口->进程ID 缓存的最大条目数
+    CACHE_SIZE = 64
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._current: str | None = None
+        self._window = None
+        self._geometry: QRect | None = None
+        self._window_pids: OrderedDict = OrderedDict()
+        self._pid_names: dict[int, str] = {}
+        # 统计实际发生的系统查询次数，用于验证缓存效果
+        self.window_lookups = 0
+        self.process_lookups = 0
+
+    @property
+    def supported(self) -> bool:
+        """当前平台是否能够判断前台窗口。"""
+        return True
+
+    @property
+    def current(self) -> str | None:
+        """缓存的前台窗口进程名。不支持的平台上为 None。"""
+        return self._current
+
+    @property
+    def geometry(self) -> QRect | None:
+        """缓存的前台窗口客户区矩形（Qt 逻辑坐标），未知时为 None。"""
+        return self._geometry
+
+    def stop(self):
+        """停止监听窗口事件。"""
+        pass
+
+    def _set_foreground_window(self, window):
+        """前台窗口改变时由子类调用，解析进程名并在改变时发射信号。"""
+        self._window = window
+        name = None
+        if window:
+            pid = self._window_pid(window)
+            if pid:
+                name = self._process_name(pid)
+        name = name or ''
+        if name != self._current:
+            self._current = name
+            logging.debug(f"前台窗口进程: {name or '(未知)'}")
+            self.foreground_changed.emit(name)
+        self._refresh_geometry()
+
+    def _refresh_geometry(self):
+        """重新读取前台窗口的矩形。窗口切换时，以及子类收到窗口移动/缩放事件时调用。"""
+        rect = None
+        if self._window:
+            native = self._query_window_rect(self._window)
+            if native:
+                rect = native_to_logical(*native)
+        if rect != self._geometry:
+            self._geometry = rect
+            self.foreground_geometry_changed.emit(rect)
+
+    def _window_pid(self, window) -> int | None:
+        pid = self._window_pids.get(window)
+        if pid is not None:
+            self._window_pids.move_to_end(window)
+            return pid
+        self.window_lookups += 1
+        pid = self._query_window_pid(window)
+        if pid:
+            self._window_pids[window] = pid
+            if len(self._window_pids) > self.CACHE_SIZE:
+                old_window, old_pid = self._window_pids.popitem(last=False)
+                self._on_window_evicted(old_window)
+                self._release_pid_if_unused(old_pid)
+        return pid
+
+    def _process_name(self, pid: int) -> str | None:
+        name = self._pid_names.get(pid)
+        if name is None and PSUTIL_AVAILABLE:
+            self.process_lookups += 1
+            try:
+                name = psutil.Process(pid).name()
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                return None
+            self._pid_names[pid] = name
+        return name
+
+    def _forget_window(self, window):
+        """窗口被销毁时调用。进程的最后一个已缓存窗口消失时，同时丢弃该进程名（进程ID可能被复用）。"""
+        pid = self._window_pids.pop(window, None)
+        if pid is not None:
+            self._release_pid_if_unused(pid)
+
+    def _release_pid_if_unused(self, pid: int):
+        if pid not in self._window_pids.values():
+            self._pid_names.pop(pid, None)
+            self._on_pid_released(pid)
+
+    def _query_window_pid(self, window) -> int | None:
+        raise NotImplementedError
+
+    def _query_window_rect(self, window) -> tuple[int, int, int, int] | None:
+        """返回窗口客户区在原生坐标下的 (x, y, 宽, 高)，不支持或窗口不可见时返回 None。"""
+        return None
+
+    def _on_window_evicted(self, window):
+        """窗口因缓存容量被移出时调用，子类可在此停止对它的监听。"""
+        pass
+
+    def _on_pid_released(self, pid: int):
+        """某个进程不再有缓存的窗口时调用。"""
+        pass
+
+
+class NullForegroundWatcher(ForegroundWatcher):
+    """无法判断前台窗口的平台（如 Wayland、缺少依赖时）使用的空实现。"""
+    @property
+    def supported(self) -> bool:
+        return False
+
+    def _query_window_pid(self, window) -> int | None:
+        return None
+
+
+class WindowsForegroundWatcher(ForegroundWatcher):
+    """
+    Windows 实现。通过 SetWinEventHook 接收 EVENT_SYSTEM_FOREGROUND 事件，
+    回调经由 Qt 主线程的消息循环送达。对已缓存的进程另外挂接其窗口销毁事件，以使缓存失效。
+    """
+    EVENT_SYSTEM_FOREGROUND = 0x0003
+    EVENT_OBJECT_DESTROY = 0x8001
+    EVENT_OBJECT_LOCATIONCHANGE = 0x800B
+    WINEVENT_OUTOFCONTEXT = 0x0000
+    OBJID_WINDOW = 0
+    CHILDID_SELF = 0
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._user32 = ctypes.windll.user32
+        self._user32.SetWinEventHook.restype = wintypes.HANDLE
+        win_event_proc = ctypes.WINFUNCTYPE(None, wintypes.HANDLE, wintypes.DWORD, wintypes.HWND,
+                                            wintypes.LONG, wintypes.LONG, wintypes.DWORD, wintypes.DWORD)
+        # 回调对象必须一直被引用，否则会被垃圾回收导致崩溃
+        self._foreground_proc = win_event_proc(self._on_foreground_event)
+        self._destroy_proc = win_event_proc(self._on_destroy_event)
+        self._location_proc = win_event_proc(self._on_location_event)
+        self._destroy_hooks: dict[int, int] = {} # 进程ID -> 窗口销毁事件的钩子
+        self._location_hook = None # 只挂接前台窗口所属进程的位置变化事件
+        self._location_pid = 0
+        self._hook = self._set_hook(self.EVENT_SYSTEM_FOREGROUND, self._foreground_proc, 0)
+        if not self._hook:
+            logging.warning("SetWinEventHook 失败，无法监听前台窗口切换。")
+        self._switch_foreground(self._user32.GetForegroundWindow())
+
+    def stop(self):
+        if self._hook:
+            self._user32.UnhookWinEvent(self._hook)
+            self._hook = None
+        for hook in self._destroy_hooks.values():
+            self._user32.UnhookWinEvent(hook)
+        self._destroy_hooks.clear()
+        self._hook_location_events(0)
+
+    def _set_hook(self, event: int, proc, pid: int) -> int:
+        return self._user32.SetWinEventHook(event, event, 0, proc, pid, 0, self.WINEVENT_OUTOFCONTEXT)
+
+    def _on_foreground_event(self, hook, event, hwnd, id_object, id_child, thread_id, time_ms):
+        self._switch_foreground(hwnd)
+
+    def _switch_foreground(self, hwnd):
+        self._set_foreground_window(hwnd)
+        self._hook_location_events(self._window_pids.get(hwnd, 0))
+
+    def _hook_location_events(self, pid: int):
+        """把窗口位置变化事件的钩子移到新的前台进程上。"""
+        if pid == self._location_pid:
+            return
+        if self._location_hook:
+            self._user32.UnhookWinEvent(self._location_hook)
+            self._location_hook = None
+        self._location_pid = pid
+        if pid:
+            self._location_hook = self._set_hook(self.EVENT_OBJECT_LOCATIONCHANGE, self._location_proc, pid)
+
+    def _on_location_event(self, hook, event, hwnd, id_object, id_child, thread_id, time_ms):
+        if hwnd == self._window and id_object == self.OBJID_WINDOW and id_child == self.CHILDID_SELF:
+            self._refresh_geometry()
+
+    def _on_destroy_event(self, hook, event, hwnd, id_object, id_child, thread_id, time_ms):
+        if id_object == self.OBJID_WINDOW and id_child == self.CHILDID_SELF and hwnd in self._window_pids:
+            self._forget_window(hwnd)
+
+    def _query_window_pid(self, hwnd) -> int | None:
+        pid = wintypes.DWORD()
+        if not self._user32.GetWindowThreadProcessId(hwnd, ctypes.byref(pid)):
+            return None
+        if pid.value and pid.value not in self._destroy_hooks:
+            # 只挂接已缓存进程的销毁事件，避免接收全系统的对象销毁通知
+            hook = self._set_hook(self.EVENT_OBJECT_DESTROY, self._destroy_proc, pid.value)
+            if hook:
+                self._destroy_hooks[pid.value] = hook
+        return pid.value or None
+
+    def _query_window_rect(self, hwnd) -> tuple[int, int, int, int] | None:
+        # Qt 6 进程是 DPI 感知的，这里得到的是物理像素坐标
+        rect = wintypes.RECT()
+        if self._user32.IsIconic(hwnd) or not self._user32.GetClientRect(hwnd, ctypes.byref(rect)):
+            return None
+        origin = wintypes.POINT(0, 0)
+        if not self._user32.ClientToScreen(hwnd, ctypes.byref(origin)):
+            return None
+        return origin.x, origin.y, rect.right - rect.left, rect.bottom - rect.top
+
+    def _on_pid_released(self, pid: int):
+        hook = self._destroy_hooks.pop(pid, None)
+        if hook:
+            self._user32.UnhookWinEvent(hook)
+
+
+class X11ForegroundWatcher(ForegroundWatcher):
+    """
+    X11 实现。监听根窗口的 _NET_ACTIVE_WINDOW 属性变化（由窗口管理器维护），
+    通过 QSocketNotifier 在 Qt 主线程中处理 X 事件；窗口的进程ID取自 _NET_WM_PID。
+    对已缓存的窗口订阅 StructureNotify，收到 DestroyNotify 时使缓存失效，
+    收到前台窗口的 ConfigureNotify（移动、缩放）或 Map/UnmapNotify（最小化）时更新其矩形。
+    """
+    def __init__(self, display_name: str | None = None, parent=None):
+        super().__init__(parent)
+        self._display = xdisplay.Display(display_name)
+        self._root = self._display.screen().root
+        self._net_active_window = self._display.intern_atom('_NET_ACTIVE_WINDOW')
+        self._net_wm_pid = self._display.intern_atom('_NET_WM_PID')
+        self._root.change_attributes(event_mask=X.PropertyChangeMask)
+        self._display.flush()
+        self._notifier = QSocketNotifier(self._display.fileno(), QSocketNotifier.Type.Read, self)
+        self._notifier.activated.connect(self._process_events)
+        self._refresh()
+
+    def stop(self):
+        self._notifier.setEnabled(False)
+        self._display.close()
+
+    def _process_events(self):
+        # 同步请求（读取属性）期间到达的事件会被 Xlib 排入内部队列，因此循环直到队列为空
+        while self._display.pending_events():
+            active_changed = False
+            geometry_changed = False
+            while self._display.pending_events():
+                event = self._display.next_event()
+                if event.type == X.PropertyNotify and event.atom == self._net_active_window:
+                    active_changed = True
+                elif event.type == X.DestroyNotify:
+                    self._forget_window(event.window.id)
+                elif event.type in (X.ConfigureNotify, X.MapNotify, X.UnmapNotify) and event.window.id == self._window:
+                    geometry_changed = True
+            # 连续多次切换或拖动只需解析最后一次
+            if active_changed:
+                self._refresh()
+            elif geometry_changed:
+                self._refresh_geometry()
+
+    def _refresh(self):
+        try:
+            prop = self._root.get_full_property(self._net_active_window, X.AnyPropertyType)
+        except xerror.XError:
+            prop = None
+        window = prop.value[0] if prop is not None and len(prop.value) else 0
+        self._set_foreground_window(window)
+
+    def _query_window_pid(self, window_id) -> int | None:
+        window = self._display.create_resource_object('window', window_id)
+        try:
+            prop = window.get_full_property(self._net_wm_pid, X.AnyPropertyType)
+            if prop is None or not len(prop.value):
+                return None
+            # 订阅该窗口的销毁通知，用于使缓存失效
+            window.change_attributes(event_mask=X.StructureNotifyMask)
+            self._display.flush()
+        except xerror.XError:
+            return None
+        return int(prop.value[0])
+
+    def _query_window_rect(self, window_id) -> tuple[int, int, int, int] | None:
+        window = self._display.create_resource_object('window', window_id)
+        try:
+            if window.get_attributes().map_state != X.IsViewable:
+                return None
+            geometry = window.get_geometry()
+            origin = self._root.translate_coords(window, 0, 0)
+        except xerror.XError:
+            return None
+        return origin.x, origin.y, geometry.width, geometry.height
+
+    def _on_window_evicted(self, window_id):
+        try:
+            self._display.create_resource_object('window', window_id).change_attributes(event_mask=X.NoEventMask)
+        except xerror.XError:
+            pass
+
+
+def create_foreground_watcher(parent=None) -> ForegroundWatcher:
+    """根据当前平台创建前台窗口监视器，不可用时返回空实现。"""
+    if IS_WINDOWS:
+        return WindowsForegroundWatcher(parent)
+    if XLIB_AVAILABLE and os.environ.get('DISPLAY'):
+        try:
+            return X11ForegroundWatcher(parent=parent)
+        except Exception as e:
+            logging.warning(f"无法连接到 X11 显示服务器，前台窗口检测不可用: {e}")
+    logging.info("当前平台不支持前台窗口检测，弹幕窗口将始终显示。")
+    return NullForegroundWatcher(parent)
@@ -0,0 +1,358 @@
+# live_ingest.py
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import deque
+
+from PyQt6.QtCore import QObject, pyqtSignal
+from PyQt6.QtGui import QColor
+
+from async_runtime import AsyncTask, get_runtime
+from danmaku_models import DanmakuData
+
+try:
+    import websockets
+    WEBSOCKETS_AVAILABLE = True
+except ImportError:
+    WEBSOCKETS_AVAILABLE = False
+
+# 单行消息的最大长度（字节），超过时断开该连接
+MAX_LINE_BYTES = 64 * 1024
+# 每次从套接字读取的字节数；一次读取的多行消息作为一组进入队列
+READ_CHUNK_BYTES = 64 * 1024
+
+
+def parse_address(address: str) -> tuple[str, str, int]:
+    """
+    解析监听地址。支持 'tcp://主机:端口' 和 'unix:///路径'（仅非 Windows 平台）。
+
+    Returns:
+        tuple[str, str, int]: ('tcp', 主机, 端口) 或 ('unix', 路径, 0)。
+    """
+    if address.startswith('unix://'):
+        return 'unix', address[len('unix://'):], 0
+    if address.startswith('tcp://'):
+        address = address[len('tcp://'):]
+    host, sep, port = address.rpartition(':')
+    if not sep or not port.isdigit():
+        raise ValueError(f"无效的监听地址: '{address}'")
+    return 'tcp', host or '127.0.0.1', int(port)
+
+
+def parse_message(line: bytes | str) -> tuple[str, int, int, int, float | None, float | None]:
+    """
+    解析一条 JSON 消息，例如 {"text": "你好", "mode": 1, "color": 16777215, "size": 25}。
+    可选字段 "t" 为弹幕在媒体时间轴上的出现时间（秒），"ts" 为发送方的 time.time()，用于统计延迟。
+    只做校验，不创建 DanmakuData，被合并或丢弃的消息因此没有额外开销。
+
+    Returns:
+        tuple: (文本, 模式, 颜色, 字号, 媒体时间或 None, 发送时间或 None)。
+
+    Raises:
+        ValueError: 消息不是合法的 JSON 或缺少必要字段。
+    """
+    return _validate(json.loads(line))
+
+
+def parse_messages(lines: list[bytes]) -> tuple[list[tuple], int]:
+    """
+    解析一组消息。整组先作为一个 JSON 数组一次解析（比逐行调用 json.loads 快约三倍），
+    其中有格式错误的行时退回逐行解析，跳过错误的行。
+
+    Returns:
+        tuple[list[tuple], int]: (parse_message 格式的消息列表, 无效消息数)。
+    """
+    lines = [line for line in lines if line.strip()]
+    if not lines:
+        return [], 0
+    try:
+        objects = json.loads(b'[' + b','.join(lines) + b']')
+    except ValueError:
+        objects = None
+    messages, invalid = [], 0
+    if objects is not None and len(objects) == len(lines):
+        for obj in objects:
+            try:
+                messages.append(_validate(obj))
+            except (ValueError, TypeError):
+                invalid += 1
+        return messages, invalid
+    for line in lines:
+        try:
+            messages.append(parse_message(line))
+        except (ValueError, TypeError):
+            invalid += 1
+    return messages, invalid
+
+
+def _validate(obj) -> tuple[str, int, int, int, float | None, float | None]:
+    if not isinstance(obj, dict):
+        raise ValueError("消息必须是 JSON 对象")
+    text = obj.get('text')
+    if not isinstance(text, str) or not text:
+        raise ValueError("缺少 text 字段")
+    mode = int(obj.get('mode', 1))
+    if mode not in (1, 4, 5):
+        raise ValueError(f"不支持的弹幕模式: {mode}")
+    media_time = obj.get('t')
+    sent_time = obj.get('ts')
+    return (text, mode, int(obj.get('color', 0xFFFFFF)), int(obj.get('size', 25)),
+            float(media_time) if media_time is not None else None,
+            float(sent_time) if sent_time is not None else None)
+
+
+def to_danmaku(text: str, mode: int, color_decimal: int, font_size: int, start_time: float = 0.0) -> DanmakuData:
+    color = QColor((color_decimal >> 16) & 255, (color_decimal >> 8) & 255, color_decimal & 255)
+    return DanmakuData(start_time, mode, text, color, font_size)
+
+
+class LiveBatch:
+    """一次送往主线程的弹幕批次。"""
+    __slots__ = ('items', 'sent_times')
+
+    def __init__(self):
+        # (弹幕数据, 媒体时间或 None)；媒体时间为 None 的弹幕立即显示
+        self.items: list[tuple[DanmakuData, float | None]] = []
+        # 本批次中带有发送时间的消息的发送时间（合并的消息各自保留）
+        self.sent_times: list[float] = []
+
+
+class LiveIngestStats:
+    """接收、合并、丢弃和送达的计数，以及最近送达的消息的端到端延迟。"""
+    def __init__(self, max_samples: int = 200_000):
+        self.received = 0
+        self.invalid = 0
+        self.coalesced = 0
+        self.dropped_rate = 0
+        self.dropped_paused = 0
+        self.delivered = 0
+        self.latencies: deque[float] = deque(maxlen=max_samples)
+
+    def percentiles(self, points=(50, 90, 99, 99.9)) -> dict[float, float]:
+        """返回延迟的百分位数（秒）。没有样本时为空字典。"""
+        samples = sorted(self.latencies)
+        if not samples:
+            return {}
+        return {p: samples[min(len(samples) - 1, int(len(samples) * p / 100))] for p in points}
+
+    def summary(self) -> str:
+        pct = ' '.join(f"p{p:g}={v * 1000:.1f}ms" for p, v in self.percentiles().items())
+        return (f"收到 {self.received}，送达 {self.delivered}，合并 {self.coalesced}，"
+                f"限速丢弃 {self.dropped_rate}，暂停丢弃 {self.dropped_paused}，无效 {self.invalid}；延迟 {pct or 'N/A'}")
+
+
+class LiveIngestServer(QObject):
+    """
+    实时弹幕接入服务器。在本地 TCP 或 UNIX 套接字上接收按行分隔的 JSON 弹幕
+    （安装了 websockets 时也可通过 WebSocket 接收），在共享的异步运行时中解析，
+    按帧间隔合并成批次后通过 batch_ready 信号送往主线程。
+
+    - 队列有界：队列满时停止读取套接字，由 TCP 把压力传回发送方；
+    - 同一批次中文本、模式和颜色相同的弹幕合并为一条并标注数量；
+    - 立即显示的弹幕按 max_rate 限速（令牌桶，允许一秒的突发），超出的部分丢弃最旧的。
+    """
+    batch_ready = pyqtSignal(object)
+
+    # 批次间隔（秒），与渲染帧率一致
+    DELIVERY_INTERVAL_S = 1 / 60
+    # 启动时等待开始监听的最长时间（秒）
+    START_TIMEOUT_S = 5.0
+
+    def __init__(self, address: str, queue_size: int = 10000, max_rate: float = 200,
+                 websocket_port: int = 0, parent=None):
+        """
+        Args:
+            address (str): 监听地址，见 parse_address。端口为 0 时由系统分配。
+            queue_size (int): 待合并消息队列的容量。
+            max_rate (float): 每秒最多立即显示的弹幕数。
+            websocket_port (int): WebSocket 端口，0 表示不启用。
+        """
+        super().__init__(parent)
+        self.address = address
+        self.queue_size = queue_size
+        self.max_rate = max_rate
+        self.websocket_port = websocket_port
+        self.stats = LiveIngestStats()
+        # 实际监听的地址（端口为 0 时可由此得知分配的端口）
+        self.bound_addresses: list[str] = []
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._stop_event: asyncio.Event | None = None
+        self._task: AsyncTask | None = None
+        self._ready = threading.Event()
+        self._start_error: Exception | None = None
+        # 以下只在异步运行时的线程中访问：待处理的消息组、其中的消息总数和“队列有空位”事件
+        self._pending: list[list[tuple]] = []
+        self._queued = 0
+        self._space: asyncio.Event | None = None
+
+    def start(self) -> bool:
+        """在共享的异步运行时中启动服务器，等待监听成功。返回是否成功。"""
+        self._ready.clear()
+        self._start_error = None
+        self.bound_addresses = []
+        self._task = get_runtime().submit(self._serve(), name="live-ingest")
+        ready = self._ready.wait(self.START_TIMEOUT_S)
+        if not ready or self._start_error is not None:
+            error = self._start_error or f"{self.START_TIMEOUT_S:g} 秒内没有开始监听"
+            logging.error(f"实时弹幕接入服务器启动失败: {error}")
+            self._task.cancel(wait=1.0)
+            self._task = None
+            return False
+        logging.info(f"实时弹幕接入服务器已启动: {', '.join(self.bound_addresses)}")
+        return True
+
+    def stop(self):
+        if self._loop and self._stop_event:
+            self._loop.call_soon_threadsafe(self._stop_event.set)
+        if self._task:
+            self._task.wait(2)
+            self._task = None
+        logging.info(f"实时弹幕接入服务器已停止。{self.stats.summary()}")
+
+    def record_delivery(self, batch: LiveBatch, shown: bool):
+        """由主线程在批次交给渲染器（或因暂停被丢弃）后调用，记录送达数和端到端延迟。"""
+        if not shown:
+            self.stats.dropped_paused += len(batch.items)
+            return
+        self.stats.delivered += len(batch.items)
+        now = time.time()
+        self.stats.latencies.extend(now - sent for sent in batch.sent_times)
+
+    async def _serve(self):
+        try:
+            await self._main()
+        except Exception as e:
+            self._start_error = e
+            self._ready.set()
+
+    async def _main(self):
+        self._loop = asyncio.get_running_loop()
+        self._stop_event = asyncio.Event()
+        self._space = asyncio.Event()
+        self._space.set()
+        servers = []
+        writers: set[asyncio.StreamWriter] = set()
+
+        async def handle_stream(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+            writers.add(writer)
+            partial = b''
+            try:
+                while data := await reader.read(READ_CHUNK_BYTES):
+                    lines = (partial + data).split(b'\n')
+                    partial = lines.pop()
+                    if len(partial) > MAX_LINE_BYTES:
+                        logging.warning("实时弹幕消息过长，断开该连接。")
+                        break
+                    await self._ingest(lines)
+            except ConnectionError as e:
+                logging.warning(f"实时弹幕连接已断开: {e}")
+            finally:
+                writers.discard(writer)
+                writer.close()
+
+        async def handle_websocket(websocket):
+            try:
+                async for message in websocket:
+                    if isinstance(message, str):
+                        message = message.encode('utf-8')
+                    await self._ingest(message.splitlines())
+            except websockets.ConnectionClosed:
+                pass
+
+        kind, host, port = parse_address(self.address)
+        if kind == 'unix':
+            server = await asyncio.start_unix_server(handle_stream, host)
+            self.bound_addresses.append(f"unix://{host}")
+        else:
+            server = await asyncio.start_server(handle_stream, host, port)
+            bound = server.sockets[0].getsockname()
+            self.bound_addresses.append(f"tcp://{bound[0]}:{bound[1]}")
+        servers.append(server)
+        if self.websocket_port:
+            if WEBSOCKETS_AVAILABLE:
+                ws_host = host if kind == 'tcp' else '127.0.0.1'
+                servers.append(await websockets.serve(handle_websocket, ws_host, self.websocket_port))
+                self.bound_addresses.append(f"ws://{ws_host}:{self.websocket_port}")
+            else:
+                logging.warning("未安装 websockets，WebSocket 接入不可用。")
+        self._ready.set()
+
+        deliver_task = asyncio.create_task(self._deliver())
+        try:
+            await self._stop_event.wait()
+        finally:
+            deliver_task.cancel()
+            for server in servers:
+                server.close()
+            # 关闭现有连接，让各连接的处理协程在事件循环结束前正常退出
+            for writer in list(writers):
+                writer.transport.abort()
+            self._space.set()
+            await asyncio.sleep(0.05)
+
+    async def _ingest(self, lines: list[bytes]):
+        messages, invalid = parse_messages(lines)
+        self.stats.invalid += invalid
+        self.stats.received += len(messages)
+        if not messages:
+            return
+        # 队列满时在此等待，停止读取这个连接，发送方随之被 TCP 流控减速
+        while self._queued >= self.queue_size and not self._stop_event.is_set():
+            self._space.clear()
+            await self._space.wait()
+        self._pending.append(messages)
+        self._queued += len(messages)
+
+    async def _deliver(self):
+        """每个帧间隔取出队列中的全部消息，合并、限速后作为一个批次发往主线程。"""
+        tokens = self.max_rate
+        last = time.monotonic()
+        while True:
+            await asyncio.sleep(self.DELIVERY_INTERVAL_S)
+            now = time.monotonic()
+            tokens = min(self.max_rate, tokens + (now - last) * self.max_rate)
+            last = now
+            if not self._pending:
+                continue
+            groups, self._pending, self._queued = self._pending, [], 0
+            self._space.set()
+            batch, tokens = self._build_batch(groups, tokens)
+            if batch.items:
+                self.batch_ready.emit(batch)
+
+    def _build_batch(self, groups: list[list[tuple]], tokens: float) -> tuple[LiveBatch, float]:
+        batch = LiveBatch()
+        # 立即显示的弹幕：(文本, 模式, 颜色) -> [字号, 数量, 发送时间列表]；字典保持首次出现的顺序
+        merged: dict[tuple, list] = {}
+        for messages in groups:
+            for text, mode, color, size, media_time, sent_time in messages:
+                if media_time is not None:
+                    # 带媒体时间的弹幕并入时间轴，按播放进度显示，不合并也不限速
+                    batch.items.append((to_danmaku(text, mode, color, size, media_time), media_time))
+                    if sent_time is not None:
+                        batch.sent_times.append(sent_time)
+                    continue
+                entry = merged.get((text, mode, color))
+                if entry is None:
+                    merged[(text, mode, color)] = [size, 1, [sent_time] if sent_time is not None else []]
+                else:
+                    entry[1] += 1
+                    if sent_time is not None:
+                        entry[2].append(sent_time)
+        entries = list(merged.items())
+        allowed = max(0, int(tokens))
+        if len(entries) > allowed:
+            # 超出速率时保留最新的弹幕
+            self.stats.dropped_rate += sum(entry[1] for _, entry in entries[:len(entries) - allowed])
+            entries = entries[len(entries) - allowed:] if allowed else []
+        tokens -= len(entries)
+        # 只统计被显示的弹幕中合并掉的重复消息，使 收到 = 显示 + 合并 + 丢弃
+        self.stats.coalesced += sum(entry[1] - 1 for _, entry in entries)
+        for (text, mode, color), (size, count, sent_times) in entries:
+            if count > 1:
+                text = f"{text} ×{count}"
+            batch.items.append((to_danmaku(text, mode, color, size), None))
+            batch.sent_times.extend(sent_times)
+        return batch, tokens
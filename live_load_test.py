@@ -0,0 +1,153 @@
+# live_load_test.py
+"""
+实时弹幕接入的负载测试。在本进程中启动控制器和接入服务器（offscreen 平台），
+由独立的生成器进程按指定速率发送弹幕，报告端到端延迟的百分位数和各类丢弃计数。
+
+    python live_load_test.py --rates 1000 10000 50000 --duration 5
+
+单独运行生成器，向正在运行的程序发送弹幕:
+    python live_load_test.py generate tcp://127.0.0.1:17878 --rate 1000 --duration 10
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+
+
+def _connect(address: str) -> socket.socket:
+    from live_ingest import parse_address
+    kind, host, port = parse_address(address)
+    if kind == 'unix':
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(host)
+    else:
+        sock = socket.create_connection((host, port))
+    return sock
+
+
+def generate(args) -> int:
+    """按固定速率发送弹幕。发送被对方的流控阻塞时实际速率会低于目标速率。"""
+    rng = random.Random(args.seed)
+    # 直播弹幕中大量重复的短语，加上较多各不相同的弹幕
+    vocabulary = ["666", "哈哈哈哈", "来了来了", "前方高能", "awsl", "？？？"] + \
+                 [f"弹幕 {i}" for i in range(args.vocabulary)]
+    sock = _connect(args.address)
+    sent = 0
+    start = time.perf_counter()
+    try:
+        while True:
+            elapsed = time.perf_counter() - start
+            if elapsed >= args.duration:
+                break
+            due = min(int(elapsed * args.rate) - sent, 5000)
+            if due <= 0:
+                time.sleep(0.0005)
+                continue
+            ts = time.time()
+            lines = [json.dumps({"text": rng.choice(vocabulary), "mode": 1,
+                                 "color": rng.choice((0xFFFFFF, 0xFFFFFF, 0xFE0302)), "ts": ts},
+                                ensure_ascii=False)
+                     for _ in range(due)]
+            sock.sendall(('\n'.join(lines) + '\n').encode('utf-8'))
+            sent += due
+    except (ConnectionError, OSError) as e:
+        print(f"发送中断: {e}", file=sys.stderr)
+    finally:
+        sock.close()
+    wall = time.perf_counter() - start
+    print(json.dumps({"sent": sent, "wall": wall}))
+    return 0
+
+
+def run(args) -> int:
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from datetime import timedelta
+
+    from PyQt6.QtCore import QEventLoop, QTimer
+    from PyQt6.QtWidgets import QApplication
+
+    from config_loader import get_config
+    from danmaku_controller import DanmakuController
+    from monitors.base_monitor import SessionInfo
+
+    app = QApplication(sys.argv[:1])
+    # 只修改内存中的配置，不写回 config.ini
+    config = get_config()
+    config.debug = False
+    config.extra_sessions = []
+    config.library_folders = []
+    config.follow_file = False
+    config.live_enabled = True
+    config.live_listen = args.listen
+    config.live_queue_size = args.queue_size
+    config.live_max_rate = args.max_rate
+
+    print(f"{'目标速率':>8} {'实际速率':>8} {'收到':>8} {'显示':>6} {'合并':>8} {'限速丢弃':>8} {'暂停丢弃':>8} "
+          f"{'p50':>8} {'p90':>8} {'p99':>8} {'p99.9':>8} {'最大':>8}")
+    for rate in args.rates:
+        controller = DanmakuController(monitor=None)
+        controller.start(args.danmaku, run_worker=False)
+        if not controller.is_running() or not controller.live_ingest:
+            return 1
+        # 主会话处于播放状态，弹幕窗口的动画才会推进
+        controller.feed_session_info(SessionInfo("load test", "", "PLAYING", timedelta(seconds=0),
+                                                 timedelta(seconds=3600), config.target_aumid))
+        server = controller.live_ingest
+        proc = subprocess.Popen([sys.executable, os.path.abspath(__file__), 'generate', server.bound_addresses[0],
+                                 '--rate', str(rate), '--duration', str(args.duration)],
+                                stdout=subprocess.PIPE, text=True)
+        loop = QEventLoop()
+        poll = QTimer()
+        poll.timeout.connect(lambda: proc.poll() is not None and loop.quit())
+        poll.start(50)
+        loop.exec()
+        poll.stop()
+        # 等待队列中剩余的消息送达
+        drain = QEventLoop()
+        QTimer.singleShot(500, drain.quit)
+        drain.exec()
+
+        result = json.loads(proc.stdout.read().strip().splitlines()[-1])
+        stats = server.stats
+        pct = stats.percentiles((50, 90, 99, 99.9, 100))
+        ms = [f"{pct[p] * 1000:8.1f}" if pct else f"{'N/A':>8}" for p in (50, 90, 99, 99.9, 100)]
+        print(f"{rate:>12} {result['sent'] / result['wall']:>12.0f} {stats.received:>10} {stats.delivered:>8} "
+              f"{stats.coalesced:>10} {stats.dropped_rate:>12} {stats.dropped_paused:>12} " + ' '.join(ms))
+        controller.stop()
+    print("延迟单位为毫秒：从生成器构造消息到批次交给弹幕窗口的生成队列。")
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="实时弹幕接入的负载测试")
+    sub = parser.add_subparsers(dest='command')
+
+    gen = sub.add_parser('generate', help="按固定速率向接入服务器发送弹幕")
+    gen.add_argument('address', help="接入服务器地址，如 tcp://127.0.0.1:17878")
+    gen.add_argument('--rate', type=float, default=1000, help="每秒发送的弹幕数")
+    gen.add_argument('--duration', type=float, default=5.0, help="发送时长（秒）")
+    gen.add_argument('--vocabulary', type=int, default=500, help="不重复弹幕文本的数量")
+    gen.add_argument('--seed', type=int, default=0, help="随机数种子")
+
+    parser.add_argument('--rates', type=float, nargs='+', default=[1000, 10000, 50000], help="依次测试的速率")
+    parser.add_argument('--duration', type=float, default=5.0, help="每个速率的测试时长（秒）")
+    parser.add_argument('--danmaku', default=os.path.join('testDanmaku', '958151789.xml'), help="主会话的弹幕文件")
+    parser.add_argument('--listen', default='tcp://127.0.0.1:0', help="接入服务器的监听地址，端口为 0 时自动分配")
+    parser.add_argument('--queue-size', type=int, default=10000, help="接收队列容量")
+    parser.add_argument('--max-rate', type=float, default=200, help="每秒最多显示的弹幕数")
+
+    args = parser.parse_args()
+    if args.command == 'generate':
+        return generate(args)
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+    args.rates = [int(r) for r in args.rates]
+    return run(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
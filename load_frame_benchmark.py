@@ -0,0 +1,162 @@
+# load_frame_benchmark.py
+"""
+大文件加载期间的帧时间测试。弹幕窗口在本进程中正常播放（offscreen 平台），
+同时像弹幕库预取下一集那样在后台加载一个很大的弹幕文件，分别在本进程中解析和交给解析工作进程，
+报告加载期间帧间隔的均值、标准差、p99、最大值和超过两帧的次数，以及没有加载时的基准。
+
+    python load_frame_benchmark.py --count 300000 --runs 3
+"""
+import argparse
+import logging
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from xml.sax.saxutils import escape
+
+FRAME_MS = 1000 / 60
+
+
+def write_large_file(path: str, count: int, seed: int = 0):
+    """生成一个包含 count 条弹幕的 XML 文件，时间分布在两小时内。"""
+    rng = random.Random(seed)
+    vocabulary = ["666", "哈哈哈哈", "来了来了", "前方高能", "awsl", "？？？"] + [f"弹幕 {i}" for i in range(2000)]
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?><i><chatid>0</chatid>\n')
+        for _ in range(count):
+            f.write(f'<d p="{rng.uniform(0, 7200):.3f},{rng.choice((1, 1, 1, 4, 5))},25,'
+                    f'{rng.choice((16777215, 16777215, 16646914))},0,0,0,0">{escape(rng.choice(vocabulary))}</d>\n')
+        f.write('</i>\n')
+
+
+def _summary(intervals: list[float]) -> dict:
+    ordered = sorted(intervals)
+    return {
+        'frames': len(intervals),
+        'mean': statistics.fmean(intervals),
+        'stdev': statistics.pstdev(intervals),
+        'p99': ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))],
+        'max': ordered[-1],
+        'long': sum(1 for i in intervals if i > 2 * FRAME_MS),
+    }
+
+
+def run(args) -> int:
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from datetime import timedelta
+
+    from PyQt6.QtCore import QEventLoop, QTimer
+    from PyQt6.QtWidgets import QApplication
+
+    from config_loader import get_config
+    from danmaku_controller import DanmakuController
+    from danmaku_parser import clear_parse_cache, load_cached
+    from monitors.base_monitor import SessionInfo
+    from parse_worker import ParseWorker
+
+    app = QApplication(sys.argv[:1])
+    # 只修改内存中的配置，不写回 config.ini
+    config = get_config()
+    config.debug = False
+    config.extra_sessions = []
+    config.library_folders = []
+    config.follow_file = False
+    config.live_enabled = False
+    config.parse_worker = False
+
+    big_file = os.path.join(tempfile.mkdtemp(prefix='danmaku-bench-'), 'large.xml')
+    write_large_file(big_file, args.count)
+    print(f"测试文件: {args.count} 条弹幕，{os.path.getsize(big_file) / 1024 / 1024:.1f} MB")
+
+    controller = DanmakuController(monitor=None)
+    controller.start(args.danmaku, run_worker=False)
+    if not controller.is_running():
+        return 1
+    # 主会话处于播放状态，弹幕窗口的动画才会推进
+    controller.feed_session_info(SessionInfo("benchmark", "", "PLAYING", timedelta(seconds=0),
+                                             timedelta(seconds=3600), config.target_aumid))
+    stamps: list[float] = []
+    controller.renderer.frame_ticked.connect(lambda _: stamps.append(time.perf_counter()))
+
+    worker = ParseWorker()
+    worker.start()
+    # 预热：等待工作进程完成模块导入，测量中不包含启动进程的开销
+    worker.load(args.danmaku)
+
+    def wait(condition, poll_ms: int = 10):
+        loop = QEventLoop()
+        timer = QTimer()
+        timer.timeout.connect(lambda: condition() and loop.quit())
+        timer.start(poll_ms)
+        loop.exec()
+        timer.stop()
+
+    def measure(loader) -> tuple[dict, float]:
+        """在后台线程中加载大文件（与弹幕库预取相同），返回加载期间的帧间隔统计和加载耗时（毫秒）。"""
+        clear_parse_cache()
+        stamps.clear()
+        result = {}
+
+        def task():
+            start = time.perf_counter()
+            table = load_cached(big_file, loader)
+            result['ms'] = (time.perf_counter() - start) * 1000
+            result['count'] = len(table)
+
+        thread = threading.Thread(target=task, daemon=True)
+        thread.start()
+        wait(lambda: not thread.is_alive())
+        intervals = [(b - a) * 1000 for a, b in zip(stamps, stamps[1:])]
+        if result.get('count') != args.count:
+            raise RuntimeError(f"加载结果不完整: {result}")
+        return _summary(intervals), result['ms']
+
+    def measure_idle(duration_s: float) -> dict:
+        stamps.clear()
+        end = time.perf_counter() + duration_s
+        wait(lambda: time.perf_counter() >= end)
+        return _summary([(b - a) * 1000 for a, b in zip(stamps, stamps[1:])])
+
+    samples = {'本进程解析': [], '解析工作进程': []}
+    load_ms = {name: [] for name in samples}
+    for _ in range(args.runs):
+        for name, loader in (('本进程解析', None), ('解析工作进程', worker.load)):
+            summary, elapsed = measure(loader)
+            samples[name].append(summary)
+            load_ms[name].append(elapsed)
+            # 两次测量之间让弹幕窗口恢复正常节奏
+            measure_idle(0.5)
+    idle = measure_idle(args.idle_seconds)
+
+    print(f"{'':>12} {'加载(毫秒)':>10} {'帧数':>6} {'均值':>7} {'标准差':>7} {'p99':>7} {'最大':>7} {'超过两帧':>8}")
+    rows = [(name, statistics.median(load_ms[name]), samples[name]) for name in samples]
+    rows.append(("无加载", 0.0, [idle]))
+    for name, elapsed, results in rows:
+        m = {key: statistics.median(r[key] for r in results) for key in ('frames', 'mean', 'stdev', 'p99', 'max', 'long')}
+        print(f"{name:>12} {elapsed:>12.0f} {m['frames']:>8.0f} {m['mean']:>9.1f} {m['stdev']:>9.1f} "
+              f"{m['p99']:>9.1f} {m['max']:>9.1f} {m['long']:>10.0f}")
+    print(f"帧间隔单位为毫秒，目标为 {FRAME_MS:.1f} 毫秒；每项为 {args.runs} 次测量的中位数。")
+
+    worker.stop()
+    controller.stop()
+    os.remove(big_file)
+    os.rmdir(os.path.dirname(big_file))
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="比较在本进程中和在解析工作进程中加载大文件时的帧时间")
+    parser.add_argument('--count', type=int, default=300000, help="测试文件中的弹幕条数")
+    parser.add_argument('--runs', type=int, default=3, help="每种方式的测量次数")
+    parser.add_argument('--idle-seconds', type=float, default=3.0, help="无加载基准的测量时长（秒）")
+    parser.add_argument('--danmaku', default=os.path.join('testDanmaku', '958151789.xml'), help="播放中的弹幕文件")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+    return run(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,43 +1,157 @@
 # main.py
-import sys
+# 最先导入，记录启动计时的起点，使报告的启动耗时包含所有模块的导入
+import startup_profile
+
+import argparse
+import json
 import logging
+import signal
+import sys
+
+from PyQt6.QtCore import QTimer
 from PyQt6.QtWidgets import QApplication
 
+from async_runtime import get_runtime
 from config_loader import get_config
-from control_panel import MainWindow
-from danmaku_controller import DanmakuController
 from logger_setup import setup_logging
 
-def main():
+startup_profile.mark("模块导入完成")
+
+
+def parse_args(argv: list[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="桌面弹幕：把 XML 弹幕同步叠加到正在播放的视频上")
+    parser.add_argument('--headless', action='store_true',
+                        help="不显示控制面板，直接加载弹幕文件并启动弹幕（Ctrl+C 退出）")
+    parser.add_argument('danmaku', nargs='?', default='',
+                        help="主会话的 XML 弹幕文件。无界面模式下默认为上次使用的文件；"
+                             "有控制面板时填入文件路径并立即启动弹幕")
+    parser.add_argument('--target', default='', help="跟随的播放器会话（AUMID 或进程名），默认取配置")
+    parser.add_argument('--monitor', default='', help="媒体监控方式（auto/windows/mpris/mpv/replay），默认取配置")
+    parser.add_argument('--exit-after-startup', action='store_true',
+                        help="第一帧绘制完成后输出一行 JSON 格式的启动耗时、各阶段时刻和内存占用并退出，用于启动性能测试")
+    parser.add_argument('--profile-startup', action='store_true',
+                        help="以 -X importtime 重新启动程序（使用其余参数）并报告从创建进程到第一帧的各阶段耗时和导入耗时")
+    return parser.parse_args(argv)
+
+
+def report_startup(mode: str, exit_after: bool):
     """
-    应用程序主入口函数。
+    第一帧绘制完成后调用，记录从 main.py 开始执行到此刻的耗时和常驻内存。
+    exit_after 时同时以一行 JSON 输出到标准输出并退出，mode 为 'gui' 或 'headless'。
     """
-    # 初始化Qt应用程序实例
-    app = QApplication(sys.argv)
-    
-    # 获取全局单例配置对象
-    config = get_config()
-    
-    # 设置全局日志系统，并获取用于连接GUI的信号
-    log_signals = setup_logging(config)
+    import psutil
+    startup_profile.mark("首帧绘制完成")
+    phases = startup_profile.phases()
+    elapsed_ms = (phases[-1][1] - phases[0][1]) * 1000
+    rss_mb = psutil.Process().memory_info().rss / 1024 / 1024
+    label = "无界面" if mode == 'headless' else "控制面板"
+    logging.info(f"启动完成（{label}）: 到第一帧耗时 {elapsed_ms:.0f} 毫秒，常驻内存 {rss_mb:.1f} MB")
+    if exit_after:
+        print(json.dumps({"mode": mode, "startup_ms": round(elapsed_ms, 1), "rss_mb": round(rss_mb, 1),
+                          "phases": phases}), flush=True)
+        QApplication.instance().quit()
+
+
+def run_gui(app: QApplication, args: argparse.Namespace, log_signals) -> int:
+    """显示控制面板，由用户选择文件并启动弹幕。"""
+    # 控制面板和控制器只有在这个模式下才导入
+    from control_panel import MainWindow
+    from danmaku_controller import DanmakuController
 
     # 创建主窗口（控制面板），并传入日志信号
     main_window = MainWindow(log_signals)
-    
+
     # 创建弹幕控制器，这是应用的核心逻辑处理单元
     # 注意：控制器现在内部会根据平台选择合适的媒体监控器
-    controller = DanmakuController() 
-    
+    # 弹幕文件在后台加载，解析大文件时控制面板不会卡住
+    controller = DanmakuController(async_load=True)
+
     # 将控制器与主窗口关联，使得UI可以调用控制器的功能
     main_window.set_controller(controller)
-    
+
+    startup_profile.mark("控制面板和控制器创建")
+
     # 显示主窗口
+    startup_profile.watch_first_paint(app, lambda: report_startup('gui', args.exit_after_startup))
     main_window.show()
-    
+
     logging.info("控制面板启动成功。")
-    
+    if args.danmaku:
+        main_window.main_widget.path_input.setText(args.danmaku)
+        main_window.start_danmaku()
+        startup_profile.mark("弹幕已启动")
+
     # 进入Qt应用程序的事件循环
-    sys.exit(app.exec())
+    return app.exec()
+
+
+def run_headless(app: QApplication, args: argparse.Namespace) -> int:
+    """不创建控制面板，直接按命令行参数启动弹幕，直到收到 Ctrl+C 或 SIGTERM。"""
+    from danmaku_controller import DanmakuController
+
+    config = get_config()
+    danmaku_path = args.danmaku or config.last_danmaku_path
+
+    controller = DanmakuController()
+    controller.error_occurred.connect(lambda msg: logging.error(msg.replace('\n', ' ')))
+    startup_profile.mark("控制器创建")
+    if not danmaku_path and not controller.library_enabled():
+        logging.error("无界面模式需要指定弹幕文件（或在配置中启用弹幕库自动匹配）。")
+        return 2
+    startup_profile.watch_first_paint(app, lambda: report_startup('headless', args.exit_after_startup))
+    controller.start(danmaku_path)
+    if not controller.is_running():
+        return 1
+    startup_profile.mark("弹幕已启动")
+
+    # Qt 事件循环运行期间 Python 的信号处理函数得不到执行，定时唤醒解释器以便响应 Ctrl+C
+    signal.signal(signal.SIGINT, lambda *_: app.quit())
+    signal.signal(signal.SIGTERM, lambda *_: app.quit())
+    wakeup = QTimer()
+    wakeup.timeout.connect(lambda: None)
+    wakeup.start(200)
+
+    logging.info(f"无界面模式: 会话 {config.target_aumid} 已绑定到 {danmaku_path or '（等待按标题匹配）'}，按 Ctrl+C 退出。")
+    exit_code = app.exec()
+    controller.stop()
+    return exit_code
+
+
+def main():
+    """
+    应用程序主入口函数。
+    """
+    args = parse_args(sys.argv[1:])
+    if args.profile_startup:
+        sys.exit(startup_profile.run_profile([a for a in sys.argv[1:] if a != '--profile-startup']))
+
+    # 初始化Qt应用程序实例
+    app = QApplication(sys.argv[:1])
+    startup_profile.mark("QApplication 创建")
+
+    # 获取全局单例配置对象。命令行参数只在本次运行中覆盖配置，保存设置时不会写回 config.ini
+    config = get_config()
+    if args.target:
+        config.override('target_aumid', args.target)
+    if args.monitor:
+        config.override('monitor_backend', args.monitor)
+
+    # 设置全局日志系统，并获取用于连接GUI的信号
+    log_signals = setup_logging(config)
+    startup_profile.mark("配置和日志初始化")
+
+    # 启动共享的异步运行时
+    runtime = get_runtime()
+
+    if args.headless:
+        # 弹幕窗口都是工具窗口，无界面模式只由信号退出
+        app.setQuitOnLastWindowClosed(False)
+        exit_code = run_headless(app, args)
+    else:
+        exit_code = run_gui(app, args, log_signals)
+    # 控制器停止后再关闭异步运行时，取消仍在运行的协程，使监控器能正常关闭连接
+    runtime.shutdown()
+    sys.exit(exit_code)
 
 if __name__ == '__main__':
     try:
@@ -46,4 +160,4 @@ if __name__ == '__main__':
         # 捕获所有未被处理的顶层异常，记录后退出
         # 这是保证程序健壮性的最后一道防线
         logging.critical("应用程序发生未捕获的严重错误: %s", e, exc_info=True)
-        sys.exit(1)
\ No newline at end of file
+        sys.exit(1)
@@ -0,0 +1,41 @@
+# monitors/__init__.py
+import sys
+
+from .base_monitor import BaseMediaMonitor, MediaMonitorError, SessionInfo
+
+# 可在配置中选择的媒体监控器
+#   auto:    根据当前平台自动选择
+#   windows: Windows 系统媒体传输控件 (SMTC)
+#   mpris:   Linux 桌面通过 D-Bus 会话总线提供的 MPRIS 接口
+#   mpv:     mpv 播放器的 JSON IPC（需以 --input-ipc-server 启动 mpv）
+#   replay:  回放录制好的会话时间线，用于复现问题
+MONITOR_BACKENDS = ('auto', 'windows', 'mpris', 'mpv', 'replay')
+
+
+def create_media_monitor(backend: str = 'auto', mpv_ipc_path: str = '', replay_path: str = '') -> BaseMediaMonitor:
+    """
+    创建指定类型的媒体监控器。平台相关的模块只在被选中时才导入。
+
+    Args:
+        backend (str): 监控器类型，见 MONITOR_BACKENDS。
+        mpv_ipc_path (str): mpv 的 IPC 套接字/命名管道路径，仅 'mpv' 类型使用。
+        replay_path (str): 回放时间线文件路径，仅 'replay' 类型使用。
+
+    Raises:
+        MediaMonitorError: 类型未知，或所选监控器在当前环境下不可用。
+    """
+    if backend == 'auto':
+        backend = 'windows' if sys.platform == 'win32' else 'mpris'
+    if backend == 'windows':
+        from .windows_monitor import WindowsMediaMonitor
+        return WindowsMediaMonitor()
+    if backend == 'mpris':
+        from .mpris_monitor import MprisMediaMonitor
+        return MprisMediaMonitor()
+    if backend == 'mpv':
+        from .mpv_monitor import MpvMediaMonitor
+        return MpvMediaMonitor(mpv_ipc_path)
+    if backend == 'replay':
+        from .replay_monitor import ReplayMediaMonitor
+        return ReplayMediaMonitor.from_file(replay_path)
+    raise MediaMonitorError(f"未知的媒体监控器类型: {backend}")
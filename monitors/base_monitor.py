@@ -1,5 +1,83 @@
 # monitors/base_monitor.py
+import asyncio
+import time
 from abc import ABC, abstractmethod
+from collections.abc import AsyncIterator
+from datetime import timedelta
+
+
+class MediaMonitorError(Exception):
+    """媒体监控器模块的异常基类。"""
+    pass
+
+class SessionInfo:
+    """一个简单的数据类，用于存储媒体会话的详细信息。各平台的监控器都返回该类型。"""
+    def __init__(self, title, artist, status, position, duration, aumid, playback_rate=1.0):
+        self.title = title
+        self.artist = artist
+        # 统一为大写的状态名称, e.g., "PLAYING"。既接受平台的枚举成员，也接受字符串
+        self.status = status.name if hasattr(status, 'name') else str(status).upper()
+        self.position = position # timedelta 对象
+        self.duration = duration # timedelta 对象
+        self.source_aumid = aumid # 来源应用的标识符（Windows 上为AUMID）
+        self.playback_rate = playback_rate # 播放速率, 1.0为正常速度
+
+    def __repr__(self):
+        pos_str = self.format_time(self.position)
+        dur_str = self.format_time(self.duration)
+        return (f"<SessionInfo(aumid='{self.source_aumid}', status='{self.status}', "
+                f"title='{self.title}', progress='{pos_str}/{dur_str}', rate={self.playback_rate})>")
+
+    @staticmethod
+    def format_time(duration: timedelta) -> str:
+        """将 timedelta 对象格式化为 HH:MM:SS"""
+        ts = int(duration.total_seconds())
+        return f"{ts // 3600:02d}:{(ts % 3600) // 60:02d}:{ts % 60:02d}"
+
+
+class SessionChangeDetector:
+    """
+    判断一次会话采样相对于上一次产出的采样是否是“真正的变化”：
+    会话出现/消失、状态/标题/来源/速率/时长改变，或进度偏离了按速率外推的预期位置（跳转）。
+    进度随时间正常推进不算变化。
+    """
+    # 进度与外推值相差超过该值（秒）时视为跳转
+    JUMP_THRESHOLD_S = 0.25
+
+    def __init__(self, time_source=time.monotonic):
+        self._time_source = time_source
+        self._last: SessionInfo | None = None
+        self._last_time = 0.0
+        self._last_raw_position: timedelta | None = None
+        self._has_last = False
+
+    def is_change(self, info: SessionInfo | None) -> bool:
+        now = self._time_source()
+        changed = self._compare(info, now)
+        if changed:
+            self._last = info
+            self._last_time = now
+            self._has_last = True
+        self._last_raw_position = info.position if info is not None else None
+        return changed
+
+    def _compare(self, info: SessionInfo | None, now: float) -> bool:
+        last = self._last
+        if not self._has_last or (info is None) != (last is None):
+            return True
+        if info is None:
+            return False
+        if (info.status, info.title, info.source_aumid, info.playback_rate, info.duration) != \
+                (last.status, last.title, last.source_aumid, last.playback_rate, last.duration):
+            return True
+        if info.position == self._last_raw_position:
+            # 部分播放器只会偶尔更新进度，未更新的采样不代表跳转
+            return False
+        expected = last.position.total_seconds()
+        if last.status == "PLAYING":
+            expected += (now - self._last_time) * (last.playback_rate or 1.0)
+        return abs(info.position.total_seconds() - expected) > self.JUMP_THRESHOLD_S
+
 
 class BaseMediaMonitor(ABC):
     """
@@ -7,6 +85,8 @@ class BaseMediaMonitor(ABC):
     定义了所有平台特定的监控器必须实现的通用接口。
     这使得控制器代码可以与具体的实现解耦，便于未来扩展到其他操作系统。
     """
+    # 轮询适配器（subscribe 的默认实现）的查询间隔（秒）
+    POLL_INTERVAL_S = 0.1
 
     @abstractmethod
     async def list_sessions(self) -> list[dict]:
@@ -30,12 +110,55 @@ class BaseMediaMonitor(ABC):
         """
         pass
 
-    def get_foreground_window_aumid(self) -> str | None:
+    async def get_all_session_info(self) -> list[SessionInfo]:
+        """
+        异步获取所有媒体会话的详细信息，供同时同步多个会话时使用。
+        默认只返回当前会话；能够区分多个会话的监控器应重写该方法。
         """
-        获取当前前台窗口的应用标识符（AUMID）。
-        这是一个可选实现的方法，主要用于判断播放器窗口是否在前台。
+        info = await self.get_current_session_info()
+        return [info] if info is not None else []
 
-        Returns:
-            str | None: 应用标识符字符串，或在无法获取时返回 None。
+    async def subscribe(self) -> AsyncIterator[SessionInfo | None]:
         """
-        return None
\ No newline at end of file
+        订阅会话状态的变化。返回一个异步迭代器，立即产出一次当前状态，
+        之后只在状态真正变化时产出（见 SessionChangeDetector）。
+
+        只支持查询的监控器使用该默认实现，它以 POLL_INTERVAL_S 为间隔轮询；
+        能够接收推送的监控器通过重写 _wait_for_update 在没有变化时保持休眠。
+        """
+        detector = SessionChangeDetector()
+        while True:
+            info = await self.get_current_session_info()
+            if detector.is_change(info):
+                yield info
+            await self._wait_for_update()
+
+    async def subscribe_all(self) -> AsyncIterator[dict[str, SessionInfo | None]]:
+        """
+        订阅所有会话的状态变化。每次产出一个 {aumid: 会话信息} 字典，只包含发生了变化的会话，
+        会话消失时对应的值为 None。首次产出所有现有的会话（可能为空字典）。
+        每个会话各自使用一个 SessionChangeDetector，唤醒方式与 subscribe 相同。
+        """
+        detectors: dict[str, SessionChangeDetector] = {}
+        first = True
+        while True:
+            sessions = {info.source_aumid: info for info in await self.get_all_session_info()}
+            changes = {}
+            for aumid, info in sessions.items():
+                if detectors.setdefault(aumid, SessionChangeDetector()).is_change(info):
+                    changes[aumid] = info
+            for aumid in [a for a in detectors if a not in sessions]:
+                del detectors[aumid]
+                changes[aumid] = None
+            if changes or first:
+                first = False
+                yield changes
+            await self._wait_for_update()
+
+    async def _wait_for_update(self):
+        """等待直到可能有新的状态。默认实现为固定间隔的轮询。"""
+        await asyncio.sleep(self.POLL_INTERVAL_S)
+
+    async def close(self):
+        """释放监控器在当前事件循环中持有的连接和后台任务。工作线程退出前调用，默认无需操作。"""
+        pass
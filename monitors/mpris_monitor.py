@@ -0,0 +1,336 @@
+# monitors/mpris_monitor.py
+import asyncio
+import logging
+import re
+import time
+from datetime import timedelta
+
+# 导入抽象基类及通用的数据类型
+from .base_monitor import BaseMediaMonitor, MediaMonitorError, SessionInfo
+
+# 尝试导入 D-Bus 库（纯 Python 实现，基于 asyncio）
+try:
+    from dbus_next import BusType, Message, MessageType
+    from dbus_next.aio import MessageBus
+    DBUS_NEXT_AVAILABLE = True
+except ImportError:
+    DBUS_NEXT_AVAILABLE = False
+    logging.warning("缺少 Linux 平台所需的库 (dbus-next)。MPRIS 媒体监控功能将不可用。")
+
+MPRIS_PREFIX = 'org.mpris.MediaPlayer2.'
+MPRIS_PATH = '/org/mpris/MediaPlayer2'
+ROOT_INTERFACE = 'org.mpris.MediaPlayer2'
+PLAYER_INTERFACE = 'org.mpris.MediaPlayer2.Player'
+PROPERTIES_INTERFACE = 'org.freedesktop.DBus.Properties'
+DBUS_NAME = 'org.freedesktop.DBus'
+DBUS_PATH = '/org/freedesktop/DBus'
+
+# 需要订阅的信号：播放器属性变化、进度跳转、播放器出现/退出
+_MATCH_RULES = (
+    f"type='signal',interface='{PROPERTIES_INTERFACE}',member='PropertiesChanged',path='{MPRIS_PATH}'",
+    f"type='signal',interface='{PLAYER_INTERFACE}',member='Seeked',path='{MPRIS_PATH}'",
+    f"type='signal',sender='{DBUS_NAME}',interface='{DBUS_NAME}',member='NameOwnerChanged',"
+    f"arg0namespace='org.mpris.MediaPlayer2'",
+)
+
+
+def player_id(bus_name: str) -> str:
+    """
+    将 MPRIS 总线名称转换为稳定的播放器标识，作为 AUMID 的等价物。
+    例如 'org.mpris.MediaPlayer2.vlc.instance7389' -> 'vlc'。
+    """
+    return re.sub(r'\.instance\d+$', '', bus_name[len(MPRIS_PREFIX):])
+
+
+class _PlayerState:
+    """
+    单个 MPRIS 播放器的本地状态缓存。
+    MPRIS 不会为 Position 发出属性变化信号，因此记录最近一次读到的进度及其时间，按速率外推。
+    """
+    def __init__(self, bus_name: str, owner: str):
+        self.bus_name = bus_name
+        self.owner = owner # 唯一连接名，信号的发送者字段使用它
+        self.aumid = player_id(bus_name)
+        self.identity = ''
+        self.status = 'STOPPED'
+        self.title = ''
+        self.artist = ''
+        self.length_us = 0
+        self.rate = 1.0
+        self.position_us = 0
+        self.position_time = time.monotonic()
+        self.last_change = 0.0 # 最近一次状态变化的时间，用于挑选当前会话
+        self.position_stale = True # 需要重新读取 Position
+
+    def position_at(self, now: float) -> int:
+        if self.status != 'PLAYING':
+            return self.position_us
+        return self.position_us + int((now - self.position_time) * self.rate * 1_000_000)
+
+    def set_position(self, position_us: int, now: float):
+        self.position_us = max(0, int(position_us))
+        self.position_time = now
+        self.position_stale = False
+
+    def apply_properties(self, changed: dict, now: float):
+        """应用 PropertiesChanged 或 GetAll 返回的属性（值为 Variant）。"""
+        if 'Position' in changed:
+            self.set_position(changed['Position'].value, now)
+        if 'PlaybackStatus' in changed or 'Rate' in changed:
+            # 状态或速率改变前先把外推的进度固定下来，再以新的状态继续外推
+            self.set_position(self.position_at(now), now)
+            if 'PlaybackStatus' in changed:
+                self.status = str(changed['PlaybackStatus'].value).upper()
+            if 'Rate' in changed:
+                self.rate = float(changed['Rate'].value) or 1.0
+            # 外推只是估计，状态变化时向播放器确认一次真实进度
+            self.position_stale = True
+        if 'Metadata' in changed:
+            metadata = changed['Metadata'].value
+            title = metadata.get('xesam:title')
+            artist = metadata.get('xesam:artist')
+            length = metadata.get('mpris:length')
+            new_title = title.value if title else ''
+            if new_title != self.title:
+                self.position_stale = True
+            self.title = new_title
+            self.artist = ', '.join(artist.value) if artist else ''
+            self.length_us = int(length.value) if length else 0
+        self.last_change = now
+
+    def to_session_info(self, now: float) -> SessionInfo:
+        return SessionInfo(
+            title=self.title or self.identity, artist=self.artist,
+            status=self.status,
+            position=timedelta(microseconds=self.position_at(now)),
+            duration=timedelta(microseconds=self.length_us),
+            aumid=self.aumid,
+            playback_rate=self.rate
+        )
+
+
+class MprisMediaMonitor(BaseMediaMonitor):
+    """
+    Linux 平台的媒体监控器实现。
+    通过 D-Bus 会话总线上的 MPRIS 接口获取媒体会话信息。
+    播放状态、元数据和进度跳转都由信号推送并缓存在本地，查询时无需访问总线；
+    仅在播放中每隔一段时间读取一次 Position 校正外推误差。
+    订阅（subscribe）时在两次信号之间保持休眠，不做轮询。
+    """
+    # 播放中重新读取 Position 的间隔（秒）
+    POSITION_REFRESH_S = 5.0
+
+    def __init__(self):
+        """
+        初始化媒体监视器。
+        如果 dbus-next 不可用，将引发异常。
+        """
+        if not DBUS_NEXT_AVAILABLE:
+            raise MediaMonitorError("dbus-next 库未安装。请运行 'pip install dbus-next'。")
+        self._bus = None
+        self._loop = None
+        self._players: dict[str, _PlayerState] = {} # 总线名称 -> 播放器状态
+        self._changed: asyncio.Event | None = None # 收到信号时置位，唤醒订阅者
+
+    async def list_sessions(self) -> list[dict]:
+        """
+        异步列出所有当前活动的媒体会话的基本信息。
+        该方法通常在UI线程另起的事件循环中调用，因此使用一次性的独立连接，不触碰监控用的缓存。
+        """
+        bus = await self._connect()
+        try:
+            session_list = []
+            for name in await self._list_player_names(bus):
+                try:
+                    state = _PlayerState(name, '')
+                    state.apply_properties(await self._get_all(bus, name, PLAYER_INTERFACE), time.monotonic())
+                    identity = await self._get_property(bus, name, ROOT_INTERFACE, 'Identity')
+                    session_list.append({
+                        "aumid": state.aumid,
+                        "title": state.title or (identity or state.aumid)
+                    })
+                except Exception:
+                    # 某些播放器可能在查询时退出，直接跳过
+                    continue
+            return session_list
+        finally:
+            bus.disconnect()
+
+    async def get_current_session_info(self) -> SessionInfo | None:
+        """
+        异步获取当前媒体会话的详细信息。
+        优先选择正在播放的播放器，其次选择最近发生状态变化的播放器。
+        """
+        await self._ensure_connected()
+        player = self._current_player()
+        if player is None:
+            return None
+        now = time.monotonic()
+        if player.position_stale or (player.status == 'PLAYING' and
+                                     now - player.position_time > self.POSITION_REFRESH_S):
+            await self._refresh_position(player)
+            now = time.monotonic()
+        return player.to_session_info(now)
+
+    async def get_all_session_info(self) -> list[SessionInfo]:
+        """异步获取所有 MPRIS 播放器的会话信息，进度过期的播放器先重新读取 Position。"""
+        await self._ensure_connected()
+        now = time.monotonic()
+        for player in list(self._players.values()):
+            if player.position_stale or (player.status == 'PLAYING' and
+                                         now - player.position_time > self.POSITION_REFRESH_S):
+                await self._refresh_position(player)
+        now = time.monotonic()
+        return [player.to_session_info(now) for player in self._players.values()]
+
+    async def _wait_for_update(self):
+        """等待总线信号。播放中每隔 POSITION_REFRESH_S 醒来一次以校正进度，其余时间完全休眠。"""
+        playing = any(p.status == 'PLAYING' for p in self._players.values())
+        try:
+            await asyncio.wait_for(self._changed.wait(), self.POSITION_REFRESH_S if playing else None)
+        except asyncio.TimeoutError:
+            pass
+        self._changed.clear()
+
+    async def close(self):
+        """断开监听用的总线连接。"""
+        if self._bus is not None:
+            self._bus.disconnect()
+        self._bus = None
+        self._players.clear()
+
+    def _current_player(self) -> _PlayerState | None:
+        if not self._players:
+            return None
+        return max(self._players.values(), key=lambda p: (p.status == 'PLAYING', p.last_change))
+
+    async def _connect(self):
+        try:
+            return await MessageBus(bus_type=BusType.SESSION).connect()
+        except Exception as e:
+            raise MediaMonitorError(f"无法连接到 D-Bus 会话总线: {e}")
+
+    async def _ensure_connected(self):
+        """建立用于监听信号的持久连接。事件循环改变（如热重载后新建了工作线程）时重新连接。"""
+        loop = asyncio.get_running_loop()
+        if self._bus is not None and self._bus.connected and self._loop is loop:
+            return
+        # 旧连接属于另一个（已结束的）事件循环，直接丢弃
+        self._bus = None
+        self._players.clear()
+        self._changed = asyncio.Event()
+
+        bus = await self._connect()
+        bus.add_message_handler(self._on_message)
+        for rule in _MATCH_RULES:
+            await self._call(bus, DBUS_NAME, DBUS_PATH, DBUS_NAME, 'AddMatch', 's', [rule])
+        self._bus = bus
+        self._loop = loop
+        for name in await self._list_player_names(bus):
+            await self._add_player(name)
+        loop.create_task(self._watch_disconnect(bus))
+        logging.info(f"已连接到 D-Bus 会话总线，发现 {len(self._players)} 个 MPRIS 播放器。")
+
+    async def _watch_disconnect(self, bus):
+        """连接断开时唤醒订阅者，使下一次查询重新连接。"""
+        try:
+            await bus.wait_for_disconnect()
+        except Exception:
+            pass
+        logging.warning("与 D-Bus 会话总线的连接已断开。")
+        if self._changed is not None:
+            self._changed.set()
+
+    async def _add_player(self, bus_name: str, owner: str | None = None):
+        bus = self._bus
+        try:
+            if owner is None:
+                owner = (await self._call(bus, DBUS_NAME, DBUS_PATH, DBUS_NAME,
+                                          'GetNameOwner', 's', [bus_name]))[0]
+            state = _PlayerState(bus_name, owner)
+            state.identity = await self._get_property(bus, bus_name, ROOT_INTERFACE, 'Identity') or ''
+            state.apply_properties(await self._get_all(bus, bus_name, PLAYER_INTERFACE), time.monotonic())
+        except Exception as e:
+            logging.debug(f"读取 MPRIS 播放器 {bus_name} 失败: {e}")
+            return
+        if bus is self._bus:
+            self._players[bus_name] = state
+            self._changed.set()
+            logging.debug(f"发现 MPRIS 播放器: {bus_name}")
+
+    async def _refresh_position(self, player: _PlayerState):
+        try:
+            position = await self._get_property(self._bus, player.bus_name, PLAYER_INTERFACE, 'Position')
+        except Exception as e:
+            logging.debug(f"读取 {player.bus_name} 的播放进度失败: {e}")
+            player.position_stale = False
+            return
+        if position is not None:
+            player.set_position(position, time.monotonic())
+
+    def _on_message(self, message):
+        """处理总线上的信号。只更新缓存，不做任何阻塞操作。"""
+        if message.message_type != MessageType.SIGNAL:
+            return
+        now = time.monotonic()
+        if message.member == 'NameOwnerChanged' and message.interface == DBUS_NAME:
+            name, _, new_owner = message.body
+            if not name.startswith(MPRIS_PREFIX):
+                return
+            if new_owner:
+                asyncio.ensure_future(self._add_player(name, new_owner))
+            elif self._players.pop(name, None) is not None:
+                logging.debug(f"MPRIS 播放器已退出: {name}")
+                self._changed.set()
+            return
+
+        player = next((p for p in self._players.values() if p.owner == message.sender), None)
+        if player is None or message.path != MPRIS_PATH:
+            return
+        if message.member == 'PropertiesChanged' and message.body[0] == PLAYER_INTERFACE:
+            player.apply_properties(message.body[1], now)
+            # 播放器可以只声明属性失效而不附带新值，此时在下次查询时重新读取
+            if message.body[2]:
+                player.position_stale = True
+                asyncio.ensure_future(self._reload_player(player))
+        elif message.member == 'Seeked' and message.interface == PLAYER_INTERFACE:
+            player.set_position(message.body[0], now)
+            player.last_change = now
+        else:
+            return
+        self._changed.set()
+
+    async def _reload_player(self, player: _PlayerState):
+        try:
+            player.apply_properties(await self._get_all(self._bus, player.bus_name, PLAYER_INTERFACE),
+                                    time.monotonic())
+        except Exception as e:
+            logging.debug(f"重新读取 {player.bus_name} 的属性失败: {e}")
+            return
+        self._changed.set()
+
+    async def _list_player_names(self, bus) -> list[str]:
+        names = (await self._call(bus, DBUS_NAME, DBUS_PATH, DBUS_NAME, 'ListNames'))[0]
+        return sorted(name for name in names if name.startswith(MPRIS_PREFIX))
+
+    async def _get_all(self, bus, bus_name: str, interface: str) -> dict:
+        return (await self._call(bus, bus_name, MPRIS_PATH, PROPERTIES_INTERFACE,
+                                 'GetAll', 's', [interface]))[0]
+
+    async def _get_property(self, bus, bus_name: str, interface: str, prop: str):
+        """读取单个属性，播放器未实现该属性时返回 None。"""
+        try:
+            reply = await self._call(bus, bus_name, MPRIS_PATH, PROPERTIES_INTERFACE,
+                                     'Get', 'ss', [interface, prop])
+        except MediaMonitorError:
+            return None
+        return reply[0].value
+
+    @staticmethod
+    async def _call(bus, destination: str, path: str, interface: str, member: str,
+                    signature: str = '', body: list | None = None) -> list:
+        reply = await bus.call(Message(destination=destination, path=path, interface=interface,
+                                       member=member, signature=signature, body=body or []))
+        if reply.message_type == MessageType.ERROR:
+            raise MediaMonitorError(f"{member} 调用失败: {reply.error_name} {reply.body}")
+        return reply.body
@@ -0,0 +1,195 @@
+# monitors/mpv_monitor.py
+import asyncio
+import json
+import logging
+import sys
+import time
+from datetime import timedelta
+
+# 导入抽象基类及通用的数据类型
+from .base_monitor import BaseMediaMonitor, SessionChangeDetector, SessionInfo
+
+MPV_AUMID = 'mpv'
+
+# 读取 IPC 消息时单行的最大长度（标题等属性可能较长）
+_STREAM_LIMIT = 1024 * 1024
+
+
+class MpvMediaMonitor(BaseMediaMonitor):
+    """
+    mpv 播放器的媒体监控器实现。
+    通过 mpv 的 JSON IPC（启动参数 --input-ipc-server）保持一条持久连接，
+    用 observe_property 订阅进度、暂停和速率等属性，由 mpv 主动推送变化并缓存在本地。
+    查询时直接返回缓存，不产生任何 IPC 往返；连接断开后按退避间隔自动重连。
+    订阅（subscribe）时只在状态变化或进度跳转时被唤醒，time-pos 的正常推进不会唤醒订阅者。
+    """
+    RECONNECT_DELAY_S = 0.5
+    RECONNECT_MAX_DELAY_S = 5.0
+    OBSERVED_PROPERTIES = ('pause', 'speed', 'time-pos', 'duration', 'media-title', 'idle-active')
+
+    def __init__(self, ipc_path: str):
+        """
+        Args:
+            ipc_path (str): mpv 的 IPC 地址。Linux/macOS 上为 UNIX 套接字路径，
+                Windows 上为命名管道（如 \\\\.\\pipe\\mpvsocket）。
+        """
+        self.ipc_path = ipc_path
+        self._loop = None
+        self._task = None
+        self._connected = False
+        self._props: dict = {}
+        self._position_time = 0.0 # 最近一次收到 time-pos 的时间
+        self._changed: asyncio.Event | None = None # 状态变化时置位，唤醒订阅者
+
+    async def list_sessions(self) -> list[dict]:
+        """
+        列出 mpv 会话。已连接时直接读取缓存，否则临时连接一次查询标题。
+        该方法可能在另一个线程的事件循环中调用，因此不会使用监控用的持久连接。
+        """
+        if self._connected and not self._props.get('idle-active', True):
+            return [{"aumid": MPV_AUMID, "title": self._props.get('media-title') or MPV_AUMID}]
+        try:
+            title = await asyncio.wait_for(self._query_property('media-title'), timeout=1.0)
+        except (OSError, asyncio.TimeoutError, ValueError):
+            return []
+        return [{"aumid": MPV_AUMID, "title": title}] if title else []
+
+    async def get_current_session_info(self) -> SessionInfo | None:
+        """返回缓存的 mpv 播放状态。未连接或没有打开文件时返回 None。"""
+        self._ensure_running()
+        props = self._props
+        if not self._connected or props.get('idle-active', True) or props.get('time-pos') is None:
+            return None
+        return SessionInfo(
+            title=props.get('media-title') or '', artist='',
+            status='PAUSED' if props.get('pause') else 'PLAYING',
+            position=timedelta(seconds=self._position_at(time.monotonic())),
+            duration=timedelta(seconds=props.get('duration') or 0),
+            aumid=MPV_AUMID,
+            playback_rate=props.get('speed') or 1.0
+        )
+
+    async def close(self):
+        """停止连接任务并断开与 mpv 的连接。"""
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+        self._connected = False
+        self._props.clear()
+
+    async def _wait_for_update(self):
+        await self._changed.wait()
+        self._changed.clear()
+
+    def _position_at(self, now: float) -> float:
+        position = self._props.get('time-pos') or 0.0
+        if self._props.get('pause'):
+            return position
+        # mpv 在播放中会频繁推送 time-pos，这里只补上两次推送之间的间隔
+        return position + (now - self._position_time) * (self._props.get('speed') or 1.0)
+
+    def _ensure_running(self):
+        """在当前事件循环中启动连接任务。事件循环改变（如热重载后新建了工作线程）时重新启动。"""
+        loop = asyncio.get_running_loop()
+        if self._task is not None and not self._task.done() and self._loop is loop:
+            return
+        self._loop = loop
+        self._connected = False
+        self._props.clear()
+        self._changed = asyncio.Event()
+        self._task = loop.create_task(self._run())
+
+    async def _run(self):
+        delay = self.RECONNECT_DELAY_S
+        while True:
+            try:
+                reader, writer = await self._open_connection()
+            except OSError as e:
+                logging.debug(f"无法连接到 mpv IPC '{self.ipc_path}': {e}，{delay:.1f} 秒后重试")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.RECONNECT_MAX_DELAY_S)
+                continue
+
+            logging.info(f"已连接到 mpv IPC: {self.ipc_path}")
+            delay = self.RECONNECT_DELAY_S
+            try:
+                await self._receive(reader, writer)
+            except (OSError, ValueError) as e:
+                logging.warning(f"与 mpv 的 IPC 通信出错: {e}")
+            finally:
+                self._connected = False
+                self._props.clear()
+                self._changed.set()
+                writer.close()
+            logging.info("与 mpv 的连接已断开，正在重连...")
+            await asyncio.sleep(delay)
+
+    async def _receive(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """订阅属性后持续接收 mpv 推送的事件，直到连接关闭。"""
+        for observe_id, name in enumerate(self.OBSERVED_PROPERTIES, start=1):
+            writer.write(self._encode(["observe_property", observe_id, name]))
+        await writer.drain()
+        self._connected = True
+        self._changed.set()
+
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            message = json.loads(line)
+            if message.get('event') == 'property-change':
+                self._on_property_change(message['name'], message.get('data'))
+
+    def _on_property_change(self, name: str, value):
+        now = time.monotonic()
+        changed = True
+        if name in ('pause', 'speed'):
+            # 暂停或速率改变前先把外推的进度固定下来
+            if self._props.get('time-pos') is not None:
+                self._props['time-pos'] = self._position_at(now)
+                self._position_time = now
+        elif name == 'time-pos':
+            # 播放中 time-pos 每帧都会推送，只有偏离外推位置（跳转）时才唤醒订阅者
+            if value is not None and self._props.get('time-pos') is not None:
+                changed = abs(value - self._position_at(now)) > SessionChangeDetector.JUMP_THRESHOLD_S
+            self._position_time = now
+        self._props[name] = value
+        if changed:
+            self._changed.set()
+
+    async def _query_property(self, name: str):
+        """临时建立一条连接查询单个属性。"""
+        reader, writer = await self._open_connection()
+        try:
+            writer.write(self._encode(["get_property", name], request_id=1))
+            await writer.drain()
+            while True:
+                line = await reader.readline()
+                if not line:
+                    return None
+                message = json.loads(line)
+                if message.get('request_id') == 1:
+                    return message.get('data') if message.get('error') == 'success' else None
+        finally:
+            writer.close()
+
+    async def _open_connection(self) -> tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        if sys.platform == 'win32':
+            # Windows 上 mpv 使用命名管道，需要 ProactorEventLoop（Python 3.8+ 的默认事件循环）
+            loop = asyncio.get_running_loop()
+            reader = asyncio.StreamReader(limit=_STREAM_LIMIT, loop=loop)
+            protocol = asyncio.StreamReaderProtocol(reader, loop=loop)
+            transport, _ = await loop.create_pipe_connection(lambda: protocol, self.ipc_path)
+            return reader, asyncio.StreamWriter(transport, protocol, reader, loop)
+        return await asyncio.open_unix_connection(self.ipc_path, limit=_STREAM_LIMIT)
+
+    @staticmethod
+    def _encode(command: list, request_id: int | None = None) -> bytes:
+        message = {"command": command}
+        if request_id is not None:
+            message["request_id"] = request_id
+        return (json.dumps(message) + '\n').encode('utf-8')
@@ -0,0 +1,154 @@
+# monitors/replay_monitor.py
+import asyncio
+import bisect
+import json
+import logging
+import time
+from datetime import timedelta
+
+# 导入抽象基类及通用的数据类型
+from .base_monitor import BaseMediaMonitor, MediaMonitorError, SessionInfo
+
+TIMELINE_VERSION = 1
+
+
+def session_to_dict(info: SessionInfo | None) -> dict | None:
+    """将 SessionInfo 转换为可写入 JSON 的字典，时间以秒表示。"""
+    if info is None:
+        return None
+    return {
+        "title": info.title, "artist": info.artist, "status": info.status,
+        "position": info.position.total_seconds(), "duration": info.duration.total_seconds(),
+        "aumid": info.source_aumid, "rate": info.playback_rate,
+    }
+
+
+def session_from_dict(data: dict | None, elapsed: float = 0.0) -> SessionInfo | None:
+    """由字典还原 SessionInfo。播放中的会话按速率把进度向后推进 elapsed 秒。"""
+    if data is None:
+        return None
+    rate = data.get("rate", 1.0) or 1.0
+    position = data["position"]
+    if data["status"] == "PLAYING":
+        position += elapsed * rate
+    return SessionInfo(
+        title=data.get("title", ""), artist=data.get("artist", ""), status=data["status"],
+        position=timedelta(seconds=position), duration=timedelta(seconds=data.get("duration", 0.0)),
+        aumid=data.get("aumid", ""), playback_rate=rate
+    )
+
+
+def load_timeline(path: str) -> list[tuple[float, dict | None]]:
+    """读取录制的时间线文件，返回按时间排序的 (相对时间, 会话快照) 列表。"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        raise MediaMonitorError(f"无法读取回放时间线 '{path}': {e}")
+    if data.get("version") != TIMELINE_VERSION:
+        raise MediaMonitorError(f"不支持的时间线版本: {data.get('version')}")
+    return sorted(((float(e["t"]), e.get("session")) for e in data["events"]), key=lambda e: e[0])
+
+
+def save_timeline(path: str, events: list[tuple[float, dict | None]]):
+    """保存时间线。每个事件是某一时刻的完整会话快照（None 表示没有会话）。"""
+    data = {
+        "version": TIMELINE_VERSION,
+        "events": [{"t": round(t, 6), "session": session} for t, session in events],
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=1)
+
+
+async def record_timeline(monitor: BaseMediaMonitor, duration_s: float | None = None,
+                          time_source=time.monotonic) -> list[tuple[float, dict | None]]:
+    """
+    从任意监控器录制时间线：订阅其状态变化，每次变化记录一个快照。
+
+    Args:
+        monitor (BaseMediaMonitor): 被录制的监控器。
+        duration_s (float | None): 录制时长（秒），None 表示直到任务被取消。
+
+    Returns:
+        list[tuple[float, dict | None]]: 可交给 save_timeline 保存的事件列表。
+    """
+    events = []
+    start = time_source()
+
+    async def collect():
+        async for info in monitor.subscribe():
+            events.append((time_source() - start, session_to_dict(info)))
+            logging.debug(f"录制: {events[-1][0]:.2f}s {info}")
+
+    try:
+        await asyncio.wait_for(collect(), duration_s)
+    except (asyncio.TimeoutError, asyncio.CancelledError):
+        pass
+    finally:
+        await monitor.close()
+    return events
+
+
+class ReplayMediaMonitor(BaseMediaMonitor):
+    """
+    回放录制好的会话时间线（播放、暂停、跳转、速率和标题变化）的媒体监控器。
+    时间线从第一次查询（或调用 rewind）时开始计时；可注入虚拟时钟以脱离真实时间回放。
+    """
+    def __init__(self, events: list[tuple[float, dict | None]], time_source=time.monotonic):
+        """
+        Args:
+            events (list): (相对时间, 会话快照) 列表，见 load_timeline。
+            time_source (callable): 时间源，默认 time.monotonic，也可注入 VirtualClock。
+        """
+        self._events = sorted(events, key=lambda e: e[0])
+        self._times = [t for t, _ in self._events]
+        self._time_source = time_source
+        self._start: float | None = None
+
+    @classmethod
+    def from_file(cls, path: str, time_source=time.monotonic) -> 'ReplayMediaMonitor':
+        return cls(load_timeline(path), time_source)
+
+    @property
+    def duration(self) -> float:
+        """最后一个事件的相对时间。"""
+        return self._times[-1] if self._times else 0.0
+
+    def rewind(self):
+        """从当前时刻重新开始回放。"""
+        self._start = self._time_source()
+
+    def elapsed(self) -> float:
+        if self._start is None:
+            self.rewind()
+        return self._time_source() - self._start
+
+    def session_at(self, t: float) -> SessionInfo | None:
+        """返回时间线上 t 时刻的会话状态，播放中的进度按速率外推。"""
+        idx = bisect.bisect_right(self._times, t) - 1
+        if idx < 0:
+            return None
+        event_time, session = self._events[idx]
+        return session_from_dict(session, t - event_time)
+
+    def current_session(self) -> SessionInfo | None:
+        """同步版本的 get_current_session_info，供虚拟时间下逐帧驱动时使用。"""
+        return self.session_at(self.elapsed())
+
+    async def list_sessions(self) -> list[dict]:
+        seen = {}
+        for _, session in self._events:
+            if session and session.get("aumid") not in seen:
+                seen[session.get("aumid")] = session.get("title", "")
+        return [{"aumid": aumid, "title": title} for aumid, title in seen.items()]
+
+    async def get_current_session_info(self) -> SessionInfo | None:
+        return self.current_session()
+
+    async def _wait_for_update(self):
+        """休眠到下一个事件的时刻。时间线结束后保持最后的状态，不再唤醒。"""
+        elapsed = self.elapsed()
+        idx = bisect.bisect_right(self._times, elapsed)
+        if idx >= len(self._times):
+            await asyncio.Event().wait()
+        await asyncio.sleep(self._times[idx] - elapsed)
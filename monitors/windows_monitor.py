@@ -1,16 +1,12 @@
 # monitors/windows_monitor.py
 import asyncio
-from datetime import timedelta
 import logging
 
-# 导入抽象基类
-from .base_monitor import BaseMediaMonitor
+# 导入抽象基类及通用的数据类型
+from .base_monitor import BaseMediaMonitor, MediaMonitorError, SessionInfo
 
 # 尝试导入Windows平台特定的库
 try:
-    import win32gui
-    import win32process
-    from psutil import Process
     from winsdk.windows.media.control import (
         GlobalSystemMediaTransportControlsSessionManager as MediaManager,
         GlobalSystemMediaTransportControlsSessionPlaybackStatus as PlaybackStatus
@@ -19,35 +15,9 @@ try:
 except ImportError:
     WINSDK_AVAILABLE = False
     # 如果缺少库，在代码加载时就给出提示
-    logging.warning("缺少 Windows 平台所需的库 (winsdk, pywin32, psutil)。媒体监控功能将不可用。")
+    logging.warning("缺少 Windows 平台所需的库 (winsdk)。媒体监控功能将不可用。")
 
 
-class MediaMonitorError(Exception):
-    """模块自定义的异常基类。"""
-    pass
-
-class SessionInfo:
-    """一个简单的数据类，用于存储媒体会话的详细信息。"""
-    def __init__(self, title, artist, status, position, duration, aumid):
-        self.title = title
-        self.artist = artist
-        self.status = status.name # PlaybackStatus 枚举成员的名称, e.g., "PLAYING"
-        self.position = position # timedelta 对象
-        self.duration = duration # timedelta 对象
-        self.source_aumid = aumid # 来源应用的AUMID
-
-    def __repr__(self):
-        pos_str = self.format_time(self.position)
-        dur_str = self.format_time(self.duration)
-        return (f"<SessionInfo(aumid='{self.source_aumid}', status='{self.status}', "
-                f"title='{self.title}', progress='{pos_str}/{dur_str}')>")
-
-    @staticmethod
-    def format_time(duration: timedelta) -> str:
-        """将 timedelta 对象格式化为 HH:MM:SS"""
-        ts = int(duration.total_seconds())
-        return f"{ts // 3600:02d}:{(ts % 3600) // 60:02d}:{ts % 60:02d}"
-
 class WindowsMediaMonitor(BaseMediaMonitor):
     """
     Windows平台的媒体监控器实现。
@@ -95,30 +65,33 @@ class WindowsMediaMonitor(BaseMediaMonitor):
             return None
         return None
 
+    async def get_all_session_info(self) -> list[SessionInfo]:
+        """异步获取所有 SMTC 会话的详细信息。同一 AUMID 有多个会话时只保留最后一个。"""
+        try:
+            manager = await MediaManager.request_async()
+            sessions = manager.get_sessions()
+        except Exception:
+            return []
+        infos = []
+        for session in sessions:
+            try:
+                infos.append(await self._get_session_details(session))
+            except Exception:
+                # 某些会话可能在查询时失效，直接跳过
+                continue
+        return infos
+
     async def _get_session_details(self, session) -> SessionInfo:
         """从一个会话对象中异步提取完整的媒体信息。"""
         info = await session.try_get_media_properties_async()
         timeline = session.get_timeline_properties()
         playback_info = session.get_playback_info()
+        # playback_rate 是可空属性，部分播放器不会提供
+        playback_rate = playback_info.playback_rate
         return SessionInfo(
             title=info.title, artist=info.artist,
             status=PlaybackStatus(playback_info.playback_status),
             position=timeline.position, duration=timeline.end_time,
-            aumid=session.source_app_user_model_id
+            aumid=session.source_app_user_model_id,
+            playback_rate=float(playback_rate) if playback_rate else 1.0
         )
-
-    def get_foreground_window_aumid(self) -> str | None:
-        """
-        获取当前前台窗口的进程名，作为AUMID的代理。
-        注意：这只是一个近似方法，并非所有进程名都等于其AUMID，但对于PotPlayer等应用有效。
-        """
-        if not WINSDK_AVAILABLE:
-            return None
-        try:
-            hwnd = win32gui.GetForegroundWindow()
-            if hwnd:
-                _, pid = win32process.GetWindowThreadProcessId(hwnd)
-                return Process(pid).name()
-        except Exception:
-            return None
-        return None
\ No newline at end of file
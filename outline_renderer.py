@@ -0,0 +1,258 @@
+# outline_renderer.py
+import importlib.util
+import time
+from collections import OrderedDict
+
+from PyQt6.QtCore import Qt, QPointF, QSize
+from PyQt6.QtGui import (
+    QFont, QPainter, QColor, QFontMetrics, QPainterPath,
+    QPainterPathStroker, QPixmap, QImage
+)
+
+# NumPy 是可选依赖，仅用于加速 'dilate' 描边方式。
+# 导入 NumPy 需要数十毫秒，因此启动时只检查它是否安装，第一次使用该描边方式时才导入
+NUMPY_AVAILABLE = importlib.util.find_spec('numpy') is not None
+_np = None
+
+
+def _numpy():
+    global _np
+    if _np is None:
+        import numpy
+        _np = numpy
+    return _np
+
+# 可在配置中选择的描边方式
+#   stroker: 文本转路径后用 QPainterPathStroker 描边（原始实现，质量最好，最慢）
+#   offset:  在若干偏移位置重复绘制黑色文字，再绘制正文
+#   dilate:  将文字的 alpha 遮罩做可分离的膨胀运算，得到描边
+#   atlas:   按字形缓存描边图片，拼接成整条弹幕的描边
+OUTLINE_METHODS = ('stroker', 'offset', 'dilate', 'atlas')
+
+OUTLINE_COLOR = QColor("black")
+
+# 字形描边缓存的最大条目数
+_ATLAS_MAX_GLYPHS = 4096
+_glyph_atlas: OrderedDict = OrderedDict()
+
+
+def draw_outlined_text(painter: QPainter, text: str, font: QFont, metrics: QFontMetrics,
+                       color: QColor, stroke_width: int, method: str = 'stroker'):
+    """
+    在画笔当前的目标上绘制带描边的文字。
+    文字基线位于 (stroke_width, ascent + stroke_width)，即目标位图四周各留出 stroke_width 的描边边距，
+    与 DanmakuWindow._rasterize 的位图尺寸约定一致。
+
+    Args:
+        painter (QPainter): 已在目标位图上激活的画笔。
+        text (str): 弹幕文本。
+        font (QFont): 绘制使用的字体。
+        metrics (QFontMetrics): 与 font 对应的字体度量。
+        color (QColor): 文字颜色。
+        stroke_width (int): 描边宽度（像素）。
+        method (str): 描边方式，见 OUTLINE_METHODS。
+    """
+    origin = QPointF(stroke_width, metrics.ascent() + stroke_width)
+    painter.setFont(font)
+
+    if stroke_width <= 0:
+        painter.setPen(color)
+        painter.drawText(origin, text)
+        return
+
+    if method == 'offset':
+        _draw_offset_outline(painter, text, origin, stroke_width)
+    elif method == 'dilate':
+        _draw_dilated_outline(painter, text, font, metrics, origin, stroke_width)
+    elif method == 'atlas':
+        _draw_atlas_outline(painter, text, font, metrics, origin, stroke_width)
+    else:
+        path = QPainterPath()
+        path.addText(origin, font, text)
+        stroker = QPainterPathStroker()
+        stroker.setWidth(stroke_width * 2)
+        stroker.setCapStyle(Qt.PenCapStyle.RoundCap)
+        stroker.setJoinStyle(Qt.PenJoinStyle.RoundJoin)
+        painter.setPen(Qt.PenStyle.NoPen)
+        painter.fillPath(stroker.createStroke(path), OUTLINE_COLOR)
+        painter.fillPath(path, color)
+        return
+
+    painter.setPen(color)
+    painter.drawText(origin, text)
+
+
+def _outline_offsets(stroke_width: int) -> list[tuple[int, int]]:
+    """返回半径为 stroke_width 的圆周上的整数偏移，宽度较小时即为8个方向。"""
+    offsets = []
+    for dx in range(-stroke_width, stroke_width + 1):
+        for dy in range(-stroke_width, stroke_width + 1):
+            if (dx, dy) == (0, 0):
+                continue
+            dist_sq = dx * dx + dy * dy
+            # 只取外圈，内部的偏移会被外圈覆盖
+            if (stroke_width - 1) ** 2 < dist_sq <= stroke_width ** 2 + 1:
+                offsets.append((dx, dy))
+    return offsets
+
+
+def _draw_offset_outline(painter: QPainter, text: str, origin: QPointF, stroke_width: int):
+    painter.setPen(OUTLINE_COLOR)
+    for dx, dy in _outline_offsets(stroke_width):
+        painter.drawText(QPointF(origin.x() + dx, origin.y() + dy), text)
+
+
+def _draw_dilated_outline(painter: QPainter, text: str, font: QFont, metrics: QFontMetrics,
+                          origin: QPointF, stroke_width: int):
+    device = painter.device()
+    mask = QImage(device.width(), device.height(), QImage.Format.Format_ARGB32_Premultiplied)
+    mask.fill(Qt.GlobalColor.transparent)
+    mask_painter = QPainter(mask)
+    mask_painter.setRenderHints(painter.renderHints())
+    # 遮罩与目标设备等大，沿用画笔当前的变换（分块/多行渲染时会有平移）
+    mask_painter.setTransform(painter.transform())
+    mask_painter.setFont(font)
+    mask_painter.setPen(OUTLINE_COLOR)
+    mask_painter.drawText(origin, text)
+    mask_painter.end()
+
+    if NUMPY_AVAILABLE:
+        outline = _dilate_numpy(mask, stroke_width)
+    else:
+        outline = _dilate_qt(mask, stroke_width)
+    painter.save()
+    painter.resetTransform()
+    painter.drawImage(0, 0, outline)
+    painter.restore()
+
+
+def _dilate_numpy(mask: QImage, radius: int) -> QImage:
+    """对 alpha 通道分别做水平、垂直两次最大值滤波（可分离的方形膨胀）。"""
+    np = _numpy()
+    width, height = mask.width(), mask.height()
+    stride = mask.bytesPerLine() // 4
+    ptr = mask.constBits()
+    ptr.setsize(mask.sizeInBytes())
+    pixels = np.frombuffer(ptr, dtype=np.uint32).reshape(height, stride)[:, :width]
+    alpha = (pixels >> 24).astype(np.uint8)
+
+    horizontal = alpha.copy()
+    for k in range(1, radius + 1):
+        np.maximum(horizontal[:, k:], alpha[:, :-k], out=horizontal[:, k:])
+        np.maximum(horizontal[:, :-k], alpha[:, k:], out=horizontal[:, :-k])
+    dilated = horizontal.copy()
+    for k in range(1, radius + 1):
+        np.maximum(dilated[k:, :], horizontal[:-k, :], out=dilated[k:, :])
+        np.maximum(dilated[:-k, :], horizontal[k:, :], out=dilated[:-k, :])
+
+    # 描边为黑色，预乘格式下 RGB 分量均为0，只需写入 alpha
+    argb = np.ascontiguousarray(dilated.astype(np.uint32) << 24)
+    result = QImage(argb.data, width, height, width * 4, QImage.Format.Format_ARGB32_Premultiplied)
+    # QImage 不持有 numpy 缓冲区，复制一份以脱离其生命周期
+    return result.copy()
+
+
+def _dilate_qt(mask: QImage, radius: int) -> QImage:
+    """无 NumPy 时的回退实现：用平移叠加代替最大值滤波，水平和垂直各一遍。"""
+    horizontal = QImage(mask.size(), QImage.Format.Format_ARGB32_Premultiplied)
+    horizontal.fill(Qt.GlobalColor.transparent)
+    p = QPainter(horizontal)
+    for dx in range(-radius, radius + 1):
+        p.drawImage(dx, 0, mask)
+    p.end()
+
+    dilated = QImage(mask.size(), QImage.Format.Format_ARGB32_Premultiplied)
+    dilated.fill(Qt.GlobalColor.transparent)
+    p = QPainter(dilated)
+    for dy in range(-radius, radius + 1):
+        p.drawImage(0, dy, horizontal)
+    p.end()
+    return dilated
+
+
+def _get_glyph_outline(char: str, font: QFont, metrics: QFontMetrics, stroke_width: int) -> QPixmap:
+    """获取单个字形的描边位图，未命中时使用 QPainterPathStroker 生成并缓存。"""
+    key = (font.key(), stroke_width, char)
+    pixmap = _glyph_atlas.get(key)
+    if pixmap is not None:
+        _glyph_atlas.move_to_end(key)
+        return pixmap
+
+    pixmap = QPixmap(QSize(metrics.horizontalAdvance(char) + metrics.maxWidth() // 2 + stroke_width * 2,
+                           metrics.height() + stroke_width * 2))
+    pixmap.fill(Qt.GlobalColor.transparent)
+    path = QPainterPath()
+    path.addText(QPointF(stroke_width, metrics.ascent() + stroke_width), font, char)
+    stroker = QPainterPathStroker()
+    stroker.setWidth(stroke_width * 2)
+    stroker.setCapStyle(Qt.PenCapStyle.RoundCap)
+    stroker.setJoinStyle(Qt.PenJoinStyle.RoundJoin)
+    painter = QPainter(pixmap)
+    painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+    painter.setPen(Qt.PenStyle.NoPen)
+    painter.fillPath(stroker.createStroke(path), OUTLINE_COLOR)
+    painter.end()
+
+    _glyph_atlas[key] = pixmap
+    if len(_glyph_atlas) > _ATLAS_MAX_GLYPHS:
+        _glyph_atlas.popitem(last=False)
+    return pixmap
+
+
+def _draw_atlas_outline(painter: QPainter, text: str, font: QFont, metrics: QFontMetrics,
+                        origin: QPointF, stroke_width: int):
+    x = origin.x() - stroke_width
+    top = origin.y() - metrics.ascent() - stroke_width
+    for char in text:
+        if not char.isspace():
+            painter.drawPixmap(QPointF(x, top), _get_glyph_outline(char, font, metrics, stroke_width))
+        x += metrics.horizontalAdvance(char)
+
+
+def clear_glyph_atlas():
+    """清空字形描边缓存，例如在字体或描边宽度改变之后。"""
+    _glyph_atlas.clear()
+
+
+def benchmark(lengths=(4, 16, 64, 256), repeats: int = 50, font_name: str = '微软雅黑',
+              font_size: int = 24, stroke_width: int = 2) -> dict:
+    """
+    对比各描边方式生成单条弹幕位图的平均耗时，位图尺寸与渲染器单行弹幕的相同。需要已创建 QApplication。
+
+    Returns:
+        dict: {method: {length: 每条弹幕的平均耗时(毫秒)}}
+    """
+    font = QFont(font_name, font_size, QFont.Weight.Bold)
+    metrics = QFontMetrics(font)
+    sample = "这是一条用于测试描边性能的中文弹幕ABC123！"
+    color = QColor("white")
+    results = {}
+    for method in OUTLINE_METHODS:
+        clear_glyph_atlas()
+        results[method] = {}
+        for length in lengths:
+            text = (sample * (length // len(sample) + 1))[:length]
+            width = max(metrics.horizontalAdvance(text), metrics.boundingRect(text).width()) + stroke_width * 2
+            height = metrics.height() + stroke_width * 2
+            start = time.perf_counter()
+            for _ in range(repeats):
+                pixmap = QPixmap(width, height)
+                pixmap.fill(Qt.GlobalColor.transparent)
+                painter = QPainter(pixmap)
+                painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+                draw_outlined_text(painter, text, font, metrics, color, stroke_width, method)
+                painter.end()
+            results[method][length] = (time.perf_counter() - start) * 1000 / repeats
+    return results
+
+
+if __name__ == '__main__':
+    # 手动运行: python outline_renderer.py
+    import sys
+    from PyQt6.QtWidgets import QApplication
+    app = QApplication(sys.argv)
+    lengths = (4, 16, 64, 256)
+    print(f"NumPy 可用: {NUMPY_AVAILABLE}")
+    print(f"{'method':<10}" + "".join(f"{f'len={n}':>12}" for n in lengths))
+    for method, timings in benchmark(lengths).items():
+        print(f"{method:<10}" + "".join(f"{timings[n]:>10.3f}ms" for n in lengths))
@@ -0,0 +1,362 @@
+# parse_worker.py
+"""
+弹幕解析工作进程。大文件的XML解析、过滤（不支持的模式、格式错误的行）和排序都在独立的进程中完成，
+不再与GUI线程争夺GIL；结果以列式数组写入 multiprocessing.shared_memory，主进程直接映射读取，不复制也不反序列化。
+
+共享内存中的弹幕表（TABLE_LAYOUT_VERSION）:
+    头部 32 字节: 魔数 b'DMKT' | 布局版本 uint32 | 弹幕条数 n uint64 | 文本字节数 uint64 | 保留 uint64
+    start_time float64[n] | text_offset uint64[n+1] | color uint32[n] | font_size int32[n] | mode uint8[n] | 文本 (UTF-8)
+
+交接协议（PROTOCOL_VERSION），每条消息都是以协议版本开头的元组:
+    主进程 -> 工作进程: (版本, 'load', 序号, 路径) | (版本, 'release', 序号) | (版本, 'quit')
+    工作进程 -> 主进程: (版本, 'ready', 序号, 共享内存名称) | (版本, 'failed', 序号, 错误信息)
+主进程映射并校验弹幕表后发送 release，工作进程随即关闭并删除共享内存的名称；
+主进程中的映射一直有效，直到弹幕表被回收。
+"""
+import logging
+import multiprocessing
+import struct
+import threading
+import time
+import xml.etree.ElementTree as ET
+from array import array
+from collections.abc import Sequence
+from itertools import accumulate
+from multiprocessing.shared_memory import SharedMemory
+
+from danmaku_models import DanmakuData
+from danmaku_parser import color_from_decimal, load_from_xml, read_sorted_fields
+
+PROTOCOL_VERSION = 1
+TABLE_LAYOUT_VERSION = 1
+
+_MAGIC = b'DMKT'
+_HEADER = struct.Struct('<4sIQQQ')
+# 各列依次排列: (名称, 数组类型码, 每项字节数)。8 字节的列在前，保证每一列都按自身大小对齐
+_COLUMNS = (('start_time', 'd', 8), ('text_offset', 'Q', 8), ('color', 'I', 4),
+            ('font_size', 'i', 4), ('mode', 'B', 1))
+
+
+def _layout(count: int) -> tuple[dict[str, tuple[int, int]], int]:
+    """返回各列的 (起始偏移, 项数) 和文本区的起始偏移。"""
+    columns, position = {}, _HEADER.size
+    for name, _, size in _COLUMNS:
+        length = count + 1 if name == 'text_offset' else count
+        columns[name] = (position, length)
+        position += size * length
+    return columns, position
+
+
+def write_table(rows: list[tuple[float, int, int, int, str]]) -> SharedMemory:
+    """把 read_sorted_fields 的结果写入一块新建的共享内存，返回它（调用者负责关闭和删除）。"""
+    texts = [row[4].encode('utf-8') for row in rows]
+    blob = b''.join(texts)
+    data = {
+        'start_time': array('d', (row[0] for row in rows)),
+        'text_offset': array('Q', accumulate(map(len, texts), initial=0)),
+        'color': array('I', (row[3] & 0xFFFFFF for row in rows)),
+        'font_size': array('i', (row[2] for row in rows)),
+        'mode': array('B', (row[1] for row in rows)),
+    }
+    columns, text_start = _layout(len(rows))
+    shm = SharedMemory(create=True, size=text_start + max(len(blob), 1))
+    buf = shm.buf
+    buf[:_HEADER.size] = _HEADER.pack(_MAGIC, TABLE_LAYOUT_VERSION, len(rows), len(blob), 0)
+    for name, (offset, _) in columns.items():
+        raw = memoryview(data[name]).cast('B')
+        buf[offset:offset + len(raw)] = raw
+    buf[text_start:text_start + len(blob)] = blob
+    return shm
+
+
+class _SharedColumn(Sequence):
+    """共享内存中的一列。持有弹幕表的引用，使映射在这一列被使用期间保持有效。"""
+    __slots__ = ('_table', '_view')
+
+    def __init__(self, table: 'DanmakuTable', view: memoryview):
+        self._table = table
+        self._view = view
+
+    def __len__(self) -> int:
+        return len(self._view)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self._view[index].tolist()
+        return self._view[index]
+
+    def __iter__(self):
+        return iter(self._view.tolist())
+
+
+class DanmakuTable(Sequence):
+    """
+    映射到本进程的一份共享内存弹幕表。只读，用法与按开始时间排序的 DanmakuData 列表相同；
+    各列直接读取共享内存，取出某一条弹幕时才创建对应的 DanmakuData。
+    """
+    def __init__(self, shm: SharedMemory):
+        """
+        Raises:
+            ValueError: 共享内存中不是当前布局版本的弹幕表，或者数据不完整。
+        """
+        # 校验失败时 __del__ 仍会被调用，共享内存由调用者关闭
+        self._shm: SharedMemory | None = None
+        magic, version, count, text_bytes, _ = _HEADER.unpack_from(shm.buf)
+        if magic != _MAGIC or version != TABLE_LAYOUT_VERSION:
+            raise ValueError(f"共享内存中的弹幕表格式不匹配: {magic!r}，布局版本 {version}")
+        columns, text_start = _layout(count)
+        if text_start + text_bytes > shm.size:
+            raise ValueError(f"共享内存中的弹幕表不完整: 需要 {text_start + text_bytes} 字节，只有 {shm.size} 字节")
+        self._shm = shm
+        self._count = count
+        views = {}
+        for name, typecode, size in _COLUMNS:
+            offset, length = columns[name]
+            views[name] = shm.buf[offset:offset + size * length].cast(typecode)
+        self._start_times = views['start_time']
+        self._text_offsets = views['text_offset']
+        self._colors = views['color']
+        self._font_sizes = views['font_size']
+        self._modes = views['mode']
+        self._text = shm.buf[text_start:text_start + text_bytes]
+
+    @classmethod
+    def attach(cls, name: str) -> 'DanmakuTable':
+        """按名称映射工作进程发布的弹幕表。"""
+        shm = SharedMemory(name=name)
+        try:
+            return cls(shm)
+        except Exception:
+            shm.close()
+            raise
+
+    @property
+    def start_times(self) -> Sequence[float]:
+        """按顺序排列的开始时间列，可直接用于二分查找。"""
+        return _SharedColumn(self, self._start_times)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._row(i) for i in range(*index.indices(self._count))]
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("弹幕表索引超出范围")
+        return self._row(index)
+
+    def __iter__(self):
+        for i in range(self._count):
+            yield self._row(i)
+
+    def _row(self, i: int) -> DanmakuData:
+        text = str(self._text[self._text_offsets[i]:self._text_offsets[i + 1]], 'utf-8')
+        return DanmakuData(self._start_times[i], self._modes[i], text,
+                           color_from_decimal(self._colors[i]), self._font_sizes[i])
+
+    def close(self):
+        """解除映射。之后不能再访问这份弹幕表。"""
+        if self._shm is None:
+            return
+        for view in (self._start_times, self._text_offsets, self._colors, self._font_sizes, self._modes, self._text):
+            view.release()
+        self._shm.close()
+        self._shm = None
+
+    def __del__(self):
+        self.close()
+
+
+def _serve(conn):
+    """工作进程的主循环。主进程退出（管道关闭）或收到 quit 时结束，删除所有尚未交接的共享内存。"""
+    published: dict[int, SharedMemory] = {}
+
+    def discard(shm: SharedMemory):
+        shm.close()
+        shm.unlink()
+
+    try:
+        while True:
+            try:
+                message = conn.recv()
+            except (EOFError, OSError):
+                break
+            version, kind, *args = message
+            if version != PROTOCOL_VERSION:
+                conn.send((PROTOCOL_VERSION, 'failed', args[0] if args else -1, f"不支持的协议版本 {version}"))
+                continue
+            if kind == 'quit':
+                break
+            if kind == 'release':
+                shm = published.pop(args[0], None)
+                if shm is not None:
+                    discard(shm)
+                continue
+            seq, path = args
+            try:
+                rows = read_sorted_fields(path)
+            except FileNotFoundError:
+                conn.send((PROTOCOL_VERSION, 'failed', seq, f"错误: 弹幕文件 '{path}' 未找到。"))
+            except ET.ParseError as e:
+                conn.send((PROTOCOL_VERSION, 'failed', seq, f"解析XML时发生错误: {e}"))
+            except Exception as e:
+                conn.send((PROTOCOL_VERSION, 'failed', seq, f"加载弹幕时发生未知错误: {e}"))
+            else:
+                shm = write_table(rows)
+                published[seq] = shm
+                conn.send((PROTOCOL_VERSION, 'ready', seq, shm.name))
+    finally:
+        for shm in published.values():
+            discard(shm)
+
+
+class _WorkerError(Exception):
+    """工作进程崩溃、无响应或发回了无法识别的结果。"""
+
+
+class ParseWorker:
+    """
+    管理解析工作进程，load 可直接作为 load_cached 的解析函数。可在任意线程中调用，请求依次处理。
+    工作进程崩溃或超时后，本次加载改为在进程内解析，并立即重新启动工作进程；
+    连续失败超过 MAX_RESTARTS 次后不再启动，之后都在进程内解析。
+    """
+    # 等待一次解析结果的最长时间（秒）
+    LOAD_TIMEOUT_S = 60.0
+    # 停止时等待工作进程自行退出的时间（秒）
+    STOP_TIMEOUT_S = 1.0
+    MAX_RESTARTS = 3
+
+    def __init__(self):
+        # 使用 spawn，避免复制主进程中 Qt 和异步运行时的线程状态；各平台的行为也一致
+        self._context = multiprocessing.get_context('spawn')
+        self._process = None
+        self._conn = None
+        self._lock = threading.Lock()
+        self._seq = 0
+        self._failures = 0
+        self.enabled = True
+        self.restarts = 0
+
+    def start(self):
+        """启动工作进程。它在后台导入模块，不阻塞调用者。已在运行时不做任何事。"""
+        with self._lock:
+            if self.enabled and not self.is_alive():
+                self._start_process()
+
+    def is_alive(self) -> bool:
+        return self._process is not None and self._process.is_alive()
+
+    def stop(self):
+        """停止工作进程。之后的 load 都在进程内解析。"""
+        self.enabled = False
+        if self._lock.acquire(blocking=False):
+            try:
+                if self._conn is not None:
+                    try:
+                        self._conn.send((PROTOCOL_VERSION, 'quit'))
+                    except (OSError, ValueError):
+                        pass
+                self._discard_process(self.STOP_TIMEOUT_S)
+            finally:
+                self._lock.release()
+        elif self._process is not None:
+            # 另一个线程正在等待解析结果，直接结束进程，那次加载随即改为在进程内解析
+            self._process.kill()
+
+    def load(self, filepath: str) -> Sequence[DanmakuData]:
+        """
+        在工作进程中解析弹幕文件，返回映射好的 DanmakuTable；文件无法读取或解析时返回空列表。
+        工作进程不可用时在本进程中调用 load_from_xml。
+        """
+        with self._lock:
+            if self.enabled:
+                try:
+                    return self._load_in_worker(filepath)
+                except _WorkerError as e:
+                    self._on_failure(e)
+        return load_from_xml(filepath)
+
+    def _start_process(self):
+        self._conn, child_conn = self._context.Pipe()
+        self._process = self._context.Process(target=_serve, args=(child_conn,), name="danmaku-parse-worker",
+                                              daemon=True)
+        self._process.start()
+        child_conn.close()
+        logging.debug(f"解析工作进程已启动 (pid {self._process.pid})。")
+
+    def _discard_process(self, timeout: float = 0.0):
+        if self._process is not None:
+            self._process.join(timeout)
+            if self._process.is_alive():
+                self._process.kill()
+                self._process.join()
+            self._process = None
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def _on_failure(self, error: _WorkerError):
+        process = self._process
+        self._discard_process()
+        exitcode = process.exitcode if process is not None else None
+        if not self.enabled:
+            return
+        self._failures += 1
+        if self._failures > self.MAX_RESTARTS:
+            self.enabled = False
+            logging.error(f"解析工作进程连续 {self._failures} 次失败（{error}），之后改为在本进程中解析。")
+            return
+        logging.warning(f"解析工作进程失败（{error}，退出码 {exitcode}），本次在本进程中解析，正在重新启动工作进程。")
+        self.restarts += 1
+        self._start_process()
+
+    def _load_in_worker(self, filepath: str) -> Sequence[DanmakuData]:
+        if not self.is_alive():
+            if self._process is not None:
+                logging.warning(f"解析工作进程已意外退出（退出码 {self._process.exitcode}），正在重新启动。")
+                self._discard_process()
+                self.restarts += 1
+            self._start_process()
+        self._seq += 1
+        seq = self._seq
+        start = time.perf_counter()
+        try:
+            self._conn.send((PROTOCOL_VERSION, 'load', seq, filepath))
+        except (OSError, ValueError) as e:
+            raise _WorkerError(f"无法发送请求: {e}") from e
+        kind, payload = self._receive(seq, start + self.LOAD_TIMEOUT_S)
+        if kind == 'failed':
+            logging.error(payload)
+            self._failures = 0
+            return []
+        try:
+            table = DanmakuTable.attach(payload)
+        except (OSError, ValueError) as e:
+            raise _WorkerError(f"无法映射共享内存: {e}") from e
+        finally:
+            try:
+                self._conn.send((PROTOCOL_VERSION, 'release', seq))
+            except (OSError, ValueError):
+                pass
+        self._failures = 0
+        logging.info(f"成功加载 {len(table)} 条有效弹幕（解析工作进程，耗时 {(time.perf_counter() - start) * 1000:.0f} 毫秒）。")
+        return table
+
+    def _receive(self, seq: int, deadline: float) -> tuple[str, str]:
+        """等待序号为 seq 的回复，返回 (类型, 共享内存名称或错误信息)。"""
+        while True:
+            remaining = deadline - time.perf_counter()
+            try:
+                if remaining <= 0 or not self._conn.poll(remaining):
+                    raise _WorkerError(f"{self.LOAD_TIMEOUT_S:g} 秒内没有返回结果")
+                message = self._conn.recv()
+            except (EOFError, OSError) as e:
+                raise _WorkerError("工作进程已退出") from e
+            if not isinstance(message, tuple) or len(message) != 4 or message[0] != PROTOCOL_VERSION:
+                raise _WorkerError(f"无法识别的回复: {message!r}")
+            _, kind, reply_seq, payload = message
+            if reply_seq == seq and kind in ('ready', 'failed'):
+                return kind, payload
+            # 早先请求的回复（不会发生在正常流程中），忽略
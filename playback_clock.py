@@ -0,0 +1,143 @@
+# playback_clock.py
+import time
+
+
+class PlaybackClock:
+    """
+    播放时钟。媒体监控器只能周期性地提供粗粒度的播放位置，
+    本类根据最近一次采样和单调时钟外推出任意时刻的播放位置。
+
+    - 小幅误差通过“追赶”平滑修正，不会让位置突变；
+    - 超过阈值的误差直接硬同步到采样值（例如用户拖动了进度条）；
+    - 位置按播放速率推进，速率改变时重新锚定，不视为跳转。
+    """
+    def __init__(self, resync_threshold_s: float = 1.0, slew_time_s: float = 0.5, time_source=time.monotonic):
+        """
+        Args:
+            resync_threshold_s (float): 误差超过该值（秒）时直接跳到采样位置。
+            slew_time_s (float): 小幅误差被平滑消除所用的时间（秒）。
+            time_source (callable): 返回当前时间（秒）的函数，默认 time.monotonic。
+        """
+        self.resync_threshold_s = resync_threshold_s
+        self.slew_time_s = slew_time_s
+        self._time_source = time_source
+        self.reset()
+
+    def reset(self):
+        """清空状态，下一次采样将被视为硬同步。"""
+        self._anchor_position = 0.0
+        self._anchor_time = 0.0
+        self._correction = 0.0
+        self._correction_time = 0.0
+        self._last_sample: float | None = None
+        self._playing = False
+        self._rate = 1.0
+
+    @property
+    def is_valid(self) -> bool:
+        return self._last_sample is not None
+
+    @property
+    def is_playing(self) -> bool:
+        return self._playing
+
+    @property
+    def rate(self) -> float:
+        return self._rate
+
+    def now(self) -> float:
+        return self._time_source()
+
+    def position(self, now: float | None = None) -> float:
+        """返回外推得到的当前播放位置（秒）。"""
+        if now is None:
+            now = self._time_source()
+        if not self._playing:
+            return self._anchor_position
+        elapsed = max(0.0, now - self._anchor_time)
+        if self._correction and elapsed < self._correction_time:
+            correction = self._correction * (elapsed / self._correction_time)
+        else:
+            correction = self._correction
+        return self._anchor_position + elapsed * self._rate + correction
+
+    def update(self, position: float, playing: bool, now: float | None = None, rate: float = 1.0) -> float:
+        """
+        输入一个新的位置采样。
+
+        Args:
+            position (float): 监控器报告的播放位置（秒）。
+            playing (bool): 是否正在播放。
+            now (float | None): 采样时刻，默认取当前时间。
+            rate (float): 播放速率（1.0为正常速度）。
+
+        Returns:
+            float: 采样值与外推值之间的误差（秒）。首次采样时返回 inf；播放中重复上次的采样时返回 0；速率改变时，
+                   误差未超过硬同步阈值则返回 0，否则返回误差，使调用者能发现同时发生的跳转。
+        """
+        if now is None:
+            now = self._time_source()
+        if rate <= 0:
+            rate = 1.0
+
+        if self._last_sample is None:
+            self._hard_sync(position, playing, now, rate)
+            self._last_sample = position
+            return float('inf')
+
+        if rate != self._rate:
+            # 先按旧速率的外推计算误差：同一次采样中可能还包含跳转（如后退并同时改变速率）
+            error = position - self.position(now)
+            # 速率变化后旧的外推不再可信，直接以采样为准重新锚定
+            self._hard_sync(position, playing, now, rate)
+            self._last_sample = position
+            return error if abs(error) > self.resync_threshold_s else 0.0
+
+        if playing and self._playing and position == self._last_sample:
+            # 采样与上次相同（部分播放器如 SMTC 只会偶尔更新进度）：无论已外推了多远都忽略这次采样，
+            # 继续外推，不当作跳转，也不被拉回陈旧的进度
+            return 0.0
+
+        predicted = self.position(now)
+        error = position - predicted
+
+        if not playing or not self._playing:
+            # 暂停或从暂停恢复时没有可外推的运动，直接以采样为准
+            self._hard_sync(position, playing, now, rate)
+        elif abs(error) > self.resync_threshold_s:
+            self._hard_sync(position, playing, now, rate)
+        else:
+            # 播放中且采样确实更新了：从当前外推位置出发，在一段时间内逐步消除误差。
+            # 追赶时间至少为误差的两倍（按速率换算），保证位置始终向前推进。
+            self._anchor_position = predicted
+            self._anchor_time = now
+            self._correction = error
+            self._correction_time = max(self.slew_time_s, abs(error) * 2 / self._rate)
+
+        self._last_sample = position
+        return error
+
+    def _hard_sync(self, position: float, playing: bool, now: float, rate: float):
+        self._anchor_position = position
+        self._anchor_time = now
+        self._correction = 0.0
+        self._correction_time = 0.0
+        self._playing = playing
+        self._rate = rate
+
+
+class VirtualClock:
+    """
+    手动推进的虚拟时钟，可作为 time_source 注入播放时钟、渲染器和回放监控器，
+    使整个会话能够脱离真实时间、以确定的步长回放。
+    """
+    def __init__(self, start: float = 0.0):
+        self._now = start
+
+    def __call__(self) -> float:
+        return self._now
+
+    def advance(self, seconds: float) -> float:
+        """向前推进指定的秒数，返回推进后的时间。"""
+        self._now += seconds
+        return self._now
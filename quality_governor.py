@@ -0,0 +1,105 @@
+# quality_governor.py
+import logging
+
+
+class QualityTier:
+    """
+    渲染画质档位。数值越大，画质越低、开销越小。
+    """
+    FULL = 0        # 完整描边 + 抗锯齿 + 全局不透明度
+    SHADOW = 1      # 仅绘制偏移阴影，代替描边
+    NO_OUTLINE = 2  # 不绘制任何描边/阴影
+    NO_ALPHA = 3    # 无描边、无抗锯齿，且绘制时不再应用不透明度
+
+    NAMES = {
+        FULL: "FULL",
+        SHADOW: "SHADOW",
+        NO_OUTLINE: "NO_OUTLINE",
+        NO_ALPHA: "NO_ALPHA",
+    }
+
+    @classmethod
+    def name_of(cls, tier: int) -> str:
+        return cls.NAMES.get(tier, str(tier))
+
+
+class QualityGovernor:
+    """
+    自动画质调节器。
+    根据每帧的实际耗时与帧时间预算进行比较，在持续超预算时逐级降低画质，
+    在持续有余量时再逐级恢复。升降档使用不同的门限和帧数（迟滞），避免来回抖动。
+    """
+    def __init__(self, frame_budget_ms: float, enabled: bool = True,
+                 downgrade_frames: int = 20, upgrade_frames: int = 180,
+                 upgrade_ratio: float = 0.6, smoothing: float = 0.1):
+        """
+        Args:
+            frame_budget_ms (float): 每帧允许的渲染耗时（毫秒）。
+            enabled (bool): 是否启用自动调节。禁用时始终保持 FULL 档。
+            downgrade_frames (int): 平均耗时连续超预算多少帧后降一档。
+            upgrade_frames (int): 平均耗时连续低于 预算*upgrade_ratio 多少帧后升一档。
+            upgrade_ratio (float): 升档门限相对预算的比例，小于1以形成迟滞区间。
+            smoothing (float): 帧耗时指数滑动平均的系数。
+        """
+        self.frame_budget_ms = frame_budget_ms
+        self.enabled = enabled
+        self.downgrade_frames = downgrade_frames
+        self.upgrade_frames = upgrade_frames
+        self.upgrade_ratio = upgrade_ratio
+        self.smoothing = smoothing
+
+        self.tier = QualityTier.FULL
+        self.avg_frame_ms = 0.0
+        self._over_count = 0
+        self._under_count = 0
+
+    @property
+    def tier_name(self) -> str:
+        return QualityTier.name_of(self.tier)
+
+    def reset(self):
+        """恢复到最高画质并清空统计，例如在暂停恢复或热重载之后。"""
+        self.tier = QualityTier.FULL
+        self.avg_frame_ms = 0.0
+        self._over_count = 0
+        self._under_count = 0
+
+    def record_frame(self, frame_ms: float) -> bool:
+        """
+        记录一帧的耗时，并在需要时调整画质档位。
+
+        Args:
+            frame_ms (float): 本帧渲染工作的耗时（毫秒）。
+
+        Returns:
+            bool: 档位是否发生了变化。
+        """
+        if not self.enabled:
+            return False
+
+        self.avg_frame_ms += (frame_ms - self.avg_frame_ms) * self.smoothing
+
+        if self.avg_frame_ms > self.frame_budget_ms:
+            self._over_count += 1
+            self._under_count = 0
+        elif self.avg_frame_ms < self.frame_budget_ms * self.upgrade_ratio:
+            self._under_count += 1
+            self._over_count = 0
+        else:
+            # 处于迟滞区间内，保持当前档位
+            self._over_count = 0
+            self._under_count = 0
+
+        if self._over_count >= self.downgrade_frames and self.tier < QualityTier.NO_ALPHA:
+            return self._set_tier(self.tier + 1)
+        if self._under_count >= self.upgrade_frames and self.tier > QualityTier.FULL:
+            return self._set_tier(self.tier - 1)
+        return False
+
+    def _set_tier(self, tier: int) -> bool:
+        old_name = self.tier_name
+        self.tier = tier
+        self._over_count = 0
+        self._under_count = 0
+        logging.info(f"画质自动调节: {old_name} -> {self.tier_name} (平均帧耗时 {self.avg_frame_ms:.2f}ms)")
+        return True
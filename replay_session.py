@@ -0,0 +1,138 @@
+# replay_session.py
+"""
+录制与回放媒体会话，用于在没有真实播放器的情况下复现问题和性能回归。
+
+录制（从配置中的媒体监控器捕获会话时间线）:
+    python replay_session.py record timeline.json --duration 60
+
+回放（无界面、虚拟时间、逐帧驱动，输出每次运行都相同的帧摘要）:
+    python replay_session.py replay timeline.json testDanmaku/958151789.xml --fps 60 --seed 1
+"""
+import argparse
+import asyncio
+import hashlib
+import logging
+import os
+import sys
+import time
+
+
+def record(args) -> int:
+    from config_loader import get_config
+    from monitors import MediaMonitorError, create_media_monitor
+    from monitors.replay_monitor import record_timeline, save_timeline
+
+    config = get_config()
+    backend = args.monitor or config.monitor_backend
+    try:
+        monitor = create_media_monitor(backend, mpv_ipc_path=config.mpv_ipc_path)
+    except MediaMonitorError as e:
+        logging.error(f"媒体监控器初始化失败: {e}")
+        return 1
+    logging.info(f"开始录制（监控器: {backend}），按 Ctrl+C 结束...")
+    try:
+        events = asyncio.run(record_timeline(monitor, args.duration))
+    except KeyboardInterrupt:
+        # asyncio.run 已取消录制任务，已录制的事件随之丢失，因此建议使用 --duration
+        logging.warning("录制被中断，未保存任何事件。请使用 --duration 指定录制时长。")
+        return 1
+    save_timeline(args.timeline, events)
+    logging.info(f"已录制 {len(events)} 个事件到 {args.timeline}")
+    return 0
+
+
+def replay(args) -> int:
+    # 回放默认不需要显示，使用 offscreen 平台即可在无显示器的环境中运行
+    if not args.show:
+        os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PyQt6.QtWidgets import QApplication
+
+    from config_loader import get_config
+    from danmaku_controller import DanmakuController
+    from monitors import MediaMonitorError
+    from monitors.base_monitor import SessionChangeDetector
+    from monitors.replay_monitor import ReplayMediaMonitor
+    from playback_clock import VirtualClock
+
+    app = QApplication(sys.argv[:1])
+    clock = VirtualClock()
+    try:
+        monitor = ReplayMediaMonitor.from_file(args.timeline, time_source=clock)
+    except MediaMonitorError as e:
+        logging.error(str(e))
+        return 1
+
+    # 只修改内存中的配置，不写回 config.ini
+    config = get_config()
+    config.debug = False
+    sessions = asyncio.run(monitor.list_sessions())
+    if args.target:
+        config.target_aumid = args.target
+    elif sessions:
+        config.target_aumid = sessions[0]["aumid"]
+
+    controller = DanmakuController(monitor=monitor, time_source=clock, seed=args.seed)
+    controller.error_occurred.connect(lambda msg: logging.error(msg))
+    controller.start(args.danmaku, run_worker=False)
+    if not controller.is_running():
+        return 1
+    renderer = controller.renderer
+
+    frame_time = 1.0 / args.fps
+    duration = args.duration if args.duration is not None else monitor.duration
+    total_frames = int(duration * args.fps)
+    detector = SessionChangeDetector(time_source=clock)
+    digest = hashlib.sha256()
+    monitor.rewind()
+
+    wall_start = time.perf_counter()
+    for frame in range(total_frames):
+        clock.advance(frame_time)
+        info = monitor.current_session()
+        if detector.is_change(info):
+            controller.feed_session_info(info)
+        renderer.step_frame()
+        if args.hash_frames:
+            image = renderer.grab().toImage()
+            digest.update(image.constBits().asstring(image.sizeInBytes()))
+        else:
+            for text, x, y in renderer.active_snapshot():
+                digest.update(f"{text}@{x:.3f},{y:.3f};".encode())
+        app.processEvents()
+    wall_time = time.perf_counter() - wall_start
+
+    controller.stop()
+    speedup = duration / wall_time if wall_time > 0 else float('inf')
+    print(f"frames={total_frames} virtual={duration:.2f}s wall={wall_time:.2f}s "
+          f"speedup={speedup:.1f}x digest={digest.hexdigest()}")
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="录制和回放媒体会话时间线")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    rec = sub.add_parser('record', help="从媒体监控器录制会话时间线")
+    rec.add_argument('timeline', help="输出的时间线 JSON 文件")
+    rec.add_argument('--monitor', default=None, help="监控器类型，默认使用配置中的设置")
+    rec.add_argument('--duration', type=float, default=None, help="录制时长（秒）")
+
+    rep = sub.add_parser('replay', help="以虚拟时间回放会话时间线")
+    rep.add_argument('timeline', help="录制的时间线 JSON 文件")
+    rep.add_argument('danmaku', help="XML 弹幕文件")
+    rep.add_argument('--fps', type=float, default=60.0, help="虚拟帧率")
+    rep.add_argument('--seed', type=int, default=0, help="渲染器随机数种子")
+    rep.add_argument('--duration', type=float, default=None, help="回放时长（秒），默认到时间线最后一个事件")
+    rep.add_argument('--target', default=None, help="目标会话 AUMID，默认取时间线中的第一个会话")
+    rep.add_argument('--hash-frames', action='store_true', help="对每帧的渲染图像取摘要（较慢），默认只对弹幕位置取摘要")
+    rep.add_argument('--show', action='store_true', help="显示弹幕窗口而不是使用 offscreen 平台")
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    if args.command == 'record':
+        return record(args)
+    return replay(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,93 @@
+# startup_benchmark.py
+"""
+启动性能测试。交替以无界面模式和控制面板模式启动程序（offscreen 平台），两种模式都加载同一个弹幕文件，
+报告启动耗时和常驻内存的中位数，并检查无界面模式是否在启动预算之内；
+另外以 -X importtime 启动一次无界面模式，检查导入总耗时是否超出阈值，防止重新引入不必要的导入。
+超出预算或阈值时退出码为 1。
+
+    python startup_benchmark.py --runs 5 --budget-ms 1000 --import-budget-ms 300
+
+启动耗时有两种：程序自己报告的（从 main.py 开始执行到第一帧绘制完成）和
+从创建子进程到收到报告的（另外包含解释器本身的启动）。各阶段的详细耗时可用 `python main.py --profile-startup` 查看。
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from startup_profile import profile_child, total_import_ms
+
+MAIN = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'main.py')
+MODES = {
+    'headless': ['--headless'],
+    'gui': [],
+}
+
+
+def _env() -> dict:
+    return dict(os.environ, QT_QPA_PLATFORM=os.environ.get('QT_QPA_PLATFORM', 'offscreen'))
+
+
+def measure(mode: str, args) -> dict:
+    """启动一次程序，返回它报告的启动耗时和内存，以及从创建进程到收到报告的时间。"""
+    env = _env()
+    command = [sys.executable, MAIN, *MODES[mode], args.danmaku, '--monitor', args.monitor, '--exit-after-startup']
+    start = time.perf_counter()
+    proc = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, env=env)
+    result = None
+    for line in proc.stdout:
+        if line.startswith('{'):
+            result = json.loads(line)
+            result['wall_ms'] = (time.perf_counter() - start) * 1000
+    proc.wait()
+    if result is None:
+        raise RuntimeError(f"{mode} 模式没有报告启动耗时（退出码 {proc.returncode}）")
+    return result
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="比较无界面模式和控制面板模式的启动耗时与内存")
+    parser.add_argument('--runs', type=int, default=5, help="每种模式的启动次数")
+    parser.add_argument('--danmaku', default=os.path.join('testDanmaku', '958151789.xml'), help="加载的弹幕文件")
+    parser.add_argument('--monitor', default='replay', help="媒体监控方式，默认使用不依赖播放器的 replay")
+    parser.add_argument('--budget-ms', type=float, default=1000, help="无界面模式启动耗时（中位数）的预算")
+    parser.add_argument('--import-budget-ms', type=float, default=300, help="无界面模式导入总耗时的阈值")
+    args = parser.parse_args()
+
+    samples = {mode: [] for mode in MODES}
+    for _ in range(args.runs):
+        for mode in MODES:
+            samples[mode].append(measure(mode, args))
+
+    print(f"{'模式':>10} {'到首帧(毫秒)':>10} {'含解释器(毫秒)':>14} {'常驻内存(MB)':>12}")
+    medians = {}
+    for mode, results in samples.items():
+        medians[mode] = {key: statistics.median(r[key] for r in results) for key in ('startup_ms', 'wall_ms', 'rss_mb')}
+        m = medians[mode]
+        print(f"{mode:>12} {m['startup_ms']:>12.1f} {m['wall_ms']:>18.1f} {m['rss_mb']:>16.1f}")
+
+    headless, gui = medians['headless'], medians['gui']
+    print(f"无界面模式比控制面板模式: 启动 {gui['startup_ms'] - headless['startup_ms']:+.1f} 毫秒，"
+          f"内存 {gui['rss_mb'] - headless['rss_mb']:+.1f} MB（正数为节省）")
+    profile = profile_child([*MODES['headless'], args.danmaku, '--monitor', args.monitor], env=_env())
+    import_ms = total_import_ms(profile['imports'])
+    print(f"无界面模式导入总耗时（-X importtime）: {import_ms:.1f} 毫秒")
+
+    failed = False
+    if headless['startup_ms'] > args.budget_ms:
+        print(f"失败: 无界面模式启动耗时 {headless['startup_ms']:.1f} 毫秒，超出预算 {args.budget_ms:g} 毫秒。")
+        failed = True
+    if import_ms > args.import_budget_ms:
+        print(f"失败: 无界面模式导入总耗时 {import_ms:.1f} 毫秒，超出阈值 {args.import_budget_ms:g} 毫秒。")
+        failed = True
+    if failed:
+        return 1
+    print(f"通过: 启动耗时在预算 {args.budget_ms:g} 毫秒之内，导入总耗时在阈值 {args.import_budget_ms:g} 毫秒之内。")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,112 @@
+# startup_profile.py
+"""
+启动过程剖析。main.py 在启动的各个阶段调用 mark() 记录时间戳；
+`python main.py --profile-startup [其他参数]` 以 `-X importtime` 重新启动程序，运行到第一帧绘制完成后退出，
+然后报告从创建进程到第一帧的各阶段耗时，以及导入耗时最多的模块。
+
+本模块在程序启动的最早阶段被导入，只依赖标准库中已加载的模块。
+"""
+import os
+import sys
+import time
+
+# (阶段名称, 墙上时钟时间戳)。使用 time.time() 以便与父进程创建子进程的时刻比较
+_phases: list[tuple[str, float]] = [("main.py 开始执行", time.time())]
+
+
+def mark(phase: str):
+    """记录一个启动阶段完成的时刻。"""
+    _phases.append((phase, time.time()))
+
+
+def phases() -> list[tuple[str, float]]:
+    return list(_phases)
+
+
+def watch_first_paint(app, callback):
+    """在应用程序第一次处理绘制事件之后（第一帧已绘制）调用 callback，之后不再监视。"""
+    from PyQt6.QtCore import QEvent, QObject, QTimer
+
+    class _FirstPaintFilter(QObject):
+        def eventFilter(self, obj, event):
+            if event.type() == QEvent.Type.Paint:
+                app.removeEventFilter(self)
+                # 让这次绘制先完成
+                QTimer.singleShot(0, callback)
+            return False
+
+    watcher = _FirstPaintFilter(app)
+    app.installEventFilter(watcher)
+    return watcher
+
+
+def parse_importtime(stderr: str) -> list[tuple[str, int, int, int]]:
+    """
+    解析 `-X importtime` 的输出。
+
+    Returns:
+        list[tuple[str, int, int, int]]: (模块名, 自身耗时, 累计耗时, 嵌套深度)，耗时单位为微秒。
+    """
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+            # 模块名前有一个空格，每嵌套一层再多两个空格
+            depth = (len(name) - len(name.lstrip()) - 1) // 2
+            modules.append((name.strip(), int(self_us), int(cumulative_us), depth))
+        except ValueError:
+            continue
+    return modules
+
+
+def total_import_ms(modules: list[tuple[str, int, int, int]]) -> float:
+    """所有顶层导入的累计耗时之和（毫秒）。"""
+    return sum(cumulative for _, _, cumulative, depth in modules if depth == 0) / 1000
+
+
+def profile_child(main_args: list[str], env: dict | None = None) -> dict:
+    """
+    以 `-X importtime` 启动 main.py 并运行到第一帧，返回其报告（见 main.report_startup），
+    另外包含 'spawn_time'（创建进程的时刻）和 'imports'（parse_importtime 的结果）。
+    """
+    import json
+    import subprocess
+    main_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'main.py')
+    command = [sys.executable, '-X', 'importtime', main_path, *main_args, '--exit-after-startup']
+    spawn_time = time.time()
+    proc = subprocess.run(command, capture_output=True, text=True, encoding='utf-8', errors='replace', env=env)
+    report = None
+    for line in proc.stdout.splitlines():
+        if line.startswith('{'):
+            report = json.loads(line)
+    if report is None:
+        raise RuntimeError(f"程序没有报告启动耗时（退出码 {proc.returncode}）:\n{proc.stderr[-2000:]}")
+    report['spawn_time'] = spawn_time
+    report['imports'] = parse_importtime(proc.stderr)
+    return report
+
+
+def run_profile(main_args: list[str], top: int = 15) -> int:
+    """剖析一次启动并打印报告。"""
+    report = profile_child(main_args)
+    spawn_time = report['spawn_time']
+    print(f"启动剖析（{report['mode']}，-X importtime 会使导入稍慢）")
+    print("\n完成时刻  阶段耗时  阶段（毫秒，从创建进程起）")
+    previous = spawn_time
+    for name, stamp in [("创建进程", spawn_time)] + [tuple(p) for p in report['phases']]:
+        print(f"{(stamp - spawn_time) * 1000:>8.1f}  {(stamp - previous) * 1000:>8.1f}  {name}")
+        previous = stamp
+    print(f"\n常驻内存: {report['rss_mb']:.1f} MB")
+
+    modules = report['imports']
+    print(f"\n导入总耗时: {total_import_ms(modules):.1f} 毫秒，共 {len(modules)} 个模块")
+    print("累计耗时最多的顶层导入（毫秒）:")
+    top_level = sorted((m for m in modules if m[3] == 0), key=lambda m: m[2], reverse=True)[:top]
+    for name, self_us, cumulative_us, _ in top_level:
+        print(f"  {cumulative_us / 1000:>8.1f}  {name}")
+    print("自身耗时最多的模块（毫秒）:")
+    for name, self_us, cumulative_us, _ in sorted(modules, key=lambda m: m[1], reverse=True)[:top]:
+        print(f"  {self_us / 1000:>8.1f}  {name}")
+    return 0
@@ -0,0 +1,20 @@
+# conftest.py
+"""pytest 配置：把项目根目录加入导入路径，并使用不需要显示器的 offscreen 平台。"""
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+# 手动运行的演示脚本，不是测试
+collect_ignore = ['test.py', 'test_overlay.py']
+
+
+@pytest.fixture(scope='session')
+def qapp():
+    from PyQt6.QtWidgets import QApplication
+    return QApplication.instance() or QApplication([])
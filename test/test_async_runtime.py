@@ -0,0 +1,90 @@
+# test_async_runtime.py
+"""共享异步运行时：超时、取消和关闭时协程被取消并处理完清理，回调经排队的信号在主线程中调用。"""
+import asyncio
+import concurrent.futures
+import threading
+import time
+
+import pytest
+
+from async_runtime import AsyncRuntime
+
+
+@pytest.fixture
+def runtime(qapp):
+    runtime = AsyncRuntime()
+    runtime.start()
+    yield runtime
+    runtime.shutdown()
+
+
+def _process_events(qapp, duration: float = 0.1):
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        qapp.processEvents()
+        time.sleep(0.01)
+
+
+async def _sleep_forever(cleaned_up: threading.Event):
+    try:
+        await asyncio.sleep(3600)
+    finally:
+        cleaned_up.set()
+
+
+def test_submit_timeout(qapp, runtime):
+    cleaned_up = threading.Event()
+    task = runtime.submit(_sleep_forever(cleaned_up), timeout=0.05)
+    with pytest.raises(TimeoutError):
+        task.result(timeout=2.0)
+    assert cleaned_up.is_set()
+
+    errors = []
+    runtime.call(_sleep_forever(threading.Event()), on_result=errors.append, on_error=errors.append, timeout=0.05)
+    _process_events(qapp, 0.3)
+    assert len(errors) == 1 and isinstance(errors[0], TimeoutError)
+
+
+def test_call_result_is_queued(qapp, runtime):
+    async def immediate():
+        return 42
+
+    results = []
+    task = runtime.call(immediate(), on_result=results.append)
+    task.wait(2.0)
+    # 即使协程已经结束，回调也只在主线程处理事件时调用
+    assert results == []
+    _process_events(qapp)
+    assert results == [42]
+
+
+def test_cancel_waits_and_skips_callbacks(qapp, runtime):
+    cleaned_up = threading.Event()
+    calls = []
+    task = runtime.call(_sleep_forever(cleaned_up), on_result=calls.append, on_error=calls.append)
+    time.sleep(0.05)
+    assert not task.done()
+    start = time.perf_counter()
+    assert task.cancel(wait=2.0)
+    # 协程处理完取消后立即返回，不等满整个时限
+    assert time.perf_counter() - start < 1.0
+    assert cleaned_up.is_set()
+    with pytest.raises(concurrent.futures.CancelledError):
+        task.result()
+    _process_events(qapp)
+    assert calls == []
+
+
+def test_shutdown_cancels_running_tasks(qapp):
+    runtime = AsyncRuntime()
+    runtime.start()
+    cleaned_up = threading.Event()
+    task = runtime.submit(_sleep_forever(cleaned_up))
+    time.sleep(0.05)
+    runtime.shutdown(timeout=2.0)
+    assert not runtime.is_running()
+    assert task.done()
+    assert cleaned_up.is_set()
+    coro = _sleep_forever(threading.Event())
+    with pytest.raises(RuntimeError):
+        runtime.submit(coro)
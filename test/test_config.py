@@ -0,0 +1,68 @@
+# test_config.py
+"""
+配置的运行时覆盖：命令行参数覆盖的配置项不会被保存设置写回配置文件；
+以及配置变更只报告值真正改变了的配置项。
+"""
+import configparser
+
+import pytest
+
+from config_loader import Config
+
+
+@pytest.fixture
+def config(tmp_path, monkeypatch):
+    path = tmp_path / 'config.ini'
+    path.write_text("[Sync]\ntarget_aumid = FilePlayer\nmonitor = mpv\n", encoding='utf-8')
+    # Config 是单例，测试使用独立的实例
+    monkeypatch.setattr(Config, '_instance', None)
+    return Config(str(path))
+
+
+def _saved(config: Config, key: str) -> str:
+    parser = configparser.ConfigParser()
+    parser.read(config.filepath, encoding='utf-8')
+    return parser.get('Sync', key)
+
+
+def test_override_is_not_saved(config):
+    config.override('target_aumid', 'CliPlayer')
+    config.override('monitor_backend', 'replay')
+    assert config.target_aumid == 'CliPlayer'
+    config.save()
+    assert _saved(config, 'target_aumid') == 'FilePlayer'
+    assert _saved(config, 'monitor') == 'mpv'
+
+
+def test_value_changed_after_override_is_saved(config):
+    config.override('target_aumid', 'CliPlayer')
+    # 之后在设置页面中改成了其他值
+    config.target_aumid = 'ChosenInSettings'
+    config.save()
+    assert _saved(config, 'target_aumid') == 'ChosenInSettings'
+
+
+def test_repeated_override_keeps_file_value(config):
+    config.override('target_aumid', 'First')
+    config.override('target_aumid', 'Second')
+    config.save()
+    assert _saved(config, 'target_aumid') == 'FilePlayer'
+
+
+def test_apply_changes_reports_only_changed_keys(config):
+    received = []
+    config.add_listener(received.append)
+    before = config.snapshot()
+    config.opacity = 0.5
+    # 赋回相同的值不算变更
+    config.scroll_speed = before['scroll_speed']
+    # 就地修改的列表与快照中的副本比较
+    config.library_folders.append('/media/anime')
+    change = config.apply_changes(before)
+    assert change.changes == {'opacity': (before['opacity'], 0.5),
+                              'library_folders': (before['library_folders'], ['/media/anime'])}
+    assert received == [change]
+
+    # 没有变化时不广播
+    assert not config.apply_changes(config.snapshot())
+    assert received == [change]
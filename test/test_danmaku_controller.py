@@ -0,0 +1,91 @@
+# test_danmaku_controller.py
+"""控制面板模式（async_load）下弹幕文件在后台加载，结果经异步运行时送回主线程。"""
+import os
+import threading
+import time
+from datetime import timedelta
+
+import pytest
+
+import danmaku_controller
+from config_loader import get_config
+from conftest import ROOT
+from danmaku_parser import load_cached
+from monitors.base_monitor import SessionInfo
+
+DANMAKU = os.path.join(ROOT, 'testDanmaku', '958151789.xml')
+
+
+@pytest.fixture
+def controller(qapp, monkeypatch):
+    config = get_config()
+    # 只修改内存中的配置，测试结束后恢复
+    for name, value in (('debug', False), ('extra_sessions', []), ('library_folders', []), ('follow_file', False),
+                        ('live_enabled', False), ('parse_worker', False)):
+        monkeypatch.setattr(config, name, value)
+    controller = danmaku_controller.DanmakuController(async_load=True)
+    yield controller
+    controller.stop()
+
+
+def _wait_until(qapp, predicate, timeout: float = 10.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError("等待后台加载超时")
+        qapp.processEvents()
+        time.sleep(0.01)
+
+
+def test_start_does_not_wait_for_the_load(qapp, controller, monkeypatch):
+    release = threading.Event()
+
+    def slow_load(path, loader=None):
+        release.wait(10)
+        return load_cached(path, loader)
+
+    monkeypatch.setattr(danmaku_controller, 'load_cached', slow_load)
+    start = time.perf_counter()
+    controller.start(DANMAKU, run_worker=False)
+    assert time.perf_counter() - start < 1.0
+    assert controller.is_running()
+    binding = controller.bindings[0]
+    assert len(binding.all_danmaku) == 0
+
+    # 加载完成前收到的会话信息在弹幕送达后重新同步
+    controller.feed_session_info(SessionInfo("test", "", "PLAYING", timedelta(seconds=60),
+                                             timedelta(seconds=1440), get_config().target_aumid))
+    release.set()
+    _wait_until(qapp, lambda: len(binding.all_danmaku) > 0)
+    assert binding.loading_path is None
+    assert binding._danmaku_idx > 0
+
+
+def test_failed_load_stops_the_controller(qapp, controller):
+    errors, stops = [], []
+    controller.error_occurred.connect(errors.append)
+    controller.stopped.connect(lambda: stops.append(True))
+    controller.start(os.path.join(ROOT, 'testDanmaku', 'missing.xml'), run_worker=False)
+    assert controller.is_running()
+    _wait_until(qapp, lambda: not controller.is_running())
+    assert stops == [True]
+    assert 'missing.xml' in errors[0]
+
+
+def test_stale_result_is_discarded(qapp, controller, monkeypatch):
+    loaded = []
+
+    def recording_load(path, loader=None):
+        loaded.append(path)
+        return load_cached(path, loader)
+
+    monkeypatch.setattr(danmaku_controller, 'load_cached', recording_load)
+    controller.start(DANMAKU, run_worker=False)
+    binding = controller.bindings[0]
+    # 结果送达前又请求了另一个文件：先前的结果不再采用
+    binding.loading_path = 'other.xml'
+    _wait_until(qapp, lambda: loaded)
+    for _ in range(20):
+        qapp.processEvents()
+        time.sleep(0.01)
+    assert len(binding.all_danmaku) == 0
@@ -0,0 +1,125 @@
+# test_danmaku_follow.py
+"""
+跟随模式：文件被截断或重写时重新解析全部弹幕；
+新增的弹幕插入会话绑定的有序列表，共享的列表或弹幕表先复制再修改，错过生成时机的弹幕迟到生成。
+"""
+from datetime import timedelta
+
+import pytest
+from PyQt6.QtGui import QColor
+
+from config_loader import get_config
+from danmaku_follow import DanmakuFileFollower
+from danmaku_models import DanmakuData
+from monitors.base_monitor import SessionInfo
+from parse_worker import DanmakuTable, write_table
+from playback_clock import VirtualClock
+
+HEADER = '<?xml version="1.0" encoding="UTF-8"?><i>'
+
+
+def _xml(*items: tuple[float, str]) -> str:
+    return HEADER + ''.join(f'<d p="{t},1,25,16777215">{text}</d>' for t, text in items)
+
+
+@pytest.fixture
+def follower(qapp, tmp_path):
+    path = tmp_path / 'live.xml'
+    path.write_text(_xml((1.0, "一"), (2.0, "二"), (3.0, "三")), encoding='utf-8')
+    follower = DanmakuFileFollower(str(path))
+    follower.path = path
+    appended, replaced = [], []
+    follower.danmaku_appended.connect(appended.append)
+    follower.danmaku_replaced.connect(replaced.append)
+    follower.appended, follower.replaced = appended, replaced
+    assert [d.text for d in follower.read_initial()] == ["一", "二", "三"]
+    yield follower
+    follower.stop()
+
+
+def test_appended_content(follower):
+    with open(follower.path, 'a', encoding='utf-8') as f:
+        f.write('<d p="0.5,1,25,255">四</d>')
+    follower._read_new()
+    assert [[d.text for d in batch] for batch in follower.appended] == [["四"]]
+    assert follower.replaced == []
+
+
+def test_truncated_file_is_reparsed(follower):
+    follower.path.write_text(_xml((5.0, "新"), (4.0, "文件")), encoding='utf-8')
+    follower._read_new()
+    assert follower.appended == []
+    # 重新解析的结果已排序
+    assert [[d.text for d in batch] for batch in follower.replaced] == [["文件", "新"]]
+
+
+def test_rewritten_file_is_reparsed(follower):
+    # 重写后的文件比已读取的部分更长，新增的字节无法接在原来的内容之后解析
+    follower.path.write_text(_xml(*((float(t), f"重写 {t}") for t in range(10))), encoding='utf-8')
+    follower._read_new()
+    assert follower.appended == []
+    assert len(follower.replaced) == 1
+    assert [d.text for d in follower.replaced[0]] == [f"重写 {t}" for t in range(10)]
+
+
+def _d(start_time: float, text: str) -> DanmakuData:
+    return DanmakuData(start_time, 1, text, QColor(255, 255, 255))
+
+
+@pytest.fixture
+def make_binding(qapp, monkeypatch):
+    monkeypatch.setattr(get_config(), 'debug', False)
+    from danmaku_controller import SessionBinding
+    bindings = []
+
+    def make(all_danmaku, position: float):
+        clock = VirtualClock()
+        binding = SessionBinding('test', '', all_danmaku, get_config(), time_source=clock, seed=0)
+        bindings.append(binding)
+        # 动画只在窗口可见时按帧推进
+        binding.renderer.show()
+        binding.on_session_info(SessionInfo("Episode 1", "", "PLAYING", timedelta(seconds=position),
+                                            timedelta(seconds=1440), 'test'))
+        binding.clock = clock
+        return binding
+
+    yield make
+    for binding in bindings:
+        binding.close()
+
+
+def test_append_before_the_cursor_spawns_late(make_binding):
+    shared = [_d(float(t), f"弹幕 {t}") for t in range(200)]
+    binding = make_binding(shared, 100.0)
+    cursor = binding._danmaku_idx
+    assert cursor == 101
+    missed = 100.0 - binding.renderer.max_lifetime() - 1.0
+
+    binding.append_danmaku([_d(150.0, "之后"), _d(99.5, "迟到"), _d(missed, "已错过")])
+    # 共享的列表保持不变
+    assert len(shared) == 200
+    assert len(binding.all_danmaku) == 203
+    assert binding.danmaku_start_times == sorted(binding.danmaku_start_times)
+    # 插在索引之前的两条使索引后移，索引仍指向同一条弹幕
+    assert binding._danmaku_idx == cursor + 2
+    assert binding.all_danmaku[binding._danmaku_idx] is shared[cursor]
+    # 只有仍应在屏幕上的那条迟到生成
+    assert [data.text for data, _ in binding.renderer._pending_spawns] == ["迟到"]
+    binding.clock.advance(1 / 60)
+    binding.renderer.step_frame()
+    assert "迟到" in [text for text, _, _ in binding.renderer.active_snapshot()]
+
+
+def test_append_copies_a_shared_table(make_binding):
+    shm = write_table([(float(t), 1, 25, 0xFFFFFF, f"弹幕 {t}") for t in range(10)])
+    table = DanmakuTable(shm)
+    try:
+        binding = make_binding(table, 5.0)
+        binding.append_danmaku([_d(7.5, "新增")])
+        assert isinstance(binding.all_danmaku, list)
+        assert isinstance(binding.danmaku_start_times, list)
+        assert len(table) == 10
+        assert [d.text for d in binding.all_danmaku[7:10]] == ["弹幕 7", "新增", "弹幕 8"]
+    finally:
+        table.close()
+        shm.unlink()
@@ -0,0 +1,56 @@
+# test_danmaku_parser.py
+"""弹幕 XML 解析: p 属性各字段的容错，以及增量解析仍在写入中的文件。"""
+import xml.etree.ElementTree as ET
+
+from danmaku_parser import DEFAULT_FONT_SIZE, IncrementalDanmakuParser, parse_d_element, parse_d_fields
+
+
+def _d(p: str, text: str = "测试") -> ET.Element:
+    return ET.fromstring(f'<d p="{p}">{text}</d>')
+
+
+def test_fields():
+    assert parse_d_fields(_d("12.5,1,36,16777215,0,0,0,0")) == (12.5, 1, 36, 16777215, "测试")
+
+
+def test_malformed_font_size_falls_back_to_default():
+    for p in ("3.0,1,,255", "3.0,1,abc,255", "3.0,4,25.5,255"):
+        fields = parse_d_fields(_d(p))
+        assert fields is not None, p
+        assert fields[2] == DEFAULT_FONT_SIZE
+    danmaku = parse_d_element(_d("3.0,5,,16711680"))
+    assert danmaku.font_size == DEFAULT_FONT_SIZE and danmaku.color.red() == 255
+
+
+def test_malformed_required_fields_are_dropped():
+    assert parse_d_fields(_d("x,1,25,255")) is None
+    assert parse_d_fields(_d("1.0,1,25,red")) is None
+    assert parse_d_fields(_d("1.0,1,25")) is None
+
+
+def test_unsupported_mode_and_empty_text_are_dropped():
+    assert parse_d_fields(_d("1.0,7,25,255")) is None
+    assert parse_d_fields(ET.fromstring('<d p="1.0,1,25,255"></d>')) is None
+
+
+def test_incremental_parser_completes_a_partial_element(tmp_path):
+    path = tmp_path / 'live.xml'
+    # 录制程序写到一半：没有结束标签，最后一条 <d> 也不完整
+    path.write_bytes('<?xml version="1.0" encoding="UTF-8"?><i><d p="1.0,1,25,255">第一条</d><d p="2.0,1,'
+                     .encode('utf-8'))
+    parser = IncrementalDanmakuParser(str(path))
+    assert [d.text for d in parser.read_new()] == ["第一条"]
+    assert parser.read_new() == []
+
+    # 续写的内容在多字节字符的中间断开
+    rest = '25,255">第二条</d><d p="0.5,1,25,255">第三条</d>'.encode('utf-8')
+    split = rest.index('条'.encode('utf-8')) + 1
+    with open(path, 'ab') as f:
+        f.write(rest[:split])
+    assert parser.read_new() == []
+    with open(path, 'ab') as f:
+        f.write(rest[split:])
+    new = parser.read_new()
+    # 按文件中的顺序返回，不排序
+    assert [(d.start_time, d.text) for d in new] == [(2.0, "第二条"), (0.5, "第三条")]
+    assert parser.offset == path.stat().st_size
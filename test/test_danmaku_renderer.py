@@ -0,0 +1,193 @@
+# test_danmaku_renderer.py
+"""
+窗口隐藏期间的动画追赶：只推进位置，不渲染位图，重新显示后按需渲染；
+以及字体名称改变时丢弃旧字体的缓存；跳转时释放轨道，回填超出一帧预算的部分顺延到后续帧；
+帧内其他工作耗尽预算时，待生成队列仍每帧前进；配置变更就地应用到屏幕上的弹幕。
+"""
+import time
+
+import pytest
+from PyQt6.QtGui import QColor
+
+import font_cache
+from config_loader import ConfigChange, get_config
+from danmaku_models import DanmakuData
+from playback_clock import VirtualClock
+
+
+@pytest.fixture
+def window(qapp, monkeypatch):
+    monkeypatch.setattr(get_config(), 'debug', False)
+    from danmaku_renderer import DanmakuWindow
+    clock = VirtualClock()
+    window = DanmakuWindow(total_danmaku_count=0, time_source=clock, seed=0)
+    window.clock = clock
+    yield window
+    window.close()
+    window.deleteLater()
+
+
+def _items(count: int) -> list[tuple[DanmakuData, float]]:
+    return [(DanmakuData(0.0, 1, f"弹幕 {i}", QColor(255, 255, 255)), 0.0) for i in range(count)]
+
+
+def test_hidden_catch_up_does_not_rasterize(window):
+    assert not window.isVisible()
+    window.resume()
+    window.add_danmaku_batch(_items(5), window.clock())
+    window.clock.advance(1.0)
+    # 隐藏期间暂停时先把动画推进到此刻
+    window.pause()
+    assert len(window._active_danmaku) == 5
+    assert all(d.pixmap_cache is None for d in window._active_danmaku)
+    assert all(d.position.x() < window.width() for d in window._active_danmaku)
+
+    window.backfill(_items(2))
+    assert all(d.pixmap_cache is None for d in window._active_danmaku)
+
+    # 绘制时按需渲染
+    window.grab()
+    assert all(d.pixmap_cache is not None for d in window._active_danmaku)
+
+
+def test_visible_backfill_prewarms(window):
+    window.show()
+    assert window.isVisible()
+    window.backfill(_items(3))
+    assert all(d.pixmap_cache is not None for d in window._active_danmaku)
+
+
+def test_font_name_change_clears_font_cache(window, monkeypatch):
+    config = window.config
+    font_cache.get_font(config.font_name, config.font_size + 1)
+    old_name = config.font_name
+    monkeypatch.setattr(config, 'font_name', old_name + ' Test')
+    window.apply_config_change(ConfigChange({'font_name': (old_name, config.font_name)}))
+    # 只剩下按新字体重新获取的条目
+    assert font_cache._fonts
+    assert all(name == config.font_name for name, _ in font_cache._fonts)
+
+
+def test_repeated_seek_frees_lanes(qapp, monkeypatch):
+    monkeypatch.setattr(get_config(), 'debug', False)
+    from danmaku_controller import SessionBinding
+    all_danmaku = [DanmakuData(i * 0.1, 1, f"弹幕 {i}", QColor(255, 255, 255)) for i in range(300)]
+
+    def seek(binding, position):
+        binding._handle_seek(position, float('inf'))
+        return len(binding.renderer._active_danmaku)
+
+    fresh = SessionBinding('fresh', '', all_danmaku, get_config(), time_source=VirtualClock(), seed=0)
+    binding = SessionBinding('test', '', all_danmaku, get_config(), time_source=VirtualClock(), seed=0)
+    try:
+        expected = seek(fresh, 20.0)
+        assert expected > 0
+        # 跳转前后的弹幕占用的轨道在清屏时一并释放，连续跳转恢复的数量与新窗口相同
+        seek(binding, 10.0)
+        assert seek(binding, 20.0) == expected
+        seek(binding, 25.0)
+        assert seek(binding, 20.0) == expected
+    finally:
+        fresh.close()
+        binding.close()
+
+
+def test_backfill_defers_beyond_the_frame_budget(qapp, monkeypatch):
+    config = get_config()
+    monkeypatch.setattr(config, 'debug', False)
+    monkeypatch.setattr(config, 'spawn_budget_ms', 0.0)
+    from danmaku_renderer import DanmakuWindow
+    # 真实时间模式：同步部分受生成预算限制
+    window = DanmakuWindow(total_danmaku_count=0, seed=0)
+    try:
+        window.show()
+        restored = window.backfill(_items(20))
+        assert restored == 1
+        assert len(window._pending_spawns) == 19
+        # 顺延的弹幕按回填时的已过时间记录预定时刻
+        assert all(scheduled == window._anim_time for _, scheduled in window._pending_spawns)
+    finally:
+        window.close()
+        window.deleteLater()
+
+
+def test_pending_spawns_drain_after_a_slow_frame(qapp, monkeypatch):
+    config = get_config()
+    monkeypatch.setattr(config, 'debug', False)
+    monkeypatch.setattr(config, 'spawn_budget_ms', 1.0)
+    from danmaku_renderer import DanmakuWindow
+    window = DanmakuWindow(total_danmaku_count=0, seed=0)
+    # 每帧的其他工作就已耗尽生成预算
+    window.frame_ticked.connect(lambda now: time.sleep(0.005))
+    try:
+        window.add_danmaku_batch(_items(5), time.monotonic())
+        remaining = [len(window._pending_spawns)]
+        while window._pending_spawns and len(remaining) <= 5:
+            window.update_states()
+            remaining.append(len(window._pending_spawns))
+        assert remaining[-1] == 0
+        assert all(after < before for before, after in zip(remaining, remaining[1:]))
+        assert len(window._active_danmaku) == 5
+    finally:
+        window.close()
+        window.deleteLater()
+
+
+def _set(window, monkeypatch, name: str, value):
+    """修改一项配置并把变更交给窗口。"""
+    old = getattr(window.config, name)
+    monkeypatch.setattr(window.config, name, value)
+    window.apply_config_change(ConfigChange({name: (old, value)}))
+
+
+def test_opacity_change_keeps_pixmaps(window, monkeypatch):
+    window.show()
+    window.backfill(_items(3))
+    pixmaps = [d.pixmap_cache for d in window._active_danmaku]
+    assert all(pixmap is not None for pixmap in pixmaps)
+    _set(window, monkeypatch, 'opacity', window.config.opacity / 2)
+    assert [d.pixmap_cache for d in window._active_danmaku] == pixmaps
+    # 描边改变时才重新渲染
+    _set(window, monkeypatch, 'stroke_width', window.config.stroke_width + 1)
+    assert all(d.pixmap_cache is None for d in window._active_danmaku)
+
+
+def test_scroll_speed_change_keeps_positions_continuous(window, monkeypatch):
+    window.show()
+    window.resume()
+    window.backfill([(data, i * 0.5) for i, (data, _) in enumerate(_items(4))])
+    assert len(window._active_danmaku) == 4
+
+    def step() -> list[float]:
+        window.clock.advance(1 / 60)
+        window.step_frame()
+        return [d.position.x() for d in window._active_danmaku]
+
+    x0 = [d.position.x() for d in window._active_danmaku]
+    x1 = step()
+    now = window._anim_time
+    lanes = list(window._scroll_tracks)
+    _set(window, monkeypatch, 'scroll_speed', window.config.scroll_speed * 2)
+    # 改变的瞬间不跳变，之后以两倍速度移动
+    assert [d.position.x() for d in window._active_danmaku] == x1
+    x2 = step()
+    for a, b, c in zip(x0, x1, x2):
+        assert b - c == pytest.approx(2 * (a - b))
+    # 轨道按新速度提前空出
+    assert window._scroll_tracks == [now + (t - now) / 2 if t > now else t for t in lanes]
+
+
+def test_pool_resize_in_place(window, monkeypatch):
+    window.backfill(_items(5))
+    pool = window._pool
+    active = list(window._active_danmaku)
+    _set(window, monkeypatch, 'max_danmaku_count', pool.size + 50)
+    assert window._pool is pool
+    assert pool.size == window.config.max_danmaku_count
+    # 缩小硬上限时只释放空闲对象，使用中的弹幕不受影响
+    monkeypatch.setattr(window.config, 'max_danmaku_count', 2)
+    _set(window, monkeypatch, 'pool_hard_cap', 8)
+    assert window._pool is pool
+    assert pool.size == 8
+    assert window._active_danmaku == active
+    assert pool.stats()['in_use'] == 5
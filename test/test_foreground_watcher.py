@@ -0,0 +1,147 @@
+"""
+X11ForegroundWatcher 的集成测试：在 Xvfb 上由测试扮演窗口管理器，
+设置根窗口的 _NET_ACTIVE_WINDOW 并移动窗口，检查前台进程名和窗口矩形的更新。
+没有 Xvfb、python-xlib 或 psutil 时跳过。
+"""
+import os
+import shutil
+import subprocess
+import time
+
+import pytest
+
+pytest.importorskip('Xlib')
+psutil = pytest.importorskip('psutil')
+if shutil.which('Xvfb') is None:
+    pytest.skip("Xvfb 不可用", allow_module_level=True)
+
+from PyQt6.QtCore import QRect
+from Xlib import Xatom, display as xdisplay
+
+from foreground_watcher import X11ForegroundWatcher
+
+
+@pytest.fixture
+def x_display():
+    """启动一个 Xvfb 服务器，返回其显示名称。"""
+    read_fd, write_fd = os.pipe()
+    server = subprocess.Popen(['Xvfb', '-displayfd', str(write_fd), '-screen', '0', '800x600x24', '-nolisten', 'tcp'],
+                              pass_fds=(write_fd,), stderr=subprocess.DEVNULL)
+    os.close(write_fd)
+    with os.fdopen(read_fd) as pipe:
+        number = pipe.readline().strip()
+    if not number:
+        server.kill()
+        pytest.skip("Xvfb 启动失败")
+    try:
+        yield f':{number}'
+    finally:
+        server.terminate()
+        server.wait(timeout=5)
+
+
+@pytest.fixture
+def other_process():
+    """另一个进程，作为第二个窗口的所有者。"""
+    process = subprocess.Popen(['sleep', '60'])
+    yield process
+    process.kill()
+    process.wait()
+
+
+class _WindowManager:
+    """代替窗口管理器：创建带 _NET_WM_PID 的顶层窗口，并维护根窗口的 _NET_ACTIVE_WINDOW。"""
+    def __init__(self, display_name: str):
+        self.display = xdisplay.Display(display_name)
+        self.root = self.display.screen().root
+        self._net_active_window = self.display.intern_atom('_NET_ACTIVE_WINDOW')
+        self._net_wm_pid = self.display.intern_atom('_NET_WM_PID')
+
+    def create_window(self, x: int, y: int, width: int, height: int, pid: int):
+        window = self.root.create_window(x, y, width, height, 0, self.display.screen().root_depth)
+        window.change_property(self._net_wm_pid, Xatom.CARDINAL, 32, [pid])
+        window.map()
+        self.display.sync()
+        return window
+
+    def activate(self, window):
+        self.root.change_property(self._net_active_window, Xatom.WINDOW, 32, [window.id if window else 0])
+        self.display.sync()
+
+    def close(self):
+        self.display.close()
+
+
+def _wait_until(qapp, predicate, timeout: float = 2.0):
+    """处理 Qt 事件（QSocketNotifier 由此送达 X 事件），直到条件成立。"""
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError("等待 X 事件超时")
+        qapp.processEvents()
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def watcher_and_wm(qapp, x_display):
+    wm = _WindowManager(x_display)
+    watcher = X11ForegroundWatcher(display_name=x_display)
+    yield watcher, wm
+    watcher.stop()
+    wm.close()
+
+
+def test_active_window_change(qapp, watcher_and_wm, other_process):
+    watcher, wm = watcher_and_wm
+    names, rects = [], []
+    watcher.foreground_changed.connect(names.append)
+    watcher.foreground_geometry_changed.connect(rects.append)
+    assert watcher.current == ''
+    assert watcher.geometry is None
+
+    own = wm.create_window(100, 50, 320, 240, os.getpid())
+    other = wm.create_window(400, 300, 200, 150, other_process.pid)
+    own_name = psutil.Process().name()
+
+    wm.activate(own)
+    _wait_until(qapp, lambda: watcher.current == own_name)
+    assert watcher.geometry == QRect(100, 50, 320, 240)
+
+    wm.activate(other)
+    _wait_until(qapp, lambda: watcher.current == 'sleep')
+    assert watcher.geometry == QRect(400, 300, 200, 150)
+
+    # 切回已缓存的窗口时不再查询 _NET_WM_PID
+    wm.activate(own)
+    _wait_until(qapp, lambda: watcher.current == own_name)
+    assert watcher.window_lookups == 2
+
+    wm.activate(None)
+    _wait_until(qapp, lambda: watcher.current == '')
+    assert watcher.geometry is None
+    assert names == [own_name, 'sleep', own_name, '']
+    assert rects[-1] is None
+
+
+def test_configure_notify_updates_geometry(qapp, watcher_and_wm):
+    watcher, wm = watcher_and_wm
+    window = wm.create_window(100, 50, 320, 240, os.getpid())
+    wm.activate(window)
+    _wait_until(qapp, lambda: watcher.geometry == QRect(100, 50, 320, 240))
+
+    rects = []
+    watcher.foreground_geometry_changed.connect(rects.append)
+    window.configure(x=200, y=80, width=400, height=300)
+    wm.display.sync()
+    _wait_until(qapp, lambda: watcher.geometry == QRect(200, 80, 400, 300))
+    assert rects == [QRect(200, 80, 400, 300)]
+
+    # 最小化（取消映射）时矩形未知
+    window.unmap()
+    wm.display.sync()
+    _wait_until(qapp, lambda: watcher.geometry is None)
+
+    # 窗口销毁后缓存失效
+    window.destroy()
+    wm.display.sync()
+    _wait_until(qapp, lambda: not watcher._window_pids)
@@ -0,0 +1,42 @@
+# test_live_ingest.py
+"""实时弹幕接入服务器的启动结果：只有真正开始监听时 start 才返回 True，重新启动时不保留旧的监听地址。"""
+import asyncio
+import socket
+import time
+
+from live_ingest import LiveIngestServer
+
+
+def test_restart_reports_only_current_addresses(qapp):
+    server = LiveIngestServer('tcp://127.0.0.1:0')
+    try:
+        assert server.start()
+        assert len(server.bound_addresses) == 1
+        server.stop()
+        assert server.start()
+        assert len(server.bound_addresses) == 1
+    finally:
+        server.stop()
+
+
+def test_bind_failure_returns_false(qapp):
+    with socket.socket() as occupied:
+        occupied.bind(('127.0.0.1', 0))
+        occupied.listen()
+        port = occupied.getsockname()[1]
+        server = LiveIngestServer(f'tcp://127.0.0.1:{port}')
+        assert not server.start()
+        assert server.bound_addresses == []
+
+
+def test_start_timeout_returns_false(qapp, monkeypatch):
+    async def never_ready(self):
+        await asyncio.sleep(3600)
+
+    monkeypatch.setattr(LiveIngestServer, 'START_TIMEOUT_S', 0.1)
+    monkeypatch.setattr(LiveIngestServer, '_serve', never_ready)
+    server = LiveIngestServer('tcp://127.0.0.1:0')
+    start = time.perf_counter()
+    assert not server.start()
+    assert time.perf_counter() - start < 2.0
+    assert server._task is None
@@ -0,0 +1,182 @@
+"""
+MprisMediaMonitor 的集成测试：在私有的 dbus-daemon 上导出一个模拟的 MPRIS 播放器，
+检查会话列表、属性读取，以及 PropertiesChanged / Seeked / NameOwnerChanged 信号对缓存的更新。
+没有 dbus-daemon 或 dbus-next 时跳过。
+"""
+import asyncio
+import shutil
+import subprocess
+import time
+
+import pytest
+
+pytest.importorskip('dbus_next')
+if shutil.which('dbus-daemon') is None:
+    pytest.skip("dbus-daemon 不可用", allow_module_level=True)
+
+from dbus_next import Variant
+from dbus_next.aio import MessageBus
+from dbus_next.service import PropertyAccess, ServiceInterface, dbus_property, signal
+
+from monitors.mpris_monitor import MprisMediaMonitor
+
+BUS_NAME = 'org.mpris.MediaPlayer2.testplayer.instance1'
+LENGTH_US = 1_440_000_000
+
+
+class _Root(ServiceInterface):
+    def __init__(self):
+        super().__init__('org.mpris.MediaPlayer2')
+
+    @dbus_property(access=PropertyAccess.READ)
+    def Identity(self) -> 's':
+        return 'Test Player'
+
+
+class _Player(ServiceInterface):
+    def __init__(self):
+        super().__init__('org.mpris.MediaPlayer2.Player')
+        self.status = 'Playing'
+        self.rate = 1.0
+        self.position_us = 60_000_000
+
+    @dbus_property(access=PropertyAccess.READ)
+    def PlaybackStatus(self) -> 's':
+        return self.status
+
+    @dbus_property(access=PropertyAccess.READ)
+    def Metadata(self) -> 'a{sv}':
+        return {'xesam:title': Variant('s', 'Episode 1'),
+                'xesam:artist': Variant('as', ['Studio']),
+                'mpris:length': Variant('x', LENGTH_US)}
+
+    @dbus_property(access=PropertyAccess.READ)
+    def Position(self) -> 'x':
+        return self.position_us
+
+    @dbus_property(access=PropertyAccess.READ)
+    def Rate(self) -> 'd':
+        return self.rate
+
+    @signal()
+    def Seeked(self, position_us) -> 'x':
+        return position_us
+
+    def change(self, **properties):
+        """修改属性并像真实播放器那样发出 PropertiesChanged（Position 除外）。"""
+        if 'PlaybackStatus' in properties:
+            self.status = properties['PlaybackStatus']
+        if 'Rate' in properties:
+            self.rate = properties['Rate']
+        self.emit_properties_changed(properties)
+
+    def seek(self, position_us: int):
+        self.position_us = position_us
+        self.Seeked(position_us)
+
+
+@pytest.fixture
+def session_bus(tmp_path, monkeypatch):
+    """启动一个私有的会话总线，并让 MessageBus(BusType.SESSION) 连接到它。"""
+    address = f"unix:path={tmp_path / 'bus'}"
+    daemon = subprocess.Popen(['dbus-daemon', '--session', '--nofork', f'--address={address}', '--print-address=1'],
+                              stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    try:
+        # 打印出地址说明总线已经开始监听
+        daemon.stdout.readline()
+        monkeypatch.setenv('DBUS_SESSION_BUS_ADDRESS', address)
+        yield address
+    finally:
+        daemon.terminate()
+        daemon.wait(timeout=5)
+
+
+async def _start_player() -> tuple[MessageBus, _Player]:
+    bus = await MessageBus().connect()
+    player = _Player()
+    bus.export('/org/mpris/MediaPlayer2', _Root())
+    bus.export('/org/mpris/MediaPlayer2', player)
+    await bus.request_name(BUS_NAME)
+    return bus, player
+
+
+async def _eventually(predicate, timeout: float = 2.0):
+    """等待信号被监控器处理。"""
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError("等待总线信号超时")
+        await asyncio.sleep(0.01)
+
+
+def test_list_sessions_and_current_info(session_bus):
+    async def scenario():
+        bus, _ = await _start_player()
+        monitor = MprisMediaMonitor()
+        try:
+            assert await monitor.list_sessions() == [{'aumid': 'testplayer', 'title': 'Episode 1'}]
+            info = await monitor.get_current_session_info()
+            assert info.source_aumid == 'testplayer'
+            assert info.title == 'Episode 1'
+            assert info.artist == 'Studio'
+            assert info.status == 'PLAYING'
+            assert info.duration.total_seconds() == LENGTH_US / 1e6
+            assert 60.0 <= info.position.total_seconds() < 61.0
+        finally:
+            await monitor.close()
+            bus.disconnect()
+
+    asyncio.run(scenario())
+
+
+def test_signals_update_cached_state(session_bus):
+    async def scenario():
+        bus, player = await _start_player()
+        monitor = MprisMediaMonitor()
+        try:
+            await monitor.get_current_session_info()
+            state = monitor._players[BUS_NAME]
+
+            player.change(PlaybackStatus='Paused')
+            await _eventually(lambda: state.status == 'PAUSED')
+            info = await monitor.get_current_session_info()
+            assert info.status == 'PAUSED'
+            paused_at = info.position
+            await asyncio.sleep(0.1)
+            # 暂停时进度不再外推
+            assert (await monitor.get_current_session_info()).position == paused_at
+
+            player.change(PlaybackStatus='Playing', Rate=1.5)
+            await _eventually(lambda: state.status == 'PLAYING' and state.rate == 1.5)
+            assert (await monitor.get_current_session_info()).playback_rate == 1.5
+
+            player.seek(300_000_000)
+            await _eventually(lambda: state.position_us == 300_000_000)
+            position = (await monitor.get_current_session_info()).position.total_seconds()
+            assert 300.0 <= position < 301.0
+        finally:
+            await monitor.close()
+            bus.disconnect()
+
+    asyncio.run(scenario())
+
+
+def test_player_exit_and_return(session_bus):
+    async def scenario():
+        bus, _ = await _start_player()
+        monitor = MprisMediaMonitor()
+        try:
+            assert await monitor.get_current_session_info() is not None
+            bus.disconnect()
+            await _eventually(lambda: not monitor._players)
+            assert await monitor.get_current_session_info() is None
+
+            # 播放器重新出现时通过 NameOwnerChanged 再次加入
+            bus, _ = await _start_player()
+            await _eventually(lambda: BUS_NAME in monitor._players)
+            assert (await monitor.get_all_session_info())[0].title == 'Episode 1'
+        finally:
+            await monitor.close()
+            bus.disconnect()
+
+    asyncio.run(scenario())
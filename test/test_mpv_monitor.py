@@ -0,0 +1,200 @@
+"""
+MpvMediaMonitor 的集成测试：在本地 UNIX 套接字上运行一个模拟 mpv JSON IPC 的 asyncio 服务器，
+检查订阅后的初始属性推送、按速率外推进度、跳转唤醒订阅者，以及服务器断开后的重连。
+"""
+import asyncio
+import json
+import sys
+import time
+
+import pytest
+
+from monitors.base_monitor import SessionChangeDetector
+from monitors.mpv_monitor import MpvMediaMonitor
+
+pytestmark = pytest.mark.skipif(sys.platform == 'win32', reason="模拟服务器使用 UNIX 套接字")
+
+PLAYING = {'pause': False, 'speed': 1.0, 'time-pos': 10.0, 'duration': 1440.0,
+           'media-title': 'Episode 1', 'idle-active': False}
+
+
+class FakeMpv:
+    """按 mpv 的方式响应 observe_property（立即推送一次当前值）和 get_property。"""
+    def __init__(self, path: str, props: dict):
+        self.path = path
+        self.props = dict(props)
+        self.observed: list[str] = []
+        self.connections = 0
+        self._clients: list[asyncio.StreamWriter] = []
+        self._server = None
+
+    async def start(self):
+        self._server = await asyncio.start_unix_server(self._handle, path=self.path)
+
+    async def stop(self):
+        self.drop()
+        self._server.close()
+        await self._server.wait_closed()
+
+    def drop(self):
+        """断开所有客户端连接，模拟 mpv 退出。"""
+        for writer in self._clients:
+            writer.close()
+        self._clients.clear()
+
+    def push(self, name: str, value):
+        self.props[name] = value
+        for writer in self._clients:
+            self._send(writer, {'event': 'property-change', 'name': name, 'data': value})
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        self._clients.append(writer)
+        while line := await reader.readline():
+            message = json.loads(line)
+            command = message['command']
+            if command[0] == 'observe_property':
+                self.observed.append(command[2])
+                self._send(writer, {'event': 'property-change', 'id': command[1],
+                                    'name': command[2], 'data': self.props.get(command[2])})
+            elif command[0] == 'get_property':
+                self._send(writer, {'request_id': message.get('request_id'), 'error': 'success',
+                                    'data': self.props.get(command[1])})
+        writer.close()
+
+    @staticmethod
+    def _send(writer: asyncio.StreamWriter, message: dict):
+        if not writer.is_closing():
+            writer.write((json.dumps(message) + '\n').encode('utf-8'))
+
+
+async def _eventually(predicate, timeout: float = 2.0):
+    """等待推送被监控器处理。"""
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError("等待 mpv 推送超时")
+        await asyncio.sleep(0.01)
+
+
+async def _connected_monitor(path: str) -> MpvMediaMonitor:
+    monitor = MpvMediaMonitor(path)
+    await monitor.get_current_session_info()
+    await _eventually(lambda: monitor._connected and monitor._props.get('idle-active') is False)
+    return monitor
+
+
+def test_initial_property_push(tmp_path):
+    async def scenario():
+        server = FakeMpv(str(tmp_path / 'mpv.sock'), PLAYING)
+        await server.start()
+        monitor = MpvMediaMonitor(server.path)
+        try:
+            # 尚未连接时通过一次性连接查询标题
+            assert await monitor.list_sessions() == [{'aumid': 'mpv', 'title': 'Episode 1'}]
+            assert await monitor.get_current_session_info() is None
+            await _eventually(lambda: monitor._connected and len(monitor._props) == len(PLAYING))
+            assert server.observed == list(MpvMediaMonitor.OBSERVED_PROPERTIES)
+
+            info = await monitor.get_current_session_info()
+            assert info.source_aumid == 'mpv'
+            assert info.title == 'Episode 1'
+            assert info.status == 'PLAYING'
+            assert info.duration.total_seconds() == 1440.0
+            assert 10.0 <= info.position.total_seconds() < 11.0
+
+            server.push('idle-active', True)
+            await _eventually(lambda: monitor._props['idle-active'])
+            assert await monitor.get_current_session_info() is None
+        finally:
+            await monitor.close()
+            await server.stop()
+
+    asyncio.run(scenario())
+
+
+def test_position_extrapolates_with_speed(tmp_path):
+    async def scenario():
+        server = FakeMpv(str(tmp_path / 'mpv.sock'), PLAYING)
+        await server.start()
+        monitor = await _connected_monitor(server.path)
+        try:
+            server.push('speed', 2.0)
+            server.push('time-pos', 20.0)
+            await _eventually(lambda: monitor._props['time-pos'] == 20.0)
+            pushed_at = monitor._position_time
+            assert monitor._position_at(pushed_at + 1.5) == pytest.approx(23.0)
+            assert (await monitor.get_current_session_info()).playback_rate == 2.0
+
+            # 暂停时先固定外推的进度，之后不再推进
+            server.push('pause', True)
+            await _eventually(lambda: monitor._props['pause'])
+            paused = monitor._props['time-pos']
+            assert paused >= 20.0
+            assert monitor._position_at(time.monotonic() + 10.0) == paused
+            assert (await monitor.get_current_session_info()).status == 'PAUSED'
+        finally:
+            await monitor.close()
+            await server.stop()
+
+    asyncio.run(scenario())
+
+
+def test_only_seeks_wake_subscribers(tmp_path):
+    async def scenario():
+        server = FakeMpv(str(tmp_path / 'mpv.sock'), PLAYING)
+        await server.start()
+        monitor = await _connected_monitor(server.path)
+        try:
+            # 正常推进：推送的值与外推位置的差在 JUMP_THRESHOLD_S 以内，不唤醒
+            monitor._changed.clear()
+            expected = monitor._position_at(time.monotonic())
+            server.push('time-pos', expected + SessionChangeDetector.JUMP_THRESHOLD_S / 5)
+            await _eventually(lambda: monitor._props['time-pos'] != PLAYING['time-pos'])
+            assert not monitor._changed.is_set()
+
+            # 跳转：唤醒订阅者，subscribe 产出新的进度
+            updates = monitor.subscribe()
+            await anext(updates)
+            server.push('time-pos', 300.0)
+            info = await asyncio.wait_for(anext(updates), timeout=2.0)
+            assert 300.0 <= info.position.total_seconds() < 301.0
+            await updates.aclose()
+        finally:
+            await monitor.close()
+            await server.stop()
+
+    asyncio.run(scenario())
+
+
+def test_reconnects_after_server_drops(tmp_path, monkeypatch):
+    monkeypatch.setattr(MpvMediaMonitor, 'RECONNECT_DELAY_S', 0.05)
+    monkeypatch.setattr(MpvMediaMonitor, 'RECONNECT_MAX_DELAY_S', 0.1)
+
+    async def scenario():
+        path = str(tmp_path / 'mpv.sock')
+        server = FakeMpv(path, PLAYING)
+        await server.start()
+        monitor = await _connected_monitor(path)
+        try:
+            # 连接被关闭：清空缓存，随后重新连接并重新订阅
+            server.drop()
+            await _eventually(lambda: not monitor._connected)
+            assert await monitor.get_current_session_info() is None
+            await _eventually(lambda: monitor._connected and 'time-pos' in monitor._props)
+            assert server.connections == 2
+            assert (await monitor.get_current_session_info()).title == 'Episode 1'
+
+            # mpv 退出：连接失败时按退避间隔重试，直到 mpv 重新启动
+            await server.stop()
+            await _eventually(lambda: not monitor._connected)
+            await asyncio.sleep(0.3)
+            server = FakeMpv(path, dict(PLAYING, **{'media-title': 'Episode 2'}))
+            await server.start()
+            await _eventually(lambda: monitor._connected and 'media-title' in monitor._props)
+            assert (await monitor.get_current_session_info()).title == 'Episode 2'
+        finally:
+            await monitor.close()
+            await server.stop()
+
+    asyncio.run(scenario())
@@ -0,0 +1,197 @@
+# test_parse_worker.py
+"""
+解析工作进程：共享内存弹幕表的读写和版本校验，解析失败的回复，
+工作进程崩溃、超时或在加载途中被停止时改为在本进程中解析，以及连续失败后不再重新启动。
+"""
+import multiprocessing
+import os
+import struct
+import threading
+import time
+
+import pytest
+
+import parse_worker
+from conftest import ROOT
+from danmaku_parser import load_from_xml
+from parse_worker import PROTOCOL_VERSION, DanmakuTable, ParseWorker, _serve, write_table
+
+DANMAKU = os.path.join(ROOT, 'testDanmaku', '958151789.xml')
+XML = ('<?xml version="1.0" encoding="UTF-8"?><i><d p="2.0,1,25,16777215">第二条</d>'
+       '<d p="1.0,5,36,255">第一条 🎉</d></i>')
+
+needs_fifo = pytest.mark.skipif(not hasattr(os, 'mkfifo'), reason="用命名管道让工作进程停在读取文件处")
+
+
+def _fields(danmaku_list) -> list[tuple]:
+    return [(d.start_time, d.mode, d.text, d.color.rgb() & 0xFFFFFF, d.font_size) for d in danmaku_list]
+
+
+@pytest.fixture
+def table_of():
+    """把字段元组写入共享内存并映射为弹幕表，测试结束后删除共享内存。"""
+    created = []
+
+    def make(rows) -> DanmakuTable:
+        shm = write_table(rows)
+        table = DanmakuTable(shm)
+        created.append((table, shm.name))
+        return table
+
+    yield make
+    for table, name in created:
+        table.close()
+        parse_worker.SharedMemory(name=name).unlink()
+
+
+def test_table_round_trip(table_of):
+    rows = [(0.5, 1, 25, 0xFFFFFF, "弹幕"), (1.25, 4, 36, 0x00FF00, "多字节 ✨ 文本"), (3.0, 5, 18, 0xFF0000, "x")]
+    table = table_of(rows)
+    assert len(table) == 3
+    assert _fields(table) == [(t, mode, text, color, size) for t, mode, size, color, text in rows]
+    assert list(table.start_times) == [0.5, 1.25, 3.0]
+    assert table.start_times[1:] == [1.25, 3.0]
+    assert table[-1].text == "x"
+    assert [d.text for d in table[:2]] == ["弹幕", "多字节 ✨ 文本"]
+    with pytest.raises(IndexError):
+        table[3]
+
+
+def test_empty_table(table_of):
+    table = table_of([])
+    assert len(table) == 0
+    assert list(table) == []
+    assert list(table.start_times) == []
+
+
+def test_layout_version_mismatch():
+    shm = write_table([(1.0, 1, 25, 0xFFFFFF, "弹幕")])
+    try:
+        struct.pack_into('<I', shm.buf, 4, parse_worker.TABLE_LAYOUT_VERSION + 1)
+        with pytest.raises(ValueError):
+            DanmakuTable.attach(shm.name)
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def test_serve_replies(tmp_path):
+    path = tmp_path / 'bad.xml'
+    path.write_text('<i><d p="1.0,1,25,255">未结束', encoding='utf-8')
+    conn, child_conn = multiprocessing.Pipe()
+    server = threading.Thread(target=_serve, args=(child_conn,))
+    server.start()
+    try:
+        conn.send((PROTOCOL_VERSION + 1, 'load', 1, DANMAKU))
+        assert conn.recv()[1:3] == ('failed', 1)
+        conn.send((PROTOCOL_VERSION, 'load', 2, str(path)))
+        version, kind, seq, message = conn.recv()
+        assert (version, kind, seq) == (PROTOCOL_VERSION, 'failed', 2)
+        assert "解析XML" in message
+        conn.send((PROTOCOL_VERSION, 'load', 3, str(tmp_path / 'missing.xml')))
+        assert conn.recv()[1:3] == ('failed', 3)
+    finally:
+        conn.send((PROTOCOL_VERSION, 'quit'))
+        server.join(5)
+        conn.close()
+    assert not server.is_alive()
+
+
+@pytest.fixture
+def worker():
+    worker = ParseWorker()
+    worker.start()
+    yield worker
+    worker.stop()
+
+
+def test_load_in_worker(worker, tmp_path):
+    table = worker.load(DANMAKU)
+    assert isinstance(table, DanmakuTable)
+    assert _fields(table) == _fields(load_from_xml(DANMAKU))
+
+    path = tmp_path / 'small.xml'
+    path.write_text(XML, encoding='utf-8')
+    assert _fields(worker.load(str(path))) == _fields(load_from_xml(str(path)))
+
+
+def test_failed_reply_keeps_the_worker(worker, tmp_path):
+    assert worker.load(str(tmp_path / 'missing.xml')) == []
+    path = tmp_path / 'bad.xml'
+    path.write_text('<i><d p="1.0,1,25,255">未结束', encoding='utf-8')
+    assert worker.load(str(path)) == []
+    assert worker.is_alive()
+    assert worker.restarts == 0
+
+
+def test_dead_worker_is_restarted(worker):
+    worker._process.kill()
+    worker._process.join()
+    assert isinstance(worker.load(DANMAKU), DanmakuTable)
+    assert worker.restarts == 1
+
+
+def _load_from_fifo(worker: ParseWorker, tmp_path, interrupt) -> list:
+    """
+    让工作进程停在读取命名管道处，调用 interrupt 打断它，再写入弹幕内容供本进程中的解析读取。
+    返回 load 的结果。
+    """
+    path = str(tmp_path / 'fifo.xml')
+    os.mkfifo(path)
+    results = []
+    loader = threading.Thread(target=lambda: results.append(worker.load(path)))
+    loader.start()
+    deadline = time.monotonic() + 10
+    while worker._seq == 0:
+        assert time.monotonic() < deadline, "加载请求没有发出"
+        time.sleep(0.01)
+    time.sleep(0.1)
+    process = worker._process
+    interrupt()
+    # 等加载线程回收被结束的工作进程，之后打开管道的读取方只能是本进程中的 load_from_xml
+    while worker._process is process:
+        assert time.monotonic() < deadline, "工作进程没有被回收"
+        time.sleep(0.01)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(XML)
+    loader.join(10)
+    assert not loader.is_alive()
+    return results[0]
+
+
+@needs_fifo
+def test_crash_mid_load_falls_back(worker, tmp_path):
+    result = _load_from_fifo(worker, tmp_path, worker._process.kill)
+    assert isinstance(result, list)
+    assert [d.text for d in result] == ["第一条 🎉", "第二条"]
+    assert worker.restarts == 1
+    assert worker.enabled
+    # 重新启动的工作进程继续使用
+    assert isinstance(worker.load(DANMAKU), DanmakuTable)
+
+
+@needs_fifo
+def test_stop_during_load(worker, tmp_path):
+    result = _load_from_fifo(worker, tmp_path, worker.stop)
+    assert [d.text for d in result] == ["第一条 🎉", "第二条"]
+    assert not worker.enabled
+    assert worker.restarts == 0
+    assert not worker.is_alive()
+    # 停止后都在本进程中解析
+    assert isinstance(worker.load(DANMAKU), list)
+
+
+def test_repeated_failures_disable_the_worker(worker, monkeypatch):
+    # 不等待结果，每次加载都当作超时
+    monkeypatch.setattr(worker, 'LOAD_TIMEOUT_S', 0.0)
+    monkeypatch.setattr(worker, 'MAX_RESTARTS', 1)
+    assert _fields(worker.load(DANMAKU)) == _fields(load_from_xml(DANMAKU))
+    assert worker.enabled
+    assert worker.restarts == 1
+    assert isinstance(worker.load(DANMAKU), list)
+    assert not worker.enabled
+    assert not worker.is_alive()
+    assert worker.restarts == 1
+    # 不再启动
+    worker.start()
+    assert not worker.is_alive()
@@ -0,0 +1,56 @@
+# test_pixmap_memory.py
+"""超长和多行弹幕的位图内存上限：无论文本多长，单条弹幕持有的位图都不超过 pixmap_memory_ceiling。"""
+import pytest
+from PyQt6.QtGui import QColor
+
+from config_loader import get_config
+from danmaku_models import DanmakuData
+from playback_clock import VirtualClock
+from text_layout import pixmap_memory_ceiling
+
+LONG_LINE = "超长弹幕" * 25000                                  # 十万个字符的单行
+MANY_LINES = "\n".join(f"第 {i} 行弹幕" for i in range(1000))  # 一千行
+
+
+@pytest.fixture(params=['truncate', 'tile'])
+def renderer(request, qapp, monkeypatch):
+    config = get_config()
+    # 只修改内存中的配置，测试结束后恢复
+    for name, value in (('long_text_mode', request.param), ('honor_font_size', False), ('debug', False),
+                        ('max_pixmap_width', 1024), ('max_lines', 3), ('stroke_width', 2)):
+        monkeypatch.setattr(config, name, value)
+    from danmaku_renderer import DanmakuWindow
+    window = DanmakuWindow(total_danmaku_count=0, time_source=VirtualClock(), seed=0)
+    yield window
+    window.close()
+    window.deleteLater()
+
+
+def _ceiling(window) -> int:
+    config = window.config
+    return pixmap_memory_ceiling(config.max_pixmap_width, config.max_lines, window._font_metrics.height(),
+                                 config.stroke_width, window.width(), config.long_text_mode)
+
+
+def _held_bytes(danmaku) -> int:
+    pixmaps = list(danmaku.tiles.values()) if danmaku.tiles is not None else [danmaku.pixmap_cache]
+    return sum(p.width() * p.height() * 4 for p in pixmaps if p is not None)
+
+
+@pytest.mark.parametrize('text', [LONG_LINE, MANY_LINES], ids=['long_line', 'many_lines'])
+def test_rasterized_bytes_within_ceiling(renderer, text):
+    danmaku = renderer.add_danmaku(DanmakuData(0.0, 1, text, QColor(255, 255, 255)))
+    assert danmaku is not None
+    if text is LONG_LINE and renderer.config.long_text_mode == 'tile':
+        assert danmaku.tiles is not None
+    ceiling = _ceiling(renderer)
+    # 让弹幕从屏幕右侧一直滚动到完全移出左侧，每个位置都实际绘制一次
+    total = danmaku.width + renderer.width()
+    steps = 40
+    peak = 0
+    for k in range(steps + 1):
+        danmaku.position.setX(renderer.width() - total * k / steps)
+        renderer.grab()
+        peak = max(peak, _held_bytes(danmaku))
+    assert 0 < peak <= ceiling, f"{renderer.config.long_text_mode}: 位图 {peak} 字节，上限 {ceiling} 字节"
+
@@ -0,0 +1,121 @@
+# test_playback_clock.py
+"""播放时钟的脚本化采样测试，使用 VirtualClock 作为时间源。"""
+import pytest
+
+from playback_clock import PlaybackClock, VirtualClock
+
+
+@pytest.fixture
+def clock():
+    virtual = VirtualClock(100.0)
+    playback = PlaybackClock(resync_threshold_s=1.0, slew_time_s=0.5, time_source=virtual)
+    playback.virtual = virtual
+    return playback
+
+
+def test_rate_change_alone_is_not_a_jump(clock):
+    clock.update(10.0, playing=True)
+    clock.virtual.advance(2.0)
+    assert clock.update(12.0, playing=True, rate=1.5) == 0.0
+    clock.virtual.advance(2.0)
+    assert clock.position() == pytest.approx(15.0)
+
+
+def test_rate_change_with_seek_reports_the_jump(clock):
+    clock.update(60.0, playing=True)
+    clock.virtual.advance(1.0)
+    # 后退到 20 秒并同时改为 2 倍速
+    error = clock.update(20.0, playing=True, rate=2.0)
+    assert error == pytest.approx(-41.0)
+    assert clock.rate == 2.0
+    clock.virtual.advance(1.0)
+    assert clock.position() == pytest.approx(22.0)
+
+
+def test_first_sample_is_a_hard_sync(clock):
+    assert not clock.is_valid
+    assert clock.update(42.0, playing=True) == float('inf')
+    assert clock.position() == pytest.approx(42.0)
+
+
+def test_small_error_is_slewed_without_jumping(clock):
+    clock.update(10.0, playing=True)
+    clock.virtual.advance(1.0)
+    # 采样比外推值超前 0.4 秒，不超过硬同步阈值
+    error = clock.update(11.4, playing=True)
+    assert error == pytest.approx(0.4)
+    # 刚收到采样时位置不跳变
+    assert clock.position() == pytest.approx(11.0)
+    previous = clock.position()
+    for _ in range(10):
+        clock.virtual.advance(0.1)
+        position = clock.position()
+        assert position > previous
+        previous = position
+    # 追赶时间（至少为误差的两倍 0.8 秒）结束后误差被完全消除
+    assert clock.position() == pytest.approx(11.4 + 1.0)
+
+
+def test_slew_keeps_moving_forward_when_sample_lags(clock):
+    clock.update(10.0, playing=True)
+    clock.virtual.advance(1.0)
+    clock.update(10.6, playing=True)
+    previous = clock.position()
+    for _ in range(20):
+        clock.virtual.advance(0.05)
+        assert clock.position() > previous
+        previous = clock.position()
+    clock.virtual.advance(1.0)
+    assert clock.position() == pytest.approx(10.6 + 2.0)
+
+
+def test_error_beyond_threshold_hard_syncs(clock):
+    clock.update(10.0, playing=True)
+    clock.virtual.advance(1.0)
+    assert clock.update(120.0, playing=True) == pytest.approx(109.0)
+    assert clock.position() == pytest.approx(120.0)
+    clock.virtual.advance(0.5)
+    assert clock.position() == pytest.approx(120.5)
+
+
+def test_error_at_threshold_is_slewed(clock):
+    clock.update(10.0, playing=True)
+    clock.virtual.advance(1.0)
+    clock.update(11.0 + clock.resync_threshold_s, playing=True)
+    # 恰好等于阈值时仍然平滑追赶
+    assert clock.position() == pytest.approx(11.0)
+
+
+def test_repeated_identical_samples_are_ignored(clock):
+    # 部分播放器（如 SMTC）长时间重复报告同一个进度
+    clock.update(30.0, playing=True)
+    for _ in range(5):
+        clock.virtual.advance(0.5)
+        # 重复的采样不是跳转，即使外推已超过硬同步阈值
+        assert clock.update(30.0, playing=True) == 0.0
+    # 继续按时间外推，而不是被拉回陈旧的进度
+    assert clock.position() == pytest.approx(32.5)
+    # 超出阈值后才真正更新的采样按正常方式处理
+    clock.virtual.advance(0.5)
+    assert clock.update(33.1, playing=True) == pytest.approx(0.1)
+
+
+def test_pause_and_resume(clock):
+    clock.update(50.0, playing=True)
+    clock.virtual.advance(2.0)
+    clock.update(52.0, playing=False)
+    assert not clock.is_playing
+    clock.virtual.advance(10.0)
+    # 暂停期间位置保持不变
+    assert clock.position() == pytest.approx(52.0)
+    clock.update(52.0, playing=True)
+    assert clock.is_playing
+    clock.virtual.advance(1.5)
+    assert clock.position() == pytest.approx(53.5)
+
+
+def test_reset_makes_next_sample_a_hard_sync(clock):
+    clock.update(50.0, playing=True)
+    clock.reset()
+    assert clock.update(5.0, playing=True) == float('inf')
+    assert clock.position() == pytest.approx(5.0)
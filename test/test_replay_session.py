@@ -0,0 +1,85 @@
+# test_replay_session.py
+"""
+会话时间线的保存与读取、回放监控器按速率外推进度，
+以及同一时间线和种子在虚拟时间下两次回放得到相同的帧摘要。
+"""
+import hashlib
+import os
+import re
+import subprocess
+import sys
+from datetime import timedelta
+
+import pytest
+
+from conftest import ROOT
+from monitors import MediaMonitorError
+from monitors.base_monitor import SessionInfo
+from monitors.replay_monitor import ReplayMediaMonitor, load_timeline, save_timeline, session_to_dict
+
+DANMAKU = os.path.join(ROOT, 'testDanmaku', '958151789.xml')
+
+
+def _session(status: str, position: float, rate: float = 1.0) -> dict:
+    return session_to_dict(SessionInfo("Episode 1", "", status, timedelta(seconds=position),
+                                       timedelta(seconds=1440), "test", playback_rate=rate))
+
+
+# 播放、跳转、暂停、以 1.5 倍速继续
+EVENTS = [
+    (0.0, _session("PLAYING", 60.0)),
+    (2.0, _session("PLAYING", 300.0)),
+    (3.5, _session("PAUSED", 301.5)),
+    (4.0, _session("PLAYING", 301.5, rate=1.5)),
+    (6.0, None),
+]
+
+
+def test_timeline_round_trip(tmp_path):
+    path = str(tmp_path / 'timeline.json')
+    # 乱序保存的事件读取时按时间排序
+    save_timeline(path, list(reversed(EVENTS)))
+    assert load_timeline(path) == EVENTS
+
+
+def test_unsupported_timeline_version(tmp_path):
+    path = tmp_path / 'timeline.json'
+    path.write_text('{"version": 0, "events": []}', encoding='utf-8')
+    with pytest.raises(MediaMonitorError):
+        load_timeline(str(path))
+
+
+def test_session_at_extrapolates():
+    monitor = ReplayMediaMonitor(EVENTS)
+    assert monitor.duration == 6.0
+    assert monitor.session_at(-1.0) is None
+    assert monitor.session_at(1.5).position.total_seconds() == pytest.approx(61.5)
+    # 暂停期间进度不变
+    paused = monitor.session_at(3.9)
+    assert paused.status == "PAUSED"
+    assert paused.position.total_seconds() == pytest.approx(301.5)
+    # 按播放速率推进
+    fast = monitor.session_at(5.0)
+    assert fast.playback_rate == 1.5
+    assert fast.position.total_seconds() == pytest.approx(303.0)
+    assert monitor.session_at(7.0) is None
+
+
+def _replay_digest(timeline: str, cwd) -> str:
+    proc = subprocess.run([sys.executable, os.path.join(ROOT, 'replay_session.py'), 'replay', timeline, DANMAKU,
+                           '--seed', '1'],
+                          cwd=cwd, env=dict(os.environ, QT_QPA_PLATFORM='offscreen'),
+                          capture_output=True, text=True, encoding='utf-8', timeout=60)
+    match = re.search(r'digest=([0-9a-f]{64})', proc.stdout)
+    assert match, f"回放没有输出摘要（退出码 {proc.returncode}）:\n{proc.stderr[-2000:]}"
+    return match.group(1)
+
+
+def test_replay_is_deterministic(tmp_path):
+    # 在空目录中运行，使用默认配置，日志写在该目录下
+    timeline = str(tmp_path / 'timeline.json')
+    save_timeline(timeline, EVENTS)
+    digest = _replay_digest(timeline, tmp_path)
+    # 屏幕上确实出现过弹幕
+    assert digest != hashlib.sha256().hexdigest()
+    assert _replay_digest(timeline, tmp_path) == digest
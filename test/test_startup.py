@@ -0,0 +1,64 @@
+# test_startup.py
+"""
+启动性能的回归测试：无界面模式到第一帧的耗时和导入总耗时必须在预算之内，
+且常驻内存低于控制面板模式，启动耗时不超过控制面板模式的一定比例。
+"""
+import json
+import os
+import subprocess
+import sys
+
+from conftest import ROOT
+from startup_benchmark import MODES
+from startup_profile import profile_child, total_import_ms
+
+DANMAKU = os.path.join(ROOT, 'testDanmaku', '958151789.xml')
+# 与 startup_benchmark.py 的默认预算相同
+STARTUP_BUDGET_MS = 1000
+IMPORT_BUDGET_MS = 300
+# 无界面模式的启动耗时最多为控制面板模式的多少倍；留出余量，避免机器偶发繁忙造成误报
+HEADLESS_STARTUP_RATIO = 1.1
+
+
+def _env() -> dict:
+    return dict(os.environ, QT_QPA_PLATFORM='offscreen')
+
+
+def run_mode(tmp_path, mode: str) -> dict:
+    """在空目录中（使用默认配置，日志写在该目录下）以给定模式启动一次，返回它报告的启动耗时和内存。"""
+    proc = subprocess.run([sys.executable, os.path.join(ROOT, 'main.py'), *MODES[mode], DANMAKU,
+                           '--monitor', 'replay', '--exit-after-startup'],
+                          cwd=tmp_path, env=_env(), capture_output=True, text=True, encoding='utf-8', timeout=60)
+    reports = [json.loads(line) for line in proc.stdout.splitlines() if line.startswith('{')]
+    assert reports, f"没有报告启动耗时（退出码 {proc.returncode}）:\n{proc.stderr[-2000:]}"
+    return reports[-1]
+
+
+def test_headless_startup_within_budget(tmp_path):
+    # 取两次中较快的一次，减少机器偶发繁忙造成的误报
+    results = [run_mode(tmp_path, 'headless') for _ in range(2)]
+    best = min(r['startup_ms'] for r in results)
+    assert results[0]['mode'] == 'headless'
+    assert best <= STARTUP_BUDGET_MS, f"无界面模式启动耗时 {best:.1f} 毫秒，超出预算 {STARTUP_BUDGET_MS} 毫秒"
+
+
+def test_headless_import_time_within_budget(tmp_path, monkeypatch):
+    # profile_child 在当前目录中启动程序，配置和日志写在临时目录下
+    monkeypatch.chdir(tmp_path)
+    args = ['--headless', DANMAKU, '--monitor', 'replay']
+    best = min(total_import_ms(profile_child(args, env=_env())['imports']) for _ in range(2))
+    assert best <= IMPORT_BUDGET_MS, f"无界面模式导入总耗时 {best:.1f} 毫秒，超出阈值 {IMPORT_BUDGET_MS} 毫秒"
+
+
+def test_headless_is_lighter_than_gui(tmp_path):
+    # 交替启动，各取最好的一次
+    results = {mode: [] for mode in MODES}
+    for _ in range(2):
+        for mode in MODES:
+            results[mode].append(run_mode(tmp_path, mode))
+    assert [r['mode'] for r in results['gui']] == ['gui', 'gui']
+    headless_ms, gui_ms = (min(r['startup_ms'] for r in results[mode]) for mode in ('headless', 'gui'))
+    headless_mb, gui_mb = (min(r['rss_mb'] for r in results[mode]) for mode in ('headless', 'gui'))
+    assert headless_ms <= gui_ms * HEADLESS_STARTUP_RATIO, \
+        f"无界面模式启动耗时 {headless_ms:.1f} 毫秒，控制面板模式 {gui_ms:.1f} 毫秒"
+    assert headless_mb < gui_mb, f"无界面模式常驻内存 {headless_mb:.1f} MB，控制面板模式 {gui_mb:.1f} MB"
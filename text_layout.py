@@ -0,0 +1,129 @@
+# text_layout.py
+import bisect
+import math
+from collections import OrderedDict
+
+from PyQt6.QtCore import Qt
+from PyQt6.QtGui import QFontMetrics
+
+ELLIPSIS = "…"
+
+# 分块模式下，整条弹幕最多允许的分块数量，超过部分会被省略
+MAX_TILES_PER_DANMAKU = 32
+
+# 排版结果缓存的最大条目数。重复的弹幕（如“666”）很常见，命中时可省去测量。
+_LAYOUT_CACHE_MAX = 2048
+_layout_cache: OrderedDict = OrderedDict()
+
+
+class TextLayout:
+    """
+    一条弹幕经过换行、截断后的排版结果。
+    只保存文本和尺寸信息，不持有任何位图。
+    """
+    def __init__(self, lines: list[str], line_widths: list[int], line_height: int):
+        self.lines = lines
+        self.line_widths = line_widths
+        self.line_height = line_height
+        self.width = max(line_widths) if line_widths else 0   # 最长一行的像素宽度
+        self.height = line_height * len(lines)               # 所有行的总高度
+        self._advances: list[list[int]] | None = None          # 每行的累计字符宽度，分块渲染时才计算
+
+    def line_segment(self, line_idx: int, x_from: float, x_to: float, metrics: QFontMetrics) -> tuple[int, str]:
+        """
+        返回某一行中与水平区间 [x_from, x_to) 相交的子串及其起始x偏移。
+        用于分块渲染时只绘制当前分块需要的字符。
+        """
+        if self._advances is None:
+            self._advances = []
+            for line in self.lines:
+                cumulative = [0]
+                total = 0
+                for char in line:
+                    total += metrics.horizontalAdvance(char)
+                    cumulative.append(total)
+                self._advances.append(cumulative)
+        cumulative = self._advances[line_idx]
+        start = max(0, bisect.bisect_right(cumulative, x_from) - 1)
+        end = min(len(self.lines[line_idx]), bisect.bisect_left(cumulative, x_to))
+        return cumulative[start], self.lines[line_idx][start:end]
+
+
+def layout_text(text: str, metrics: QFontMetrics, max_width: int, max_lines: int) -> TextLayout:
+    """
+    对弹幕文本进行排版：按换行符拆分为多行，超过最大行数的部分被省略，
+    每行超过最大宽度时在末尾截断并加上省略号。
+
+    Args:
+        text (str): 原始弹幕文本。
+        metrics (QFontMetrics): 用于测量的字体度量。
+        max_width (int): 单行允许的最大像素宽度。
+        max_lines (int): 允许的最大行数。
+
+    Returns:
+        TextLayout: 排版结果。
+    """
+    # 常见情况：单行且不超宽，只需一次测量
+    if '\n' not in text and '\r' not in text:
+        width = metrics.horizontalAdvance(text)
+        if width <= max_width:
+            return TextLayout([text], [width], metrics.height())
+        lines = [text]
+    else:
+        lines = [line for line in text.splitlines() if line.strip()] or [text.strip()]
+
+    max_lines = max(1, max_lines)
+    if len(lines) > max_lines:
+        lines = lines[:max_lines]
+        lines[-1] = lines[-1] + ELLIPSIS
+
+    widths = []
+    for i, line in enumerate(lines):
+        width = metrics.horizontalAdvance(line)
+        if width > max_width:
+            line = metrics.elidedText(line, Qt.TextElideMode.ElideRight, max_width)
+            lines[i] = line
+            width = metrics.horizontalAdvance(line)
+        widths.append(width)
+    return TextLayout(lines, widths, metrics.height())
+
+
+def cached_layout(text: str, font_key: str, metrics: QFontMetrics, max_width: int, max_lines: int) -> TextLayout:
+    """
+    带缓存的 layout_text。缓存以字体（含字号）、宽度/行数限制和文本共同作为键，
+    因此不同字号的同一文本不会互相混用。
+    """
+    key = (font_key, max_width, max_lines, text)
+    layout = _layout_cache.get(key)
+    if layout is not None:
+        _layout_cache.move_to_end(key)
+        return layout
+    layout = layout_text(text, metrics, max_width, max_lines)
+    _layout_cache[key] = layout
+    if len(_layout_cache) > _LAYOUT_CACHE_MAX:
+        _layout_cache.popitem(last=False)
+    return layout
+
+
+def clear_layout_cache():
+    """清空排版缓存，例如在字体或尺寸限制改变之后。"""
+    _layout_cache.clear()
+
+
+def max_layout_width(max_pixmap_width: int, long_text_mode: str) -> int:
+    """截断模式下单行最多与单张位图等宽；分块模式下允许多个分块，但总数有上限。"""
+    if long_text_mode == 'tile':
+        return max_pixmap_width * MAX_TILES_PER_DANMAKU
+    return max_pixmap_width
+
+
+def pixmap_memory_ceiling(max_pixmap_width: int, max_lines: int, line_height: int,
+                          stroke_width: int, screen_width: int, long_text_mode: str) -> int:
+    """
+    单条弹幕任意时刻持有的位图内存上限（字节，按 ARGB32 计算）。
+    分块模式下只有与屏幕相交的分块会被渲染并保留，因此上限与文本长度无关。
+    """
+    tile_bytes = (max_pixmap_width + stroke_width * 2) * (max_lines * line_height + stroke_width * 2) * 4
+    if long_text_mode == 'tile':
+        return tile_bytes * (math.ceil(screen_width / max_pixmap_width) + 1)
+    return tile_bytes